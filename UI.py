@@ -4,9 +4,13 @@ import streamlit as st
 import pandas as pd
 import os
 # --- IMPORT MODULES ---
-import modules.data_cleaning as dc
 import modules.analysis as ana
 import modules.visualization as vis
+import modules.visualization_plotly as pvis
+import modules.chart_cache as chart_cache
+from modules.shared_data import get_dataset
+import modules.dimensions as dimensions
+from modules.query import FilterQuery, CsvStream
 
 # --- 1. CẤU HÌNH TRANG & CSS TÙY CHỈNH ---
 st.set_page_config(
@@ -73,6 +77,32 @@ st.markdown(
 
 
 # --- HÀM HỖ TRỢ HIỂN THỊ GIẢI THÍCH ---
+# Kiểu biểu đồ mặc định: 'plotly' (trình duyệt tự vẽ, server chỉ gửi số liệu đã tổng hợp)
+# hoặc 'matplotlib' (server vẽ ảnh tĩnh). Đổi bằng biến môi trường OLYMPIC_CHART_BACKEND hoặc nút trên sidebar.
+DEFAULT_CHART_BACKEND = os.environ.get("OLYMPIC_CHART_BACKEND", "plotly")
+
+
+def show_chart(name, *args, **kwargs):
+    """
+    Vẽ biểu đồ 'name' (tên hàm trong visualization / visualization_plotly) bằng kiểu đang chọn.
+    Bản matplotlib được phục vụ dưới dạng ảnh PNG từ bộ nhớ đệm biểu đồ trên đĩa (modules/chart_cache.py):
+    rerun / đổi tab không phải vẽ lại, chỉ vẽ khi dữ liệu, tham số hoặc style thay đổi.
+    Trả về False nếu hàm vẽ không có dữ liệu (trả về None).
+    """
+    use_plotly = st.session_state.get("use_plotly", DEFAULT_CHART_BACKEND == "plotly")
+    if use_plotly:
+        fig = getattr(pvis, name)(*args, **kwargs)
+        if not fig:
+            return False
+        st.plotly_chart(fig, use_container_width=True)
+        return True
+    image = chart_cache.get_chart(getattr(vis, name), *args, **kwargs)
+    if image is None:
+        return False
+    st.image(image, width="stretch")
+    return True
+
+
 def show_explanation(title, content):
     st.markdown(f"""
     <div class="explanation-box">
@@ -83,14 +113,27 @@ def show_explanation(title, content):
 
 
 # --- 2. LOAD DATA ---
+# Bảng gốc, bảng sạch (đọc từ snapshot nếu có) và chỉ mục bộ lọc được nạp 1 lần cho cả server,
+# dùng chung (chỉ đọc) cho mọi phiên; tự nạp lại khi file dữ liệu / snapshot thay đổi
 try:
-    df_unclean = dc.load_data("data/athlete_events.csv")  # Dữ liệu gốc
-    df = dc.clean_data(df_unclean.copy())  # Dữ liệu sạch
+    dataset = get_dataset("data/athlete_events.csv")
 except Exception as e:
     st.error(f"Lỗi khi tải dữ liệu: {e}")
+    dataset = None
+if dataset is not None:
+    df_unclean = dataset["raw"]  # Dữ liệu gốc
+    df = dataset["clean"]  # Dữ liệu sạch
+else:
     df = None
     df_unclean = None
 
+
+def _stored_table(func_name):
+    """Bảng thống kê trên toàn bộ dữ liệu: lấy từ bảng tổng hợp đã lưu nếu có, không thì tính bằng hàm phân tích."""
+    table = dataset["tables"].get(func_name)
+    return table if table is not None else getattr(ana, func_name)(df)
+
+
 # --- 3. GIAO DIỆN CHÍNH ---
 if df is not None:
     st.sidebar.title("DANH MỤC")
@@ -118,10 +161,12 @@ if df is not None:
 
             # Phần Metrics
             c1, c2, c3, c4 = st.columns(4)
-            c1.metric("Vận Động Viên", f"{df['ID'].nunique():,}")
-            c2.metric("Quốc Gia", f"{df['NOC'].nunique()}")
-            c3.metric("Môn Thi Đấu", f"{df['Sport'].nunique()}")
-            c4.metric("Giai Đoạn", f"{df['Year'].min()} - {df['Year'].max()}")
+            dims = dataset["dims"]
+            year_low, year_high = dimensions.integer_bounds(dims, 'Year')
+            c1.metric("Vận Động Viên", f"{dims['athletes']:,}")
+            c2.metric("Quốc Gia", f"{len(dimensions.values(dims, 'NOC'))}")
+            c3.metric("Môn Thi Đấu", f"{len(dimensions.values(dims, 'Sport'))}")
+            c4.metric("Giai Đoạn", f"{year_low} - {year_high}")
 
             st.divider()
 
@@ -171,52 +216,92 @@ if df is not None:
                              "Bạn có thể kết hợp nhiều tiêu chí như tìm tất cả VĐV nữ của Việt Nam thi đấu môn Bơi lội, "
                              "hoặc tìm những VĐV có chiều cao trên 2 mét ở các kỳ Thế vận hội mùa Đông.")
 
-            with st.form("filter_form"):
-                st.subheader("Tiêu Chí Lọc")
-                c1, c2, c3 = st.columns(3)
-                with c1:
-                    f_team = st.selectbox(
-                        "Quốc Gia:", ["Tất cả"] + sorted(df['Team'].unique().tolist()))
-                    f_noc = st.selectbox(
-                        "Mã NOC:", ["Tất cả"] + sorted(df['NOC'].unique().tolist()))
-                with c2:
-                    f_sport = st.selectbox(
-                        "Môn Thể Thao:", ["Tất cả"] + sorted(df['Sport'].unique().tolist()))
-                    f_city = st.selectbox(
-                        "Thành Phố:", ["Tất cả"] + sorted(df['City'].unique().tolist()))
-                with c3:
-                    f_season = st.selectbox(
-                        "Mùa Giải:", ["Tất cả", "Summer", "Winter"])
-                    f_sex = st.selectbox("Giới Tính:", ["Tất cả", "M", "F"])
-
-                st.markdown("---")
-                c4, c5, c6, c7 = st.columns(4)
-                with c4:
-                    f_year_min, f_year_max = st.slider(
-                        "Giai Đoạn:", 1896, 2016, (1896, 2016))
-                with c5:
-                    f_age = st.number_input("Tuổi (>=):", 0, 100, 0)
-                with c6:
-                    f_height = st.number_input("Chiều Cao (>= cm):", 0, 250, 0)
-                with c7:
-                    f_weight = st.number_input("Cân Nặng (>= kg):", 0, 200, 0)
-
-                if st.form_submit_button("Lọc Ngay"):
-                    res = ana.filter_data_number(df, age=f_age, height=f_height, weight=f_weight,
-                                                 sex=(f_sex if f_sex != "Tất cả" else None))
-                    res = res[(res['Year'] >= f_year_min) &
-                              (res['Year'] <= f_year_max)]
-                    res = ana.filter_data_string(res, team=(f_team if f_team != "Tất cả" else None),
-                                                 noc=(f_noc if f_noc !=
-                                                      "Tất cả" else None),
-                                                 season=(
-                                                     f_season if f_season != "Tất cả" else None),
-                                                 city=(f_city if f_city !=
-                                                       "Tất cả" else None),
-                                                 sport=(f_sport if f_sport != "Tất cả" else None))
-
-                    st.success(f"Tìm thấy **{len(res)}** kết quả.")
-                    st.dataframe(res, use_container_width=True, height=600)
+            # Các ô chọn lấy giá trị từ siêu dữ liệu tính sẵn (modules/dimensions.py), không quét bảng.
+            # Ô chọn phụ thuộc nhau: chọn NOC thì ô Môn chỉ còn các môn NOC đó từng thi đấu (và ngược lại),
+            # nên các ô nằm ngoài form để đổi 1 ô là các ô khác cập nhật ngay.
+            dims = dataset["dims"]
+            filter_keys = {'Team': "f_team", 'NOC': "f_noc", 'Sport': "f_sport",
+                           'City': "f_city", 'Season': "f_season", 'Sex': "f_sex"}
+
+            def chosen(value):
+                return value if value != "Tất cả" else None
+
+            selected = {col: chosen(st.session_state.get(key, "Tất cả")) for col, key in filter_keys.items()}
+
+            def dim_selectbox(label, col):
+                choices = ["Tất cả"] + dimensions.options(dims, col, selected)
+                key = filter_keys[col]
+                if st.session_state.get(key, "Tất cả") not in choices:
+                    st.session_state[key] = "Tất cả"  # Lựa chọn cũ không còn phù hợp với các ô khác
+                return st.selectbox(label, choices, key=key)
+
+            st.subheader("Tiêu Chí Lọc")
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                f_team = dim_selectbox("Quốc Gia:", 'Team')
+                f_noc = dim_selectbox("Mã NOC:", 'NOC')
+            with c2:
+                f_sport = dim_selectbox("Môn Thể Thao:", 'Sport')
+                f_city = dim_selectbox("Thành Phố:", 'City')
+            with c3:
+                f_season = dim_selectbox("Mùa Giải:", 'Season')
+                f_sex = dim_selectbox("Giới Tính:", 'Sex')
+
+            st.markdown("---")
+            c4, c5, c6, c7 = st.columns(4)
+            with c4:
+                # Giới hạn theo các năm tổ chức của mùa đang chọn
+                season_years = dimensions.years(dims, chosen(f_season)) or dimensions.years(dims)
+                year_low, year_high = ((season_years[0], season_years[-1]) if season_years
+                                       else dimensions.integer_bounds(dims, 'Year'))
+                year_high = max(year_high, year_low + 1)  # slider cần min < max
+                f_year_min, f_year_max = st.slider(
+                    "Giai Đoạn:", year_low, year_high, (year_low, year_high))
+            with c5:
+                f_age = st.number_input("Tuổi (>=):", 0, dimensions.integer_bounds(dims, 'Age')[1], 0)
+            with c6:
+                f_height = st.number_input("Chiều Cao (>= cm):", 0, dimensions.integer_bounds(dims, 'Height')[1], 0)
+            with c7:
+                f_weight = st.number_input("Cân Nặng (>= kg):", 0, dimensions.integer_bounds(dims, 'Weight')[1], 0)
+
+            if st.button("Lọc Ngay"):
+                # Gom mọi điều kiện vào 1 truy vấn, tính 1 lần trên chỉ mục rồi mới lấy dòng
+                fingerprint = dataset["fingerprint"]
+                query = (FilterQuery(df, dataset["index"])
+                         .equal('Team', chosen(f_team)).equal('NOC', chosen(f_noc))
+                         .equal('Season', chosen(f_season)).equal('City', chosen(f_city))
+                         .equal('Sport', chosen(f_sport)).equal('Sex', chosen(f_sex))
+                         .between('Year', f_year_min, f_year_max)
+                         .at_least('Age', f_age).at_least('Height', f_height)
+                         .at_least('Weight', f_weight))
+                # Chỉ giữ số thứ tự dòng; bảng được lấy từng trang khi hiển thị
+                st.session_state["filter_rows"] = (fingerprint, query.row_ids())
+                st.session_state["filter_page"] = 1
+
+            # Kết quả lưu trong session_state để đổi trang không phải lọc lại
+            saved = st.session_state.get("filter_rows")
+            if saved is not None and saved[0] == dataset["fingerprint"]:
+                rows = saved[1]
+                st.success(f"Tìm thấy **{len(rows)}** kết quả.")
+
+                p1, p2, p3 = st.columns([1, 1, 2])
+                with p1:
+                    page_size = st.selectbox("Số dòng mỗi trang:", [50, 100, 500, 1000], index=1)
+                n_pages = max(1, -(-len(rows) // page_size))
+                if st.session_state.get("filter_page", 1) > n_pages:
+                    st.session_state["filter_page"] = n_pages
+                with p2:
+                    page = st.number_input(f"Trang (1 - {n_pages}):", 1, n_pages, key="filter_page")
+                with p3:
+                    st.write("")
+                    # Chỉ tạo file khi người dùng bấm tải, CSV được ghi theo từng khúc
+                    st.download_button("Tải toàn bộ kết quả (CSV)",
+                                       data=lambda: CsvStream(df, rows),
+                                       file_name="olympic_filter_result.csv", mime="text/csv")
+
+                start = (page - 1) * page_size
+                st.dataframe(df.iloc[rows[start:start + page_size]],
+                             use_container_width=True, height=600)
 
     # =========================================================================
     # NHÓM 2: BẢNG THỐNG KÊ (ANALYSIS)
@@ -238,7 +323,7 @@ if df is not None:
                              "Dữ liệu được sắp xếp ưu tiên theo số lượng Huy chương Vàng, sau đó đến tổng số huy chương. "
                              "Đây là thước đo chính xác nhất cho sức mạnh thể thao của một quốc gia trên đấu trường quốc tế.")
 
-            medal_tally = ana.calculate_medal_tally(df)
+            medal_tally = _stored_table('calculate_medal_tally')
             st.dataframe(medal_tally, use_container_width=True, height=800)
 
         elif stats_option == "Giới Tính & Tuổi":
@@ -250,7 +335,7 @@ if df is not None:
                              "Bạn có thể thấy rõ xu hướng bình đẳng giới đang tăng lên, từ những năm đầu gần như chỉ có nam giới, "
                              "đến nay tỷ lệ nữ giới đã tiệm cận mức cân bằng.")
 
-            gender_stats = ana.analyze_gender_participation(df)
+            gender_stats = _stored_table('analyze_gender_participation')
             if 'Female_Ratio (%)' not in gender_stats.columns and 'F' in gender_stats.columns:
                 gender_stats['Total'] = gender_stats.get(
                     'M', 0) + gender_stats.get('F', 0)
@@ -265,7 +350,7 @@ if df is not None:
                              "Phân tích này giúp trả lời câu hỏi: 'Độ tuổi nào là đỉnh cao phong độ của VĐV?'. "
                              "Thông thường, nhóm tuổi 20-30 chiếm đa số huy chương, nhưng ở một số môn đòi hỏi kinh nghiệm, "
                              "các VĐV lớn tuổi vẫn có thể tỏa sáng.")
-            age_stats = ana.analyze_medals_and_participants_by_age(df)
+            age_stats = _stored_table('analyze_medals_and_participants_by_age')
             st.dataframe(age_stats, use_container_width=True)
 
         elif stats_option == "Thể Chất (Chiều Cao/Cân Nặng)":
@@ -335,6 +420,8 @@ if df is not None:
     # =========================================================================
     elif menu_group == "3. Biểu Đồ Trực Quan (Visual)":
         st.sidebar.header("Chọn Loại Biểu Đồ")
+        st.sidebar.toggle("Biểu đồ tương tác (Plotly)", key="use_plotly",
+                          value=DEFAULT_CHART_BACKEND == "plotly")
         chart_option = st.sidebar.radio("Nội Dung:",
                                         ["Biểu Đồ Huy Chương",
                                          "Biểu Đồ Giới Tính",
@@ -346,8 +433,7 @@ if df is not None:
             st.title("Biểu Đồ Top Quốc Gia")
             top_n = st.slider("Số lượng quốc gia hiển thị:", 5, 50, 10)
 
-            fig = vis.plot_top_medals(df, top_n=top_n)
-            st.pyplot(fig)
+            show_chart("plot_top_medals", df, top_n=top_n)
 
             show_explanation("Biểu Đồ Xếp Hạng",
                              f"Biểu đồ cột này trực quan hóa sức mạnh của {top_n} quốc gia hàng đầu. "
@@ -356,8 +442,7 @@ if df is not None:
 
         elif chart_option == "Biểu Đồ Giới Tính":
             st.title("Xu Hướng Nam/Nữ Tham Dự")
-            fig = vis.plot_gender_trend(df)
-            st.pyplot(fig)
+            show_chart("plot_gender_trend", df)
 
             show_explanation("Xu Hướng Bình Đẳng Giới",
                              "Biểu đồ đường biểu diễn số lượng VĐV Nam (xanh) và Nữ (đỏ) qua các kỳ Olympic. "
@@ -372,8 +457,7 @@ if df is not None:
 
             with tab1:
                 st.subheader("Phân Phối Tuổi - Chiều Cao - Cân Nặng")
-                fig1 = vis.plot_physical_distribution(df_unclean)
-                st.pyplot(fig1)
+                show_chart("plot_physical_distribution", df_unclean)
                 show_explanation("Phân Phối Chuẩn",
                                  "Các biểu đồ Histogram cho thấy phần lớn VĐV nằm ở khoảng giữa (phân phối chuẩn). "
                                  "Tuy nhiên, độ tuổi có xu hướng lệch phải (nhiều VĐV trẻ), trong khi chiều cao và cân nặng "
@@ -381,9 +465,10 @@ if df is not None:
 
             with tab2:
                 st.subheader("So Sánh Thể Hình Giữa Các Môn")
-                fig2 = vis.plot_physical_comparison_by_sport(df)
-                if fig2:
-                    st.pyplot(fig2)
+                n_sports = st.select_slider("Số môn (đông VĐV nhất):",
+                                            options=[5, 10, 20, 30, "Tất cả"], value=10)
+                show_chart("plot_physical_comparison_by_sport",
+                           df, top=None if n_sports == "Tất cả" else n_sports)
                 show_explanation("Đặc Thù Môn Thể Thao",
                                  "Biểu đồ Boxplot này cực kỳ thú vị! Nó cho thấy sự khác biệt rõ rệt về hình thể: "
                                  "VĐV Bóng rổ cao vượt trội, VĐV Cử tạ nặng ký nhưng thấp, trong khi VĐV Thể dục dụng cụ thường nhỏ nhắn. "
@@ -391,10 +476,12 @@ if df is not None:
 
             with tab3:
                 st.subheader("Phân Nhóm VĐV (K-Means Clustering)")
+                # Mô hình fit trên mẫu ngẫu nhiên rồi được giữ lại: mở lại tab không phải fit lại
+                sample_size = st.select_slider("Số VĐV dùng để huấn luyện mô hình",
+                                               options=[10_000, 50_000, 100_000, "Toàn bộ"], value=50_000)
                 with st.spinner("Đang chạy mô hình AI..."):
-                    fig3 = vis.plot_athlete_clustering(df)
-                    if fig3:
-                        st.pyplot(fig3)
+                    show_chart("plot_athlete_clustering",
+                               df, sample_size=None if sample_size == "Toàn bộ" else sample_size)
                 show_explanation("Ứng Dụng AI (Machine Learning)",
                                  "Sử dụng thuật toán K-Means Clustering để tự động gom nhóm VĐV mà không cần biết trước môn thi đấu. "
                                  "Máy tính tự nhận ra các cụm: Nhóm 'Nhẹ cân/Nhỏ người' (thường là chạy đường dài, thể dục), "
@@ -406,16 +493,14 @@ if df is not None:
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Trường Hợp Trung Quốc (2008)")
-                fig_chn = vis.plot_host_advantage_china(df)
-                st.pyplot(fig_chn)
+                show_chart("plot_host_advantage_china", df)
                 show_explanation("Cú Hích Bắc Kinh 2008",
                                  "Biểu đồ cho thấy cột mốc năm 2008 cao đột biến so với các năm trước và sau đó. "
                                  "Khi làm chủ nhà, Trung Quốc đã đầu tư mạnh mẽ và đạt kết quả lịch sử, chứng minh 'Lợi thế sân nhà' là có thật.")
 
             with col2:
                 st.subheader("Ảnh Hưởng Chính Trị (Tẩy Chay)")
-                fig_geo = vis.plot_geopolitics_impact(df)
-                st.pyplot(fig_geo)
+                show_chart("plot_geopolitics_impact", df)
                 show_explanation("Chiến Tranh Lạnh",
                                  "Biểu đồ số lượng quốc gia tham dự bị 'gãy' sâu vào năm 1980 (Moscow) và 1984 (Los Angeles). "
                                  "Đây là minh chứng lịch sử cho thấy Chính trị ảnh hưởng tiêu cực đến Thể thao như thế nào "
@@ -427,17 +512,13 @@ if df is not None:
             vn_stats = ana.analyze_vietnam_participation(df)
             if not vn_stats.empty:
                 st.subheader("Số Lượng VĐV Qua Các Năm")
-                fig_vn = vis.plot_vietnam_stats(df)
-                if fig_vn:
-                    st.pyplot(fig_vn)
+                show_chart("plot_vietnam_stats", df)
                 show_explanation("Sự Phát Triển",
                                  "Số lượng VĐV Việt Nam tham dự Olympic có xu hướng tăng dần, thể hiện sự hội nhập sâu rộng. "
                                  "Từ chỗ chỉ có vài đại diện, chúng ta đã có những đoàn thể thao đông đảo hơn ở các kỳ gần đây.")
 
                 st.subheader("Bảng Vàng Thành Tích (Visual)")
-                fig_det = vis.plot_vietnam_details(df)
-                if fig_det:
-                    st.pyplot(fig_det)
+                show_chart("plot_vietnam_details", df)
                 show_explanation("Niềm Tự Hào Dân Tộc",
                                  "Bảng danh sách này vinh danh những cột mốc lịch sử: Tấm HCB đầu tiên của Trần Hiếu Ngân (2000), "
                                  "và đỉnh cao là tấm HCV của Hoàng Xuân Vinh (2016).")
@@ -0,0 +1,373 @@
+"""
+Sinh dữ liệu giả lập có đúng cấu trúc athlete_events.csv với số dòng bất kỳ, để thử hiệu năng
+khi không có (hoặc không được chia sẻ) dữ liệu thật.
+
+Giữ các đặc điểm chính của dữ liệu thật:
+- 51 kỳ Thế vận hội thật (Năm, Mùa, Thành phố), số VĐV tăng dần theo thời gian, tỉ lệ nữ tăng dần
+- ~230 NOC với phân bố lệch (vài đoàn lớn chiếm phần lớn số dòng), nhiều môn / nội dung theo mùa
+- Môn đồng đội: cả đội cùng NOC, Team, nội dung và cùng huy chương; có đoàn cử 2 đội ('-1', '-2')
+- VĐV môn cá nhân thi nhiều nội dung trong cùng 1 kỳ (cùng ID, nhiều dòng)
+- Tuổi / Chiều cao / Cân nặng theo giới tính và đặc thù môn, thiếu dữ liệu nhiều hơn ở các kỳ đầu
+- Biệt danh trong tên ('John "Jack" Smith', 'Maria (Mary) Lopez')
+- Có thể chỉnh tỉ lệ NaN, nhãn huy chương sai ("gold", "SILVER"...), giá trị ngoại lai và dòng trùng
+
+Ghi theo từng khúc nên bộ nhớ không đổi dù sinh 100 triệu dòng.
+
+Cách chạy (từ thư mục gốc dự án):
+    python benchmarks/generate_athlete_events.py --rows 1000000 --output data/synthetic_1m.csv
+    python benchmarks/generate_athlete_events.py --rows 100000000 --output /data/big.csv --seed 7
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['ID', 'Name', 'Sex', 'Age', 'Height', 'Weight', 'Team', 'NOC',
+           'Games', 'Year', 'Season', 'City', 'Sport', 'Event', 'Medal']
+
+# (Năm, Mùa, Thành phố) của các kỳ Thế vận hội 1896-2016, tên thành phố như trong dữ liệu gốc
+GAMES = [
+    (1896, 'Summer', 'Athina'), (1900, 'Summer', 'Paris'), (1904, 'Summer', 'St. Louis'),
+    (1906, 'Summer', 'Athina'), (1908, 'Summer', 'London'), (1912, 'Summer', 'Stockholm'),
+    (1920, 'Summer', 'Antwerpen'), (1924, 'Summer', 'Paris'), (1928, 'Summer', 'Amsterdam'),
+    (1932, 'Summer', 'Los Angeles'), (1936, 'Summer', 'Berlin'), (1948, 'Summer', 'London'),
+    (1952, 'Summer', 'Helsinki'), (1956, 'Summer', 'Melbourne'), (1960, 'Summer', 'Roma'),
+    (1964, 'Summer', 'Tokyo'), (1968, 'Summer', 'Mexico City'), (1972, 'Summer', 'Munich'),
+    (1976, 'Summer', 'Montreal'), (1980, 'Summer', 'Moskva'), (1984, 'Summer', 'Los Angeles'),
+    (1988, 'Summer', 'Seoul'), (1992, 'Summer', 'Barcelona'), (1996, 'Summer', 'Atlanta'),
+    (2000, 'Summer', 'Sydney'), (2004, 'Summer', 'Athina'), (2008, 'Summer', 'Beijing'),
+    (2012, 'Summer', 'London'), (2016, 'Summer', 'Rio de Janeiro'),
+    (1924, 'Winter', 'Chamonix'), (1928, 'Winter', 'Sankt Moritz'), (1932, 'Winter', 'Lake Placid'),
+    (1936, 'Winter', 'Garmisch-Partenkirchen'), (1948, 'Winter', 'Sankt Moritz'),
+    (1952, 'Winter', 'Oslo'), (1956, 'Winter', "Cortina d'Ampezzo"), (1960, 'Winter', 'Squaw Valley'),
+    (1964, 'Winter', 'Innsbruck'), (1968, 'Winter', 'Grenoble'), (1972, 'Winter', 'Sapporo'),
+    (1976, 'Winter', 'Innsbruck'), (1980, 'Winter', 'Lake Placid'), (1984, 'Winter', 'Sarajevo'),
+    (1988, 'Winter', 'Calgary'), (1992, 'Winter', 'Albertville'), (1994, 'Winter', 'Lillehammer'),
+    (1998, 'Winter', 'Nagano'), (2002, 'Winter', 'Salt Lake City'), (2006, 'Winter', 'Torino'),
+    (2010, 'Winter', 'Vancouver'), (2014, 'Winter', 'Sochi'),
+]
+# Kỳ bị tẩy chay -> ít VĐV hơn
+BOYCOTT_FACTOR = {(1980, 'Summer'): 0.55, (1984, 'Summer'): 0.85}
+
+# Các đoàn lớn (NOC, Team) theo thứ tự quy mô giảm dần; phần đuôi còn lại được sinh thêm
+MAJOR_NOCS = [
+    ('USA', 'United States'), ('FRA', 'France'), ('GBR', 'Great Britain'), ('ITA', 'Italy'),
+    ('GER', 'Germany'), ('CAN', 'Canada'), ('JPN', 'Japan'), ('SWE', 'Sweden'), ('AUS', 'Australia'),
+    ('HUN', 'Hungary'), ('POL', 'Poland'), ('SUI', 'Switzerland'), ('NED', 'Netherlands'),
+    ('URS', 'Soviet Union'), ('FIN', 'Finland'), ('ESP', 'Spain'), ('CHN', 'China'), ('NOR', 'Norway'),
+    ('AUT', 'Austria'), ('RUS', 'Russia'), ('KOR', 'South Korea'), ('TCH', 'Czechoslovakia'),
+    ('ROU', 'Romania'), ('BEL', 'Belgium'), ('BRA', 'Brazil'), ('BUL', 'Bulgaria'), ('GDR', 'East Germany'),
+    ('FRG', 'West Germany'), ('DEN', 'Denmark'), ('ARG', 'Argentina'), ('MEX', 'Mexico'),
+    ('NZL', 'New Zealand'), ('CUB', 'Cuba'), ('GRE', 'Greece'), ('UKR', 'Ukraine'), ('IND', 'India'),
+    ('YUG', 'Yugoslavia'), ('KAZ', 'Kazakhstan'), ('BLR', 'Belarus'), ('TUR', 'Turkey'),
+    ('RSA', 'South Africa'), ('EGY', 'Egypt'), ('IRL', 'Ireland'), ('POR', 'Portugal'), ('CZE', 'Czech Republic'),
+    ('THA', 'Thailand'), ('INA', 'Indonesia'), ('PHI', 'Philippines'), ('MAS', 'Malaysia'),
+    ('SIN', 'Singapore'), ('VIE', 'Vietnam'), ('KEN', 'Kenya'), ('ETH', 'Ethiopia'), ('NGR', 'Nigeria'),
+    ('JAM', 'Jamaica'), ('IRI', 'Iran'), ('PRK', 'North Korea'), ('COL', 'Colombia'), ('CHI', 'Chile'),
+    ('VEN', 'Venezuela'),
+]
+N_NOCS = 230
+
+# Môn: (mùa, số người 1 đội (1 = cá nhân), độ lệch chiều cao cm, độ lệch BMI, tuổi TB, độ phổ biến,
+#       nội dung nam, nội dung nữ)
+SPORTS = {
+    'Athletics': ('Summer', 1, 1, -1.0, 25, 38, ["100 metres", "200 metres", "400 metres", "800 metres",
+                  "1,500 metres", "5,000 metres", "10,000 metres", "Marathon", "110 metres Hurdles",
+                  "High Jump", "Pole Vault", "Long Jump", "Triple Jump", "Shot Put", "Discus Throw",
+                  "Hammer Throw", "Javelin Throw", "Decathlon", "20 kilometres Walk"],
+                  ["100 metres", "200 metres", "400 metres", "800 metres", "1,500 metres", "Marathon",
+                   "100 metres Hurdles", "High Jump", "Long Jump", "Shot Put", "Javelin Throw", "Heptathlon"]),
+    'Gymnastics': ('Summer', 1, -10, -1.5, 21, 26, ["Individual All-Around", "Floor Exercise", "Horse Vault",
+                   "Parallel Bars", "Horizontal Bar", "Rings", "Pommelled Horse", "Team All-Around"],
+                   ["Individual All-Around", "Floor Exercise", "Horse Vault", "Uneven Bars", "Balance Beam",
+                    "Team All-Around"]),
+    'Swimming': ('Summer', 1, 5, -0.5, 21, 23, ["100 metres Freestyle", "200 metres Freestyle",
+                 "400 metres Freestyle", "1,500 metres Freestyle", "100 metres Backstroke",
+                 "100 metres Breaststroke", "200 metres Breaststroke", "100 metres Butterfly",
+                 "200 metres Individual Medley", "4 x 100 metres Freestyle Relay"],
+                 ["100 metres Freestyle", "200 metres Freestyle", "800 metres Freestyle",
+                  "100 metres Backstroke", "100 metres Breaststroke", "100 metres Butterfly",
+                  "400 metres Individual Medley", "4 x 100 metres Medley Relay"]),
+    'Shooting': ('Summer', 1, 0, 1.5, 34, 11, ["Free Pistol, 50 metres", "Small-Bore Rifle, Prone, 50 metres",
+                 "Trap", "Skeet", "Air Rifle, 10 metres", "Rapid-Fire Pistol, 25 metres"],
+                 ["Air Rifle, 10 metres", "Air Pistol, 10 metres", "Trap", "Skeet"]),
+    'Cycling': ('Summer', 1, 0, -0.5, 25, 11, ["Road Race, Individual", "Sprint", "1,000 metres Time Trial",
+                "Team Pursuit, 4,000 metres", "Points Race", "Mountainbike, Cross-Country"],
+                ["Road Race, Individual", "Sprint", "Points Race", "Mountainbike, Cross-Country"]),
+    'Fencing': ('Summer', 1, 3, -0.5, 27, 10, ["Foil, Individual", "Foil, Team", "Epee, Individual",
+                "Epee, Team", "Sabre, Individual", "Sabre, Team"],
+                ["Foil, Individual", "Foil, Team", "Epee, Individual", "Sabre, Individual"]),
+    'Wrestling': ('Summer', 1, -3, 2.5, 25, 7, ["Featherweight, Freestyle", "Lightweight, Freestyle",
+                  "Welterweight, Freestyle", "Middleweight, Greco-Roman", "Heavyweight, Greco-Roman",
+                  "Flyweight, Greco-Roman"], ["Featherweight, Freestyle", "Middleweight, Freestyle"]),
+    'Boxing': ('Summer', 1, -2, 0.5, 23, 6, ["Flyweight", "Bantamweight", "Featherweight", "Lightweight",
+               "Welterweight", "Middleweight", "Light-Heavyweight", "Heavyweight"], ["Flyweight", "Lightweight"]),
+    'Weightlifting': ('Summer', 1, -8, 4.0, 25, 4, ["Featherweight", "Lightweight", "Middleweight",
+                      "Heavyweight", "Super-Heavyweight"], ["Flyweight", "Lightweight", "Heavyweight"]),
+    'Judo': ('Summer', 1, -2, 2.0, 25, 4, ["Extra-Lightweight", "Lightweight", "Middleweight",
+             "Heavyweight"], ["Extra-Lightweight", "Lightweight", "Middleweight", "Heavyweight"]),
+    'Taekwondo': ('Summer', 1, 3, 0.0, 23, 1, ["Flyweight", "Featherweight", "Welterweight", "Heavyweight"],
+                  ["Flyweight", "Featherweight", "Welterweight", "Heavyweight"]),
+    'Canoeing': ('Summer', 1, 2, 1.0, 25, 6, ["Kayak Singles, 1,000 metres", "Canadian Singles, 1,000 metres",
+                 "Kayak Doubles, 500 metres"], ["Kayak Singles, 500 metres", "Kayak Doubles, 500 metres"]),
+    'Equestrianism': ('Summer', 1, 0, 0.0, 33, 6, ["Dressage, Individual", "Jumping, Individual",
+                      "Three-Day Event, Individual"], ["Dressage, Individual", "Jumping, Individual"]),
+    'Tennis': ('Summer', 1, 4, -0.5, 25, 3, ["Singles", "Doubles"], ["Singles", "Doubles"]),
+    'Table Tennis': ('Summer', 1, -2, -0.5, 26, 2, ["Singles", "Doubles"], ["Singles", "Doubles"]),
+    'Badminton': ('Summer', 1, 0, -1.0, 25, 2, ["Singles", "Doubles"], ["Singles", "Doubles"]),
+    'Archery': ('Summer', 1, 0, 0.5, 28, 2, ["Individual"], ["Individual"]),
+    'Diving': ('Summer', 1, -6, -0.5, 22, 3, ["Springboard", "Platform"], ["Springboard", "Platform"]),
+    'Triathlon': ('Summer', 1, 0, -1.5, 28, 1, ["Olympic Distance"], ["Olympic Distance"]),
+    'Modern Pentathlon': ('Summer', 1, 1, -0.5, 26, 1, ["Individual"], ["Individual"]),
+    'Art Competitions': ('Summer', 1, 0, 0.5, 46, 2, ["Painting, Unknown Event", "Architecture, Designs"],
+                         ["Painting, Unknown Event"]),
+    'Rowing': ('Summer', 9, 10, 0.5, 25, 10, ["Coxed Eights"], ["Coxed Eights"]),
+    'Football': ('Summer', 18, 2, 0.5, 24, 6, ["Football"], ["Football"]),
+    'Hockey': ('Summer', 16, 0, 0.0, 25, 5, ["Hockey"], ["Hockey"]),
+    'Basketball': ('Summer', 12, 18, -0.5, 25, 5, ["Basketball"], ["Basketball"]),
+    'Handball': ('Summer', 14, 8, 1.0, 26, 4, ["Handball"], ["Handball"]),
+    'Water Polo': ('Summer', 13, 7, 1.0, 26, 4, ["Water Polo"], ["Water Polo"]),
+    'Volleyball': ('Summer', 12, 16, -1.0, 26, 3, ["Volleyball"], ["Volleyball"]),
+    'Beach Volleyball': ('Summer', 2, 12, -0.5, 28, 1, ["Beach Volleyball"], ["Beach Volleyball"]),
+    'Sailing': ('Summer', 3, 2, 0.5, 30, 5, ["Three Person Keelboat", "Two Person Dinghy"],
+                ["Two Person Dinghy"]),
+    'Synchronized Swimming': ('Summer', 8, -2, -1.5, 22, 1, [], ["Team"]),
+    'Tug-Of-War': ('Summer', 8, 3, 3.0, 29, 0.3, ["Tug-Of-War"], []),
+    'Cross Country Skiing': ('Winter', 1, -1, -1.0, 26, 10, ["15 kilometres", "50 kilometres",
+                             "Sprint", "4 x 10 kilometres Relay"], ["10 kilometres", "30 kilometres", "Sprint"]),
+    'Alpine Skiing': ('Winter', 1, 0, 0.5, 24, 10, ["Downhill", "Super G", "Giant Slalom", "Slalom",
+                      "Combined"], ["Downhill", "Super G", "Giant Slalom", "Slalom", "Combined"]),
+    'Speed Skating': ('Winter', 1, 1, 0.0, 24, 7, ["500 metres", "1,000 metres", "1,500 metres",
+                      "5,000 metres", "10,000 metres"], ["500 metres", "1,000 metres", "1,500 metres",
+                                                         "3,000 metres"]),
+    'Biathlon': ('Winter', 1, 0, -0.5, 27, 5, ["10 kilometres Sprint", "20 kilometres", "Relay"],
+                 ["7.5 kilometres Sprint", "15 kilometres"]),
+    'Figure Skating': ('Winter', 1, -4, -1.5, 22, 3, ["Singles", "Pairs"], ["Singles", "Pairs", "Ice Dancing"]),
+    'Ski Jumping': ('Winter', 1, 0, -2.5, 23, 2, ["Normal Hill, Individual", "Large Hill, Individual"],
+                    ["Normal Hill, Individual"]),
+    'Luge': ('Winter', 1, 0, 1.0, 25, 2, ["Singles", "Doubles"], ["Singles"]),
+    'Short Track Speed Skating': ('Winter', 1, -3, -0.5, 22, 2, ["500 metres", "1,500 metres"],
+                                  ["500 metres", "1,500 metres"]),
+    'Ice Hockey': ('Winter', 22, 3, 1.5, 26, 8, ["Ice Hockey"], ["Ice Hockey"]),
+    'Bobsleigh': ('Winter', 4, 4, 3.0, 28, 4, ["Four", "Two"], ["Two"]),
+    'Curling': ('Winter', 5, 0, 2.0, 32, 1, ["Curling"], ["Curling"]),
+}
+
+FIRST_NAMES = {
+    'M': ['John', 'Michael', 'Jean', 'Hans', 'Giovanni', 'Carlos', 'Ivan', 'Wei', 'Hiroshi', 'Lars',
+          'Pierre', 'José', 'Ahmed', 'Jan', 'Peter', 'Andrzej', 'István', 'Nguyen', 'Kim', 'Erik',
+          'David', 'Robert', 'Paul', 'Karl', 'Luis', 'Sergey', 'Thomas', 'Mario', 'Anders', 'Kenji'],
+    'F': ['Mary', 'Anna', 'Maria', 'Elena', 'Marie', 'Li', 'Yuki', 'Ingrid', 'Olga', 'Sarah',
+          'Elisabeth', 'Katarina', 'Laura', 'Helen', 'Natalia', 'Ewa', 'Agnes', 'Thi', 'Ji-Yeon', 'Kirsten',
+          'Susan', 'Monica', 'Claudia', 'Irina', 'Julia', 'Sofia', 'Emma', 'Christine', 'Ana', 'Lena'],
+}
+NICKNAMES = {'M': ['Jack', 'Bob', 'Bill', 'Mike', 'Johnny', 'Tom', 'Charlie', 'Sam', 'Ted', 'Nick'],
+             'F': ['Mary', 'Kate', 'Betty', 'Annie', 'Liz', 'Sue', 'Nina', 'Lily', 'Molly', 'Jenny']}
+SYLLABLES = ['an', 'ber', 'ko', 'son', 'ma', 'ri', 'vic', 'len', 'to', 'sch', 'ova', 'ne', 'dal', 'gu',
+             'ez', 'lin', 'tan', 'ska', 'mi', 'ha', 'ro', 'ler', 'vas', 'dé', 'wa', 'ki', 'ström', 'ch',
+             'ien', 'berg', 'ov', 'ic', 'mann', 'et', 'ra', 'di']
+
+# Nhãn huy chương sai hay gặp (xem MEDAL_LABEL_FIXES trong data_cleaning)
+BAD_MEDAL_LABELS = {'Gold': ['gold', 'Gold '], 'Silver': ['SILVER'], 'Bronze': ['BRONZE']}
+
+# Tỉ lệ thiếu dữ liệu gốc (kỳ gần đây) và ở các kỳ đầu tiên
+NAN_RATES = {'Age': (0.01, 0.15), 'Height': (0.05, 0.75), 'Weight': (0.06, 0.78)}
+
+
+def _build_tables(rng):
+    """Dựng các bảng tra (kỳ, NOC, môn, nội dung) dùng chung cho mọi khúc."""
+    games = pd.DataFrame(GAMES, columns=['Year', 'Season', 'City'])
+    games['Games'] = games['Year'].astype(str) + ' ' + games['Season']
+    summer = games['Season'] == 'Summer'
+    # Số VĐV tăng dần theo năm; mùa Đông ít hơn nhiều
+    size = np.where(summer, 13000 * ((games['Year'] - 1880) / 136) ** 1.5,
+                    4500 * ((games['Year'] - 1916) / 98) ** 1.3)
+    size *= [BOYCOTT_FACTOR.get((y, s), 1.0) for y, s in zip(games['Year'], games['Season'])]
+    games['weight'] = size / size.sum()
+    # Tỉ lệ nữ: ~0 năm 1896 tăng lên ~45% năm 2016
+    games['female'] = 0.45 * ((games['Year'] - 1896) / 120).clip(0, 1) ** 1.6
+
+    extra = [(f"X{i:02d}", f"Country {i}") for i in range(N_NOCS - len(MAJOR_NOCS))]
+    nocs = pd.DataFrame(MAJOR_NOCS + extra, columns=['NOC', 'Team'])
+    rank = np.arange(1, len(nocs) + 1)
+    nocs['weight'] = (1 / rank ** 1.1) / (1 / rank ** 1.1).sum()
+
+    sports = pd.DataFrame([(name, *spec[:6]) for name, spec in SPORTS.items()],
+                          columns=['Sport', 'Season', 'team_size', 'height_shift', 'bmi_shift',
+                                   'age_mean', 'popularity'])
+    # Nội dung thi đấu: trải phẳng theo (môn, giới tính) -> [offset, offset + count)
+    events, offsets, counts = [], np.zeros((len(sports), 2), int), np.zeros((len(sports), 2), int)
+    for i, (name, spec) in enumerate(SPORTS.items()):
+        for sex_code, (label, names) in enumerate([("Men's", spec[6]), ("Women's", spec[7])]):
+            if not names:  # Môn chỉ có 1 giới: dùng nội dung của giới còn lại
+                label, names = ("Women's", spec[7]) if sex_code == 0 else ("Men's", spec[6])
+            offsets[i, sex_code] = len(events)
+            counts[i, sex_code] = len(names)
+            events.extend(f"{name} {label} {event}" for event in names)
+    return games, nocs, sports, np.array(events, dtype=object), offsets, counts
+
+
+def _random_names(rng, sex, n):
+    """Tên VĐV: Tên + Họ ghép âm tiết (đủ đa dạng như dữ liệu thật), 1 phần có biệt danh."""
+    first = np.where(sex == 'M', rng.choice(FIRST_NAMES['M'], n), rng.choice(FIRST_NAMES['F'], n))
+    n_syllables = rng.integers(2, 4, n)
+    parts = rng.choice(SYLLABLES, (n, 3))
+    last = np.array([''.join(p[:k]).capitalize() for p, k in zip(parts, n_syllables)], dtype=object)
+    names = first.astype(object) + ' ' + last
+    # ~2% biệt danh trong ngoặc kép, ~1% trong ngoặc đơn
+    style = rng.random(n)
+    nick = np.where(sex == 'M', rng.choice(NICKNAMES['M'], n), rng.choice(NICKNAMES['F'], n)).astype(object)
+    quoted = style < 0.02
+    parens = (style >= 0.02) & (style < 0.03)
+    names[quoted] = first[quoted].astype(object) + ' "' + nick[quoted] + '" ' + last[quoted]
+    names[parens] = first[parens].astype(object) + ' (' + nick[parens] + ') ' + last[parens]
+    return names
+
+
+def generate_chunk(rng, tables, n_rows, first_id, nan_scale=1.0, bad_label_rate=0.01,
+                   outlier_rate=0.002, duplicate_rate=0.005):
+    """Sinh 1 khúc n_rows dòng, ID VĐV bắt đầu từ first_id. Trả về (DataFrame, ID kế tiếp)."""
+    games, nocs, sports, events, ev_offsets, ev_counts = tables
+
+    # 1. Sinh các "lượt thi": 1 VĐV cá nhân (có thể thi nhiều nội dung) hoặc 1 đội
+    n_entries = max(n_rows // 2, 1)
+    g = rng.choice(len(games), n_entries, p=games['weight'].to_numpy())
+    season = games['Season'].to_numpy()[g]
+    female = rng.random(n_entries) < games['female'].to_numpy()[g]
+    s = np.empty(n_entries, dtype=int)
+    for name in ('Summer', 'Winter'):
+        pick = season == name
+        candidates = np.flatnonzero(sports['Season'].to_numpy() == name)
+        p = sports['popularity'].to_numpy()[candidates]
+        s[pick] = rng.choice(candidates, pick.sum(), p=p / p.sum())
+    team_size = sports['team_size'].to_numpy()[s]
+    is_team = team_size > 1
+    n_events = np.where(is_team, 1, np.minimum(rng.geometric(0.6, n_entries), 4))
+    rows_per_entry = np.where(is_team, team_size, n_events)
+    # Chỉ giữ đủ số lượt thi để vượt n_rows dòng
+    keep = np.searchsorted(np.cumsum(rows_per_entry), n_rows) + 1
+    g, female, s, is_team, rows_per_entry = g[:keep], female[:keep], s[:keep], is_team[:keep], rows_per_entry[:keep]
+    n_entries = len(g)
+
+    sex_code = female.astype(int)
+    event_base = rng.integers(0, 1 << 30, n_entries)
+    noc = rng.choice(len(nocs), n_entries, p=nocs['weight'].to_numpy())
+    # ~12% lượt thi có huy chương (môn đồng đội: cả đội cùng huy chương)
+    medal = np.where(rng.random(n_entries) < 0.12, rng.integers(0, 3, n_entries), -1)
+    # Đội đôi/ba/bốn (bobsleigh, thuyền buồm, bóng chuyền bãi biển...) đôi khi có 2 đội cùng đoàn
+    team_suffix = np.where(is_team & (rows_per_entry <= 4) & (rng.random(n_entries) < 0.15),
+                           rng.integers(1, 3, n_entries), 0)
+
+    # 2. Trải lượt thi ra từng dòng
+    entry = np.repeat(np.arange(n_entries), rows_per_entry)
+    position = np.arange(len(entry)) - np.repeat(np.cumsum(rows_per_entry) - rows_per_entry, rows_per_entry)
+    entry, position = entry[:n_rows], position[:n_rows]
+    n = len(entry)
+
+    # 3. VĐV: môn cá nhân 1 VĐV / lượt thi (nhiều nội dung), môn đồng đội mỗi thành viên 1 VĐV
+    athlete_key = np.where(is_team[entry], np.arange(n) + n_entries, entry)
+    athlete_key, athlete = np.unique(athlete_key, return_inverse=True)
+    n_athletes = len(athlete_key)
+    first_row = np.zeros(n_athletes, dtype=int)
+    first_row[athlete[::-1]] = np.arange(n)[::-1]
+    a_entry = entry[first_row]
+    a_sport = s[a_entry]
+    a_sex = np.where(female[a_entry], 'F', 'M')
+    a_female = female[a_entry]
+    height = np.where(a_female, rng.normal(168, 7.5, n_athletes), rng.normal(179, 8, n_athletes))
+    height += sports['height_shift'].to_numpy()[a_sport]
+    bmi = rng.normal(22.5, 2.0, n_athletes) - a_female * 1.3 + sports['bmi_shift'].to_numpy()[a_sport]
+    weight = bmi * (height / 100) ** 2
+    age = rng.normal(sports['age_mean'].to_numpy()[a_sport], 4.5, n_athletes).clip(12, 72)
+    names = _random_names(rng, a_sex, n_athletes)
+    # Thiếu số đo theo từng VĐV (mọi dòng của VĐV cùng thiếu), nhiều hơn ở các kỳ đầu
+    era = ((2016 - games['Year'].to_numpy()[g[a_entry]]) / 120) ** 2
+    measures = {'Age': np.round(age), 'Height': np.round(height), 'Weight': np.round(weight * 2) / 2}
+    for col, (recent, early) in NAN_RATES.items():
+        rate = np.clip((recent + (early - recent) * era) * nan_scale, 0, 1)
+        measures[col][rng.random(n_athletes) < rate] = np.nan
+
+    # 4. Ghép bảng
+    event_idx = (ev_offsets[s[entry], sex_code[entry]] +
+                 (event_base[entry] + np.where(is_team[entry], 0, position)) % ev_counts[s[entry], sex_code[entry]])
+    team = nocs['Team'].to_numpy()[noc[entry]].astype(object)
+    suffix = team_suffix[entry]
+    team[suffix > 0] = team[suffix > 0] + '-' + suffix[suffix > 0].astype(str)
+    medal_labels = np.array(['Gold', 'Silver', 'Bronze', None], dtype=object)
+    df = pd.DataFrame({
+        'ID': first_id + athlete,
+        'Name': names[athlete],
+        'Sex': a_sex[athlete],
+        'Age': measures['Age'][athlete],
+        'Height': measures['Height'][athlete],
+        'Weight': measures['Weight'][athlete],
+        'Team': team,
+        'NOC': nocs['NOC'].to_numpy()[noc[entry]],
+        'Games': games['Games'].to_numpy()[g[entry]],
+        'Year': games['Year'].to_numpy()[g[entry]],
+        'Season': games['Season'].to_numpy()[g[entry]],
+        'City': games['City'].to_numpy()[g[entry]],
+        'Sport': sports['Sport'].to_numpy()[s[entry]],
+        'Event': events[event_idx],
+        'Medal': medal_labels[medal[entry]],
+    })
+
+    # 5. Dữ liệu "bẩn": ngoại lai, nhãn sai, dòng trùng
+    for col, (low, high) in {'Age': (70, 97), 'Height': (226, 260), 'Weight': (180, 250)}.items():
+        hit = rng.random(n) < outlier_rate
+        df.loc[hit, col] = rng.integers(low, high, hit.sum())
+    medal_rows = np.flatnonzero(df['Medal'].notna().to_numpy() & (rng.random(n) < bad_label_rate))
+    for label, bad in BAD_MEDAL_LABELS.items():
+        rows = medal_rows[df['Medal'].to_numpy()[medal_rows] == label]
+        df.loc[df.index[rows], 'Medal'] = rng.choice(bad, len(rows))
+    dup = np.flatnonzero(rng.random(n) < duplicate_rate)
+    dup = dup[dup > 0]
+    df.iloc[dup] = df.iloc[dup - 1].to_numpy()  # Dòng trùng y hệt dòng liền trước
+
+    df['Age'] = df['Age'].astype('Int64')
+    df['Height'] = df['Height'].astype('Int64')
+    return df, first_id + n_athletes
+
+
+def generate(output, rows, seed=42, chunk_rows=500_000, nan_scale=1.0, bad_label_rate=0.01,
+             outlier_rate=0.002, duplicate_rate=0.005, verbose=True):
+    """Ghi 'rows' dòng dữ liệu giả lập ra file CSV 'output', mỗi lần 1 khúc 'chunk_rows' dòng."""
+    rng = np.random.default_rng(seed)
+    tables = _build_tables(rng)
+    folder = os.path.dirname(os.path.abspath(output))
+    os.makedirs(folder, exist_ok=True)
+    start = time.perf_counter()
+    written, next_id = 0, 1
+    while True:
+        df, next_id = generate_chunk(rng, tables, min(chunk_rows, rows - written), next_id, nan_scale,
+                                     bad_label_rate, outlier_rate, duplicate_rate)
+        df.to_csv(output, mode="w" if written == 0 else "a", header=(written == 0),
+                  index=False, columns=COLUMNS, na_rep="NA")
+        written += len(df)
+        if verbose:
+            print(f"   {written:,}/{rows:,} dòng ({time.perf_counter() - start:.1f}s)")
+        if written >= rows:
+            break
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu giả lập athlete_events.csv.")
+    parser.add_argument("--rows", type=int, required=True, help="Số dòng cần sinh")
+    parser.add_argument("--output", required=True, help="File CSV đầu ra")
+    parser.add_argument("--seed", type=int, default=42, help="Hạt giống ngẫu nhiên (cùng seed = cùng dữ liệu)")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Số dòng mỗi khúc ghi ra file")
+    parser.add_argument("--nan-scale", type=float, default=1.0, help="Hệ số nhân tỉ lệ thiếu Age/Height/Weight")
+    parser.add_argument("--bad-label-rate", type=float, default=0.01,
+                        help="Tỉ lệ huy chương bị ghi sai nhãn ('gold', 'SILVER'...)")
+    parser.add_argument("--outlier-rate", type=float, default=0.002, help="Tỉ lệ giá trị ngoại lai mỗi cột số")
+    parser.add_argument("--duplicate-rate", type=float, default=0.005, help="Tỉ lệ dòng trùng lặp")
+    args = parser.parse_args()
+    generate(args.output, args.rows, args.seed, args.chunk_rows, args.nan_scale,
+             args.bad_label_rate, args.outlier_rate, args.duplicate_rate)
+
+
+if __name__ == "__main__":
+    main()
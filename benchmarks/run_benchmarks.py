@@ -0,0 +1,382 @@
+"""
+Đo hiệu năng từng bước của pipeline trên dữ liệu nhân bản 1x / 10x / 50x.
+
+Mỗi bước (đọc, làm sạch, làm sạch Team/Event/Nickname, từng hàm phân tích, bộ lọc, từng biểu đồ,
+xuất Excel) được đo:
+- thời gian: chạy 'repeat' lần, ghi lại từng lần, nhỏ nhất và trung vị
+- bộ nhớ: đỉnh cấp phát (tracemalloc) trong 1 lần chạy riêng, không tính vào thời gian
+- kết quả: mã băm nội dung đầu ra (số thực làm tròn 6 chữ số) để phát hiện tối ưu làm đổi kết quả
+
+Cách chạy (từ thư mục gốc dự án):
+    python benchmarks/run_benchmarks.py                          # 1x, 10x, 50x
+    python benchmarks/run_benchmarks.py --scales 1 10 --repeat 5
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/bench_cu.json
+    python benchmarks/run_benchmarks.py --compare cu.json moi.json
+    python benchmarks/run_benchmarks.py --synthetic --scales 1 20   # dữ liệu giả lập, không cần file gốc
+
+--baseline: so sánh ngay với lần chạy trước (thời gian + kết quả có đổi không).
+--compare: chỉ so sánh 2 file kết quả đã có, không chạy lại.
+--synthetic: sinh dữ liệu giả lập (generate_athlete_events.py) thay vì nhân bản file gốc.
+"""
+import argparse
+import contextlib
+import gc
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import modules.data_cleaning as dc  # noqa: E402
+import modules.analysis as ana  # noqa: E402
+import modules.visualization as vis  # noqa: E402
+import modules.cubes as cubes  # noqa: E402
+import modules.memo as memo  # noqa: E402
+import modules.dedup as dedup  # noqa: E402
+from modules.indexing import build_filter_index  # noqa: E402
+from modules.query import FilterQuery  # noqa: E402
+import export_data  # noqa: E402
+from benchmarks.generate_athlete_events import generate  # noqa: E402
+
+DEFAULT_SOURCE = os.path.join(ROOT, "data", "athlete_events.csv")
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Số dòng của athlete_events.csv gốc = 1x khi dùng dữ liệu giả lập
+SYNTHETIC_BASE_ROWS = 271_116
+
+# Tham số cho các hàm phân tích cần thêm đối số ngoài df
+ANALYSIS_ARGS = {'get_country_performance_and_hosts': ('CHN',)}
+
+# Các biểu đồ giống export_data.export_charts
+CHART_FUNCTIONS = ['plot_gender_trend', 'plot_top_medals', 'plot_physical_distribution',
+                   'plot_physical_comparison_by_sport', 'plot_athlete_clustering',
+                   'plot_host_advantage_china', 'plot_geopolitics_impact',
+                   'plot_vietnam_stats', 'plot_vietnam_details']
+
+
+# =============================================================================
+# DỮ LIỆU NHÂN BẢN
+# =============================================================================
+
+def replicate_csv(source, factor, dest):
+    """
+    Ghi file CSV gồm 'factor' bản sao của source. Mỗi bản sao dời ID đi 1 khoảng cố định
+    để không bị drop_duplicates gộp lại (dữ liệu thật sự lớn gấp 'factor' lần sau khi làm sạch).
+    """
+    base = pd.read_csv(source)
+    id_step = int(base['ID'].max()) + 1
+    for k in range(factor):
+        part = base.assign(ID=base['ID'] + k * id_step)
+        part.to_csv(dest, mode="w" if k == 0 else "a", header=(k == 0), index=False)
+    return dest
+
+
+# =============================================================================
+# MÃ BĂM KẾT QUẢ
+# =============================================================================
+
+def _frame_digest(df, sha):
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype.kind == "f":
+            df[col] = df[col].astype("float64").round(6)
+        elif df[col].dtype == object:
+            df[col] = df[col].map(lambda v: repr(v) if isinstance(v, (list, tuple, set)) else v)
+    sha.update(repr([str(c) for c in df.columns]).encode())
+    index = df.index.to_frame(index=False)
+    sha.update(pd.util.hash_pandas_object(index, index=False).to_numpy().tobytes())
+    sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+
+def digest(obj):
+    """Mã băm nội dung đầu ra của 1 bước (DataFrame, Series, Figure, bytes, tuple...)."""
+    sha = hashlib.sha256()
+
+    def feed(value):
+        if isinstance(value, pd.DataFrame):
+            _frame_digest(value, sha)
+        elif isinstance(value, pd.Series):
+            _frame_digest(value.to_frame(), sha)
+        elif isinstance(value, plt.Figure):
+            buffer = io.BytesIO()
+            value.savefig(buffer, format="png", bbox_inches="tight", dpi=150)
+            sha.update(buffer.getvalue())
+        elif isinstance(value, bytes):
+            sha.update(value)
+        elif isinstance(value, (tuple, list)):
+            sha.update(b"(")
+            for item in value:
+                feed(item)
+            sha.update(b")")
+        else:
+            sha.update(repr(value).encode())
+
+    feed(obj)
+    return sha.hexdigest()[:16]
+
+
+def xlsx_content(path):
+    """Nội dung file xlsx trừ docProps (có ngày giờ tạo file) để so sánh giữa các lần chạy."""
+    with zipfile.ZipFile(path) as book:
+        return b"".join(book.read(name) for name in sorted(book.namelist())
+                        if not name.startswith("docProps/"))
+
+
+# =============================================================================
+# ĐO 1 BƯỚC
+# =============================================================================
+
+def _rows(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, tuple) and obj and isinstance(obj[0], (pd.DataFrame, pd.Series)):
+        return len(obj[0])
+    return None
+
+
+def measure(stage, scale, func, rows_in=None, repeat=3, setup=None, check=None):
+    """
+    Đo 1 bước: chạy func() 'repeat' lần để lấy thời gian, thêm 1 lần dưới tracemalloc để lấy
+    đỉnh bộ nhớ. setup(): chạy trước mỗi lần (không tính giờ), vd xóa bộ nhớ đệm.
+    check(kết quả): giá trị dùng để băm (mặc định băm chính kết quả).
+    Trả về (bản ghi kết quả, đầu ra của lần chạy cuối).
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+        if isinstance(result, plt.Figure):
+            plt.close(result)
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    record = {
+        "stage": stage,
+        "scale": scale,
+        "rows_in": rows_in,
+        "rows_out": _rows(result),
+        "seconds": [round(t, 4) for t in times],
+        "best": round(min(times), 4),
+        "median": round(statistics.median(times), 4),
+        "peak_mb": round(peak / 1024 ** 2, 1),
+        "digest": digest(check(result) if check else result),
+    }
+    if isinstance(result, plt.Figure):
+        plt.close(result)
+    print(f"   {stage:<55} {record['best']:9.3f}s  {record['peak_mb']:8.1f} MB  {record['digest']}")
+    return record, result
+
+
+def _fresh_caches():
+    memo.clear_cache()
+    cubes.clear_cache()
+
+
+# =============================================================================
+# CHẠY TOÀN BỘ CÁC BƯỚC CHO 1 KÍCH THƯỚC DỮ LIỆU
+# =============================================================================
+
+def run_scale(csv_path, scale, repeat, full_excel, workdir):
+    print(f"\n=== {scale}x: {csv_path} ===")
+    records = []
+
+    def add(stage, func, rows_in=None, **kwargs):
+        record, result = measure(stage, scale, func, rows_in, repeat, **kwargs)
+        records.append(record)
+        return result
+
+    load = dc.load_data.__wrapped__  # bỏ qua st.cache_data để đo đúng thời gian đọc
+    raw = add("load_data", lambda: load(csv_path))
+    n_raw = len(raw)
+    # Bỏ dòng trùng: pandas (băm từng giá trị) so với dedup (mã số nguyên + np.sort), cùng mã băm kết quả
+    add("dedup.pandas_drop_duplicates", lambda: raw.drop_duplicates(), n_raw)
+    add("dedup.drop_duplicates", lambda: dedup.drop_duplicates(raw), n_raw)
+    clean = add("clean_data", lambda: dc.clean_data(raw.copy()), n_raw)
+    n = len(clean)
+    add("clean_team_name", lambda: dc.clean_team_name(clean), n)
+    add("clean_event_name", lambda: dc.clean_event_name(clean), n)
+    add("extract_nickname", lambda: dc.extract_nickname(clean), n)
+    df = dc.clean_extra_fields(clean)
+
+    # Phân tích: xóa bộ nhớ đệm trước mỗi lần để đo đúng chi phí tính toán,
+    # rồi đo lần gọi lặp lại trên cùng bảng (lấy từ memo): phải rẻ hơn tính trực tiếp và cùng kết quả
+    for func_name in sorted(name for name, func in vars(ana).items()
+                            if name.startswith(('analyze_', 'calculate_', 'get_'))
+                            and getattr(func, '__module__', None) == ana.__name__):
+        func = getattr(ana, func_name)
+        args = ANALYSIS_ARGS.get(func_name, ())
+        add(f"analysis.{func_name}", lambda f=func, a=args: f(df, *a), n, setup=_fresh_caches)
+        if hasattr(func, "cache_info"):
+            direct = records[-1]
+            add(f"analysis.{func_name} (memo hit)", lambda f=func, a=args: f(df, *a), n)
+            hit = records[-1]
+            if hit["best"] >= direct["best"] or hit["digest"] != direct["digest"]:
+                print(f"   [CẢNH BÁO] memo của {func_name}: lấy lại {hit['best']:.4f}s "
+                      f"so với tính trực tiếp {direct['best']:.4f}s"
+                      + ("" if hit["digest"] == direct["digest"] else ", kết quả khác nhau"))
+    add("analysis.filter_data_number", lambda: ana.filter_data_number(df, age=25, height=170, sex='F'), n)
+    add("analysis.filter_data_string", lambda: ana.filter_data_string(df, noc='USA', season='Summer'), n)
+    add("analysis.filter_season_and_year", lambda: ana.filter_season_and_year(df, season='Summer', year=2000), n)
+    index = add("query.build_filter_index", lambda: build_filter_index(df), n,
+                check=lambda idx: idx["year_desc"])
+    add("query.FilterQuery (indexed)",
+        lambda: (FilterQuery(df, index).equal('NOC', 'USA').between('Year', 1960, 2000)
+                 .at_least('Age', 20).frame()), n)
+
+    # Biểu đồ: đo thời gian dựng + ghi PNG như export_charts
+    for func_name in CHART_FUNCTIONS:
+        func = getattr(vis, func_name)
+
+        def render(f=func):
+            fig = f(df)
+            if fig is None:
+                return None
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight", dpi=150)
+            plt.close(fig)
+            return buffer.getvalue()
+        add(f"chart.{func_name}", render, n, setup=_fresh_caches)
+
+    # Xuất Excel với đúng bộ kết quả phân tích như export_data.py (mọi hàm analyze_/calculate_/get_...,
+    # kể cả bảng có cột list như analyze_vietnam_participation)
+    csv_folder = os.path.join(workdir, "csv")
+    os.makedirs(csv_folder, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analysis_results = export_data.run_auto_analysis(df, csv_folder)
+
+    def excel(writer):
+        folder = os.path.join(workdir, "excel")
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        writer(df, analysis_results, folder)
+        if not os.listdir(folder):  # Lỗi bị bắt và chỉ in ra bên trong writer
+            raise RuntimeError(f"{writer.__name__} không ghi được file Excel")
+        return xlsx_content(os.path.join(folder, os.listdir(folder)[0]))
+    add("export.create_excel_report", lambda: excel(export_data.create_excel_report), n)
+    if full_excel:
+        add("export.create_excel_report_streaming",
+            lambda: excel(export_data.create_excel_report_streaming), n)
+    return records
+
+
+# =============================================================================
+# SO SÁNH 2 LẦN CHẠY
+# =============================================================================
+
+def compare(old, new):
+    """In bảng so sánh thời gian và kết quả giữa 2 lần chạy. Trả về số bước có kết quả bị đổi."""
+    old_records = {(r["stage"], r["scale"]): r for r in old["results"]}
+    changed = 0
+    print(f"\n{'Bước':<55} {'x':>3} {'cũ (s)':>9} {'mới (s)':>9} {'tỉ lệ':>7}  kết quả")
+    for record in new["results"]:
+        key = (record["stage"], record["scale"])
+        before = old_records.get(key)
+        if before is None:
+            print(f"{record['stage']:<55} {record['scale']:>3} {'-':>9} {record['best']:9.3f} {'-':>7}  mới")
+            continue
+        ratio = record["best"] / before["best"] if before["best"] else float("nan")
+        same = record["digest"] == before["digest"]
+        changed += not same
+        print(f"{record['stage']:<55} {record['scale']:>3} {before['best']:9.3f} {record['best']:9.3f} "
+              f"{ratio:6.2f}x  {'giữ nguyên' if same else 'THAY ĐỔI'}")
+    if changed:
+        print(f"\n[CẢNH BÁO] {changed} bước cho kết quả khác lần chạy trước!")
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo hiệu năng pipeline Olympic theo kích thước dữ liệu.")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="File CSV gốc (1x)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50],
+                        help="Các hệ số nhân bản dữ liệu (mặc định 1 10 50)")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần chạy mỗi bước để lấy thời gian")
+    parser.add_argument("--full-excel", action="store_true",
+                        help="Đo thêm báo cáo Excel đầy đủ (ghi theo luồng, chậm với dữ liệu lớn)")
+    parser.add_argument("--output", default=None, help="File JSON kết quả")
+    parser.add_argument("--baseline", default=None, help="File JSON của lần chạy trước để so sánh")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Chỉ so sánh 2 file kết quả có sẵn")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Dùng dữ liệu giả lập (mỗi 1x = %d dòng) thay vì nhân bản --source" % SYNTHETIC_BASE_ROWS)
+    parser.add_argument("--seed", type=int, default=42, help="Hạt giống cho dữ liệu giả lập")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f_old, open(args.compare[1], encoding="utf-8") as f_new:
+            sys.exit(1 if compare(json.load(f_old), json.load(f_new)) else 0)
+
+    if not args.synthetic and not os.path.exists(args.source):
+        print(f"[LỖI] Không tìm thấy file '{args.source}'")
+        sys.exit(1)
+
+    workdir = tempfile.mkdtemp(prefix="olympic_bench_")
+    results = []
+    try:
+        for scale in args.scales:
+            csv_path = args.source
+            if args.synthetic:
+                csv_path = generate(os.path.join(workdir, f"synthetic_{scale}x.csv"),
+                                    scale * SYNTHETIC_BASE_ROWS, seed=args.seed, verbose=False)
+            elif scale != 1:
+                csv_path = replicate_csv(args.source, scale, os.path.join(workdir, f"athlete_events_{scale}x.csv"))
+            results.extend(run_scale(csv_path, scale, args.repeat, args.full_excel, workdir))
+            if csv_path != args.source:
+                os.remove(csv_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "source": f"synthetic(seed={args.seed})" if args.synthetic else os.path.abspath(args.source),
+            "scales": args.scales,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nĐã lưu kết quả: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            sys.exit(1 if compare(json.load(f), report) else 0)
+
+
+if __name__ == "__main__":
+    main()
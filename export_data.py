@@ -1,21 +1,33 @@
+import numpy as np
 import pandas as pd
 import os
 import inspect
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
 from datetime import datetime
 import modules.data_cleaning as dc
 import modules.analysis as ana
-import visualization as vis
+import modules.visualization as vis
+import modules.memo as memo
+import modules.parallel as parallel
+import modules.tracing as tracing
+import modules.chart_cache as chart_cache
+import modules.incremental as incremental
 
 # --- CẤU HÌNH ---
 INPUT_FILE_PATH = 'data/athlete_events.csv'
 BASE_OUTPUT_DIR = 'output'
+# File trace JSON-lines (mỗi dòng = 1 bước, các lần chạy ghi nối, phân biệt bằng trường 'run')
+TRACE_FILE_PATH = os.path.join(BASE_OUTPUT_DIR, 'trace.jsonl')
 
 # =============================================================================
 # PHẦN 1: CÁC HÀM TIỆN ÍCH HỆ THỐNG
 # =============================================================================
 
 
+@tracing.traced()
 def setup_directories():
     """Tạo cấu trúc thư mục đầu ra ngăn nắp."""
     dirs = {
@@ -63,10 +75,41 @@ def save_dataframe_to_csv(data, filename, folder):
 # =============================================================================
 
 
-def run_auto_analysis(df, output_csv_dir):
+def _run_analysis_function(func_name, df):
+    """Chạy 1 hàm phân tích, trả về (tên hàm, kết quả, lỗi, bản ghi trace)."""
+    result, error = None, None
+    try:
+        with tracing.stage(f"analysis.{func_name}", rows_in=len(df)) as entry:
+            result = getattr(ana, func_name)(df)
+            entry["rows_out"] = tracing.count_rows(result)
+    except TypeError:
+        error = TypeError  # Hàm yêu cầu tham số phức tạp
+    except Exception as e:
+        error = e
+    return func_name, result, error, entry
+
+
+def _analysis_worker(func_name):
+    """Tác vụ chạy trong tiến trình con: dùng bảng đã nạp sẵn bởi parallel.init_worker."""
+    return _run_analysis_function(func_name, parallel.worker_frame())
+
+
+def _precomputed_outcome(func_name, result, rows_in):
+    """Kết quả lấy từ bảng tổng hợp đã lưu, cùng dạng với _run_analysis_function."""
+    with tracing.stage(f"analysis.{func_name}", rows_in=rows_in) as entry:
+        entry["source"] = "aggregates"
+        entry["rows_out"] = tracing.count_rows(result)
+    return func_name, result, None, entry
+
+
+def run_auto_analysis(df, output_csv_dir, workers=1, shared_path=None, precomputed=None):
     """
     Quét toàn bộ file analysis.py và chạy mọi hàm bắt đầu bằng 
     'analyze_', 'calculate_', 'get_'.
+    workers > 1: chạy song song trên nhiều tiến trình, bảng dữ liệu chỉ được chia sẻ 1 lần
+    (file Arrow memory-map, xem modules/parallel.py). Kết quả vẫn theo đúng thứ tự như khi chạy tuần tự.
+    shared_path: file dữ liệu đã chia sẻ sẵn (parallel.share_frame), không có thì tự tạo.
+    precomputed: {tên hàm: kết quả} đã có sẵn (vd: incremental.stored_tables), các hàm này không chạy lại.
     """
     print("\n--- ĐANG CHẠY TỰ ĐỘNG CÁC HÀM PHÂN TÍCH ---")
 
@@ -77,27 +120,59 @@ def run_auto_analysis(df, output_csv_dir):
 
     valid_prefixes = ('analyze_', 'calculate_', 'get_', 'count_', 'sum_')
 
-    for func_name, func_obj in functions_list:
-        # Chỉ chạy các hàm thuộc module analysis (tránh hàm import)
-        if func_obj.__module__ == ana.__name__ and func_name.startswith(valid_prefixes):
-            try:
-                # Gọi hàm
-                result = func_obj(df)
-
-                if result is not None:
-                    # 1. Lưu vào dict tổng hợp
-                    results_dict[func_name] = result
-
-                    # 2. Xuất ra file CSV riêng lẻ
-                    save_dataframe_to_csv(
-                        result, f"{func_name}.csv", output_csv_dir)
-                else:
-                    print(f"   [SKIP] Hàm '{func_name}' trả về dữ liệu rỗng.")
-
-            except TypeError:
-                pass  # Bỏ qua các hàm yêu cầu tham số phức tạp
-            except Exception as e:
-                print(f"   [WARN] Lỗi khi chạy '{func_name}': {e}")
+    # Chỉ chạy các hàm thuộc module analysis (tránh hàm import)
+    all_names = [func_name for func_name, func_obj in functions_list
+                 if func_obj.__module__ == ana.__name__ and func_name.startswith(valid_prefixes)]
+    precomputed = precomputed or {}
+    func_names = [func_name for func_name in all_names if func_name not in precomputed]
+
+    wall_start = time.perf_counter()
+    if workers > 1 and len(func_names) > 1:
+        print(f"   (Chạy song song với {workers} tiến trình)")
+        own_share = shared_path is None
+        if own_share:
+            shared_path = parallel.share_frame(df)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=parallel.init_worker,
+                                     initargs=(shared_path,)) as pool:
+                # map giữ nguyên thứ tự đầu vào dù hàm nào chạy xong trước
+                outcomes = list(pool.map(_analysis_worker, func_names))
+        finally:
+            if own_share:
+                parallel.release_frame(shared_path)
+        for outcome in outcomes:
+            tracing.record(outcome[3])  # Bản ghi đo trong tiến trình con
+    else:
+        outcomes = [_run_analysis_function(func_name, df) for func_name in func_names]
+    # Ghép kết quả có sẵn vào đúng vị trí của hàm tương ứng
+    ran = dict(zip(func_names, outcomes))
+    outcomes = [ran[func_name] if func_name in ran
+                else _precomputed_outcome(func_name, precomputed[func_name], len(df))
+                for func_name in all_names]
+    wall_time = time.perf_counter() - wall_start
+
+    for func_name, result, error, _ in outcomes:
+        if error is TypeError:
+            continue  # Bỏ qua các hàm yêu cầu tham số phức tạp
+        if error is not None:
+            print(f"   [WARN] Lỗi khi chạy '{func_name}': {error}")
+        elif result is not None:
+            # 1. Lưu vào dict tổng hợp
+            results_dict[func_name] = result
+
+            # 2. Xuất ra file CSV riêng lẻ
+            save_dataframe_to_csv(
+                result, f"{func_name}.csv", output_csv_dir)
+        else:
+            print(f"   [SKIP] Hàm '{func_name}' trả về dữ liệu rỗng.")
+
+    # Bảng thời gian chạy từng hàm (chậm nhất lên đầu)
+    print("   Thời gian chạy từng hàm:")
+    for func_name, _, error, entry in sorted(outcomes, key=lambda o: -o[3]["wall_s"]):
+        if error is not TypeError:
+            source = " (bảng tổng hợp đã lưu)" if entry.get("source") == "aggregates" else ""
+            print(f"      {func_name:<45} {entry['wall_s']:8.3f}s{source}")
+    print(f"      {'TỔNG (thời gian thực)':<45} {wall_time:8.3f}s")
 
     return results_dict
 
@@ -117,7 +192,7 @@ def create_excel_report(df_clean, analysis_results, output_dir):
     try:
         with pd.ExcelWriter(full_path, engine='openpyxl') as writer:
             # Sheet 1: Dữ liệu gốc (Top 50 dòng)
-            df_clean.head(50).to_excel(
+            dc.widen_float_columns(df_clean.head(50)).to_excel(
                 writer, sheet_name='Top 50 Data', index=False)
 
             # Các Sheet phân tích
@@ -137,13 +212,177 @@ def create_excel_report(df_clean, analysis_results, output_dir):
     except Exception as e:
         print(f"   [LỖI EXCEL] {e}")
 
+# Giới hạn số dòng của 1 sheet Excel (tính cả dòng tiêu đề)
+EXCEL_MAX_ROWS = 1_048_576
+
+
+class _StreamingWorkbook:
+    """
+    Ghi file Excel theo từng dòng, không dựng cả workbook trong bộ nhớ:
+    - XlsxWriter (constant_memory): mỗi dòng ghi xong được đẩy ra file tạm ngay
+    - Không có XlsxWriter: openpyxl chế độ write-only
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            import xlsxwriter
+            self.book = xlsxwriter.Workbook(path, {'constant_memory': True,
+                                                   'nan_inf_to_errors': True})
+            self.engine = 'xlsxwriter'
+        except ImportError:
+            from openpyxl import Workbook
+            self.book = Workbook(write_only=True)
+            self.engine = 'openpyxl'
+
+    def add_sheet(self, name):
+        """Tạo sheet mới, trả về hàm ghi nối 1 dòng (list giá trị) vào cuối sheet."""
+        if self.engine == 'xlsxwriter':
+            sheet = self.book.add_worksheet(name)
+            position = {"row": 0}
+
+            def append(values):
+                sheet.write_row(position["row"], 0, values)
+                position["row"] += 1
+            return append
+        return self.book.create_sheet(name).append
+
+    def close(self):
+        if self.engine == 'xlsxwriter':
+            self.book.close()
+        else:
+            self.book.save(self.path)
+
+
+def _excel_value(value):
+    """Ô không phải giá trị đơn (list, tuple, set, dict, mảng) -> chuỗi, vì writer Excel chỉ ghi được giá trị đơn."""
+    if isinstance(value, dict):
+        return ", ".join(f"{key}: {item}" for key, item in value.items())
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return ", ".join(map(str, value))
+    return value
+
+
+def _excel_rows(data, chunksize=50_000):
+    """
+    Sinh từng dòng của data (giá trị Python, NA -> ô trống), chỉ chuyển đổi từng khúc 'chunksize' dòng.
+    Cột float32 được đổi sang float64 (dc.widen_float_columns). Cột object có thể chứa list (vd: Sports_List của analyze_vietnam_participation) -> ghép thành chuỗi.
+    """
+    object_columns = [i for i, dtype in enumerate(data.dtypes) if dtype == object]
+    for start in range(0, len(data), chunksize):
+        # float32 -> float64 đúng giá trị như CSV, không thì ô Excel hiện 179.600006 thay vì 179.6
+        part = dc.widen_float_columns(data.iloc[start:start + chunksize]).astype(object)
+        for i in object_columns:
+            part.isetitem(i, part.iloc[:, i].map(_excel_value))
+        part = part.where(part.notna(), None)
+        yield from part.itertuples(index=False, name=None)
+
+
+def write_table_streaming(workbook, data, sheet_name, max_rows=EXCEL_MAX_ROWS, chunksize=50_000):
+    """
+    Ghi cả bảng data vào workbook theo từng khúc. Vượt quá max_rows dòng (giới hạn của Excel)
+    thì tự tách sang sheet tiếp theo: 'Tên', 'Tên (2)', 'Tên (3)'...; mỗi sheet đều có dòng tiêu đề.
+    Trả về số sheet đã tạo.
+    """
+    header = [str(col) for col in data.columns]
+    rows_per_sheet = max_rows - 1
+    n_sheets = 0
+    append, written = None, rows_per_sheet
+    for values in _excel_rows(data, chunksize):
+        if written == rows_per_sheet:
+            n_sheets += 1
+            suffix = "" if n_sheets == 1 else f" ({n_sheets})"
+            append = workbook.add_sheet(sheet_name[:31 - len(suffix)] + suffix)
+            append(header)
+            written = 0
+        append(values)
+        written += 1
+    if n_sheets == 0:  # Bảng rỗng: vẫn có sheet với dòng tiêu đề
+        workbook.add_sheet(sheet_name[:31])(header)
+        n_sheets = 1
+    return n_sheets
+
+
+def create_excel_report_streaming(df_clean, analysis_results, output_dir, max_rows=EXCEL_MAX_ROWS):
+    """
+    Báo cáo Excel đầy đủ: TOÀN BỘ dữ liệu đã làm sạch + các sheet phân tích.
+    Ghi từng dòng bằng writer constant-memory nên bộ nhớ gần như không tăng theo kích thước dữ liệu.
+    Trả về đường dẫn file đã ghi, None nếu lỗi.
+    """
+    print("\n--- ĐANG TẠO BÁO CÁO EXCEL ĐẦY ĐỦ (GHI THEO LUỒNG) ---")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    filename = f"Olympic_Full_Report_{timestamp}.xlsx"
+    full_path = os.path.join(output_dir, filename)
+
+    try:
+        workbook = _StreamingWorkbook(full_path)
+        n_sheets = write_table_streaming(workbook, df_clean, 'Cleaned Data', max_rows=max_rows)
+
+        # Các Sheet phân tích (cùng quy tắc như create_excel_report)
+        for func_name, data in analysis_results.items():
+            sheet_name = func_name.replace("analyze_", "").replace(
+                "calculate_", "").replace("get_", "")[:31]
+            if isinstance(data, dict):
+                data = pd.DataFrame(data).reset_index()
+            elif isinstance(data, pd.Series):
+                data = data.reset_index()
+            elif not isinstance(data, pd.DataFrame):
+                continue
+            write_table_streaming(workbook, data, sheet_name, max_rows=max_rows)
+
+        workbook.close()
+        print(f"   [EXCEL] Xuất thành công: {full_path} "
+              f"({len(df_clean)} dòng dữ liệu trên {n_sheets} sheet, {workbook.engine})")
+        return full_path
+    except Exception as e:
+        print(f"   [LỖI EXCEL] {e}")
+        return None
+
 # =============================================================================
 # PHẦN 4: XUẤT BIỂU ĐỒ HÌNH ẢNH (VISUALIZATION)
 # =============================================================================
 
 
-def export_charts(df, output_dir):
-    """Quét và chạy các hàm vẽ trong visualization.py"""
+def _render_chart(func_name, save_path, df, use_cache=True):
+    """
+    Vẽ 1 biểu đồ và ghi ra file PNG. Trả về (đã lưu?, lỗi, bản ghi trace).
+    use_cache: lấy ảnh từ bộ nhớ đệm biểu đồ (modules/chart_cache.py) nếu đã vẽ với cùng dữ liệu,
+    cùng tham số và cùng style (dùng chung với dashboard), chưa có thì vẽ rồi lưu lại.
+    """
+    saved, error = False, None
+    try:
+        with tracing.stage(f"chart.{func_name}", rows_in=len(df)) as entry:
+            func = getattr(vis, func_name)
+            if use_cache:
+                hits = chart_cache.counters()["hits"]
+                image = chart_cache.get_chart(func, df, dpi=150)
+                entry["cache"] = "hit" if chart_cache.counters()["hits"] > hits else "miss"
+            else:
+                image = chart_cache.render(func, df, dpi=150)
+            if image:
+                with open(save_path, "wb") as f:
+                    f.write(image)
+                saved = True
+    except Exception as e:
+        plt.close('all')
+        error = e
+    return saved, error, entry
+
+
+def _chart_worker(func_name, save_path, use_cache):
+    """Tác vụ chạy trong tiến trình con (backend Agg): dùng bảng đã nạp sẵn bởi parallel.init_worker."""
+    return _render_chart(func_name, save_path, parallel.worker_frame(), use_cache)
+
+
+def export_charts(df, output_dir, workers=1, shared_path=None, use_cache=True):
+    """
+    Quét và chạy các hàm vẽ trong visualization.py
+    workers > 1: vẽ song song trên nhiều tiến trình (backend Agg), mỗi tiến trình tự ghi file PNG.
+    use_cache: dùng lại ảnh đã vẽ trong bộ nhớ đệm biểu đồ trên đĩa (chung cho mọi tiến trình).
+    Biểu đồ nào lỗi chỉ bỏ qua biểu đồ đó, các biểu đồ khác vẫn được xuất.
+    shared_path: file dữ liệu đã chia sẻ sẵn (parallel.share_frame), không có thì tự tạo.
+    """
     print("\n--- ĐANG VẼ VÀ XUẤT HÌNH ẢNH ---")
 
     # Định nghĩa các biểu đồ cần vẽ
@@ -158,32 +397,83 @@ def export_charts(df, output_dir):
         (vis.plot_vietnam_stats, "8_VietNam_so_luong_VDV.png"),
         (vis.plot_vietnam_details, "9_VietNam_bang_vang.png")
     ]
-
-    count = 0
-    for func, filename in chart_tasks:
-        if hasattr(vis, func.__name__):
-            try:
-                print(f"   -> Đang vẽ: {filename}...")
-                fig = func(df)
-
-                if fig:
-                    save_path = os.path.join(output_dir, filename)
-                    fig.savefig(save_path, bbox_inches='tight', dpi=150)
-                    plt.close(fig)  # Giải phóng RAM
-                    count += 1
-                else:
-                    print(f"      [SKIP] Hàm {func.__name__} trả về None.")
-            except Exception as e:
-                print(f"      [LỖI CHART] {filename}: {e}")
-
-    print(f"   -> Đã lưu {count} biểu đồ vào thư mục '{output_dir}'.")
+    chart_tasks = [(func.__name__, filename) for func, filename in chart_tasks
+                   if hasattr(vis, func.__name__)]
+
+    wall_start = time.perf_counter()
+    if workers > 1 and len(chart_tasks) > 1:
+        print(f"   (Vẽ song song với {workers} tiến trình)")
+        own_share = shared_path is None
+        if own_share:
+            shared_path = parallel.share_frame(df)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=parallel.init_worker,
+                                     initargs=(shared_path, 'Agg')) as pool:
+                futures = [pool.submit(_chart_worker, func_name, os.path.join(output_dir, filename),
+                                       use_cache)
+                           for func_name, filename in chart_tasks]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as e:  # Tiến trình con bị hỏng giữa chừng
+                        outcomes.append((False, e, {"wall_s": 0.0}))
+        finally:
+            if own_share:
+                parallel.release_frame(shared_path)
+        for (func_name, filename), outcome in zip(chart_tasks, outcomes):
+            if "stage" in outcome[2]:
+                tracing.record(outcome[2])  # Bản ghi đo trong tiến trình con
+            cached = " - có sẵn" if outcome[2].get("cache") == "hit" else ""
+            print(f"   -> {filename} ({outcome[2]['wall_s']:.2f}s{cached})")
+            _report_chart(func_name, filename, outcome)
+    else:
+        outcomes = []
+        for func_name, filename in chart_tasks:
+            print(f"   -> Đang vẽ: {filename}...")
+            outcome = _render_chart(func_name, os.path.join(output_dir, filename), df, use_cache)
+            _report_chart(func_name, filename, outcome)
+            outcomes.append(outcome)
+
+    count = sum(1 for saved, _, _ in outcomes if saved)
+    cached = sum(1 for _, _, entry in outcomes if entry.get("cache") == "hit")
+    print(f"   -> Đã lưu {count} biểu đồ vào thư mục '{output_dir}' "
+          f"({time.perf_counter() - wall_start:.2f}s, {cached} ảnh lấy lại từ bộ nhớ đệm).")
+
+
+def _report_chart(func_name, filename, outcome):
+    saved, error, _ = outcome
+    if error is not None:
+        print(f"      [LỖI CHART] {filename}: {error}")
+    elif not saved:
+        print(f"      [SKIP] Hàm {func_name} trả về None.")
 
 # =============================================================================
 # CHƯƠNG TRÌNH CHÍNH (MAIN)
 # =============================================================================
 
 
-def main():
+def main(workers=1, chart_workers=None, full_excel=False, trace_path=TRACE_FILE_PATH, trace_summary=False,
+         chart_cache_enabled=True):
+    """
+    trace_path: file JSON-lines ghi thời gian / CPU / đỉnh RSS / số dòng từng bước (None = không ghi).
+    trace_summary: in bảng tổng kết các bước khi chạy xong.
+    chart_cache_enabled: dùng lại ảnh biểu đồ đã vẽ (modules/chart_cache.py), False = luôn vẽ lại.
+    """
+    if trace_path:
+        tracing.start_trace(trace_path)
+    try:
+        _run_pipeline(workers, chart_workers, full_excel, chart_cache_enabled)
+    finally:
+        if trace_summary:
+            print()
+            tracing.print_summary()
+        if trace_path:
+            tracing.stop_trace()
+            print(f"\nTrace từng bước: {os.path.abspath(trace_path)}")
+
+
+def _run_pipeline(workers, chart_workers, full_excel, chart_cache_enabled=True):
     print("=======================================================")
     print("   BẮT ĐẦU QUY TRÌNH XUẤT DỮ LIỆU TOÀN DIỆN")
     print("=======================================================")
@@ -197,24 +487,46 @@ def main():
         print(f"[LỖI] Không tìm thấy file '{INPUT_FILE_PATH}'")
         return
 
-    df_raw = dc.load_data(INPUT_FILE_PATH)
-    if df_raw is None:
+    # Đọc thẳng từ snapshot parquet nếu CSV và code làm sạch chưa thay đổi
+    df_clean = dc.load_and_clean_data(INPUT_FILE_PATH)
+    if df_clean is None:
         return
 
-    df_clean = dc.clean_data(df_raw)
-
     # Lưu file Master Cleaned Data
     save_dataframe_to_csv(df_clean, "00_MASTER_CLEANED_DATA.csv", dirs['csv'])
 
-    # 3. Chạy phân tích & Xuất CSV
-    # Hàm này trả về dict kết quả để dùng tiếp cho Excel
-    analysis_results = run_auto_analysis(df_clean, dirs['csv'])
-
-    # 4. Xuất báo cáo Excel
-    create_excel_report(df_clean, analysis_results, dirs['reports'])
-
-    # 5. Xuất hình ảnh
-    export_charts(df_clean, dirs['charts'])
+    # Chạy song song: chia sẻ bảng dữ liệu cho các tiến trình con 1 lần, dùng chung cho bước 3 và 5
+    chart_workers = workers if chart_workers is None else chart_workers
+    shared_path = parallel.share_frame(df_clean) if max(workers, chart_workers) > 1 else None
+    try:
+        # 3. Chạy phân tích & Xuất CSV
+        # Hàm này trả về dict kết quả để dùng tiếp cho Excel
+        # Bảng tổng sắp / giới tính / nhóm tuổi: đọc từ bảng tổng hợp cộng dồn (modules/incremental.py)
+        # nếu còn khớp snapshot, không phải tính lại trên toàn bộ dữ liệu
+        with tracing.stage("run_auto_analysis", rows_in=len(df_clean)) as entry:
+            analysis_results = run_auto_analysis(df_clean, dirs['csv'], workers=workers,
+                                                 shared_path=shared_path,
+                                                 precomputed=incremental.stored_tables(INPUT_FILE_PATH))
+            entry["rows_out"] = len(analysis_results)
+
+        # 4. Xuất báo cáo Excel (full_excel: kèm toàn bộ dữ liệu, ghi theo luồng)
+        if full_excel:
+            with tracing.stage("excel_report_streaming", rows_in=len(df_clean)):
+                create_excel_report_streaming(df_clean, analysis_results, dirs['reports'])
+        else:
+            with tracing.stage("excel_report", rows_in=len(df_clean)):
+                create_excel_report(df_clean, analysis_results, dirs['reports'])
+
+        # 5. Xuất hình ảnh
+        with tracing.stage("export_charts", rows_in=len(df_clean)):
+            export_charts(df_clean, dirs['charts'], workers=chart_workers, shared_path=shared_path,
+                          use_cache=chart_cache_enabled)
+    finally:
+        if shared_path is not None:
+            parallel.release_frame(shared_path)
+
+    print()
+    memo.print_cache_stats()
 
     print("\n=======================================================")
     print("   HOÀN TẤT! KIỂM TRA THƯ MỤC 'output'")
@@ -222,4 +534,22 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Xuất toàn bộ dữ liệu, báo cáo và biểu đồ Olympic.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Số tiến trình chạy song song các hàm phân tích (mặc định 1 = tuần tự)")
+    parser.add_argument("--chart-workers", type=int, default=None,
+                        help="Số tiến trình vẽ biểu đồ song song (mặc định bằng --workers)")
+    parser.add_argument("--full-excel", action="store_true",
+                        help="Ghi toàn bộ dữ liệu đã làm sạch vào báo cáo Excel (ghi theo luồng, "
+                             "tự tách sheet khi vượt 1.048.576 dòng)")
+    parser.add_argument("--trace", default=TRACE_FILE_PATH,
+                        help=f"File JSON-lines ghi thời gian / bộ nhớ từng bước (mặc định {TRACE_FILE_PATH})")
+    parser.add_argument("--no-trace", action="store_true", help="Không ghi file trace")
+    parser.add_argument("--trace-summary", action="store_true",
+                        help="In bảng tổng kết thời gian / bộ nhớ từng bước khi chạy xong")
+    parser.add_argument("--no-chart-cache", action="store_true",
+                        help="Luôn vẽ lại biểu đồ, không dùng ảnh đã lưu trong bộ nhớ đệm biểu đồ")
+    args = parser.parse_args()
+    main(workers=args.workers, chart_workers=args.chart_workers, full_excel=args.full_excel,
+         trace_path=None if args.no_trace else args.trace, trace_summary=args.trace_summary,
+         chart_cache_enabled=not args.no_chart_cache)
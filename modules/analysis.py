@@ -1,71 +1,48 @@
 import pandas as pd
 import numpy as np
+import modules.data_cleaning as dc
+from modules.query import FilterQuery
+from modules.cubes import (AGE_BINS, AGE_LABELS, age_group_counts, get_histogram_cube, get_medal_cube,
+                           medal_counts)
+from modules.memo import memoize
 
 # loc du lieu
-def filter_data_number(df, age=None, height=None, weight=None, year=None, sex=None):
+def filter_data_number(df, age=None, height=None, weight=None, year=None, sex=None, index=None):
     """
     Lọc dữ liệu theo các chỉ số dạng số (lớn hơn hoặc bằng) và giới tính.
     Ví dụ: Tìm VĐV cao trên 1m80, nặng trên 80kg thi đấu từ năm 2000.
     Mục đích: Phân tích nhóm vận động viên có thể hình hoặc độ tuổi cụ thể.
+    index: chỉ mục dựng sẵn bằng indexing.build_filter_index(df) (tùy chọn), xem query.FilterQuery.
     """
-    df_filter = df.copy()
-    if age is not None:
-        df_filter = df_filter[df_filter['Age'] >= age]
-    if height is not None:
-        df_filter = df_filter[df_filter['Height'] >= height]
-    if weight is not None:
-        df_filter = df_filter[df_filter['Weight'] >= weight]
-    if year is not None:
-        df_filter = df_filter[df_filter['Year'] >= year]
-    if sex is not None:
-        df_filter = df_filter[df_filter['Sex'].str.lower() == sex.lower()]
-    df_filter = df_filter.sort_values("Year", ascending=False)
-    return df_filter
+    query = (FilterQuery(df, index)
+             .at_least('Age', age).at_least('Height', height)
+             .at_least('Weight', weight).at_least('Year', year)
+             .equal('Sex', sex))
+    return query.frame()
 
 
-def filter_data_string(df, team=None, noc=None, season=None, city=None, sport=None, sex=None):
+def filter_data_string(df, team=None, noc=None, season=None, city=None, sport=None, sex=None, index=None):
     """
     Lọc dữ liệu theo các từ khóa chính xác (Team, NOC, Mùa, Thành phố, Môn).
     Ví dụ: Lọc toàn bộ VĐV của đoàn 'Vietnam' tham gia mùa 'Summer'.
     Mục đích: Truy xuất dữ liệu chi tiết cho một đối tượng cụ thể.
+    index: chỉ mục dựng sẵn bằng indexing.build_filter_index(df) (tùy chọn), xem query.FilterQuery.
     """
-    df_filter = df.copy()
-    if team is not None:
-        df_filter = df_filter[df_filter['Team'].str.lower() == team.lower()]
-    if noc is not None:
-        df_filter = df_filter[df_filter['NOC'].str.lower() == noc.lower()]
-    if season is not None:
-        df_filter = df_filter[df_filter['Season'].str.lower()
-                              == season.lower()]
-    if city is not None:
-        df_filter = df_filter[df_filter['City'].str.lower() == city.lower()]
-    if sport is not None:
-        df_filter = df_filter[df_filter['Sport'].str.lower() == sport.lower()]
-    if sex is not None:
-        df_filter = df_filter[df_filter['Sex'].str.lower() == sex.lower()]
-    df_filter = df_filter.sort_values("Year", ascending=False)
-    return df_filter
+    query = (FilterQuery(df, index)
+             .equal('Team', team).equal('NOC', noc).equal('Season', season)
+             .equal('City', city).equal('Sport', sport).equal('Sex', sex))
+    return query.frame()
 
 
-def filter_season_and_year(df, season=None, year=None):
+def filter_season_and_year(df, season=None, year=None, index=None):
     """
     Lọc dữ liệu theo Mùa giải và Năm tổ chức cụ thể.
     Ví dụ: Chỉ lấy dữ liệu của Thế vận hội Mùa hè năm 2016.
     Mục đích: Tập trung phân tích vào một kỳ Olympic cụ thể.
     """
-    df_filter = df.copy()
-    if season is not None and year is not None:
-        df_filter = df_filter[
-            (df_filter['Year'] == year) &
-            (df_filter['Season'].str.lower() == season.lower())
-        ]
-    elif season is not None:
-        df_filter = df_filter[df_filter['Season'].str.lower()
-                              == season.lower()]
-        df_filter = df_filter.sort_values("Year", ascending=False)
-    elif year is not None:
-        df_filter = df_filter[df_filter['Year'] == year]
-    return df_filter
+    query = FilterQuery(df, index).equal('Season', season).between('Year', year, year)
+    # Chỉ sắp xếp theo năm khi lọc riêng theo mùa (khi có năm thì mọi dòng cùng 1 năm)
+    return query.frame(sort_by_year=(season is not None and year is None))
 
 
 def filter_medals(df, type_medal):
@@ -82,24 +59,26 @@ def filter_medals(df, type_medal):
 # thong ke du lieu:
 
 
-def calculate_medal_tally(df):
+@memoize
+def calculate_medal_tally(df, cube=None):
     """
     Tính tổng sắp huy chương theo Quốc gia.
+    cube: cube huy chương dựng sẵn (cubes.get_medal_cube), mặc định lấy theo df.
     """
     # Bước quan trọng: Trong môn đồng đội (vd: Bóng đá), mỗi cầu thủ có 1 dòng.
-    # Nếu đếm dòng sẽ sai số huy chương của quốc gia. Cần drop duplicates.
-    subset_data = df.drop_duplicates(
-        subset=['Team', 'NOC', 'Games', 'Year', 'Sport', 'Event', 'Medal'])
-    # Chỉ lấy những dòng có huy chương
-    subset_data = subset_data.dropna(subset=['Medal'])
+    # Nếu đếm dòng sẽ sai số huy chương của quốc gia. Cube đã bỏ trùng sẵn (1 dòng = 1 huy chương).
+    cube = cube if cube is not None else get_medal_cube(df)
     # Dùng pivot_table để tạo bảng tổng sắp (Gold, Silver, Bronze thành các cột)
-    medal_tally = subset_data.pivot_table(
+    medal_tally = cube["facts"].pivot_table(
         index='NOC',
         columns='Medal',
         values='Event',
         aggfunc='count',
-        fill_value=0
+        fill_value=0,
+        observed=True
     )
+    # Giữ cả các quốc gia chưa có huy chương nào (0 - 0 - 0)
+    medal_tally = medal_tally.reindex(cube["nocs"], fill_value=0)
     cols = ['Gold', 'Silver', 'Bronze']
     existing_cols = [c for c in cols if c in medal_tally.columns]
     medal_tally = medal_tally[existing_cols]
@@ -109,55 +88,37 @@ def calculate_medal_tally(df):
     return medal_tally
 
 
+@memoize
 def analyze_gender_participation(df):
     """
     Phân tích số lượng Nam/Nữ qua các năm.
     """
     # Đếm số lượng unique ID (VĐV thực tế) theo Năm và Giới tính
-    gender_counts = df.groupby(['Year', 'Sex'])['ID'].nunique()
+    gender_counts = df.groupby(['Year', 'Sex'], observed=True)['ID'].nunique()
     # Unstack để chuyển Nam/Nữ thành 2 cột riêng biệt
     gender_counts = gender_counts.unstack(fill_value=0)
     return gender_counts
 
 
-def analyze_medals_and_participants_by_age(df):
+@memoize
+def analyze_medals_and_participants_by_age(df, cube=None):
     """
-    Phân tích hiệu suất đạt huy chương theo nhóm tuổi.
+    Phân tích hiệu suất đạt huy chương theo nhóm tuổi (AGE_BINS / AGE_LABELS).
     SỬA LỖI: Chỉ đếm huy chương thật (Gold/Silver/Bronze), loại bỏ 'No Medal'.
+    Số liệu cộng từ cube histogram thể chất (cubes.get_histogram_cube) thay vì chia nhóm lại trên bản sao
+    toàn bộ dữ liệu. cube: cube dựng sẵn (tùy chọn).
     """
-    # 1. Tạo bản sao để xử lý
-    temp_df = df.copy()
-
-    # Loại bỏ các dòng không có tuổi (NaN) để tránh lỗi khi phân nhóm
-    temp_df = temp_df.dropna(subset=['Age'])
-
-    # 2. Chia nhóm tuổi (Binning)
-    # Chia thành các nhóm: U20, 20-30, 30-40, 40-50, Trên 50
-    bins = [0, 20, 30, 40, 50, 100]
-    labels = ['U20', '20-30', '30-40', '40-50', 'Over 50']
-    temp_df['AgeGroup'] = pd.cut(temp_df['Age'], bins=bins, labels=labels, right=False)
-
-    # 3. Tính số lượng VĐV tham gia (Participant_Count)
-    # Đếm số ID duy nhất (Mỗi người chỉ đếm 1 lần dù thi nhiều môn)
-    participants = temp_df.groupby('AgeGroup', observed=False)['ID'].nunique().reset_index(name='Participant_Count')
-
-    # 4. Tính số lượng Huy chương (Medal_Count) -> QUAN TRỌNG NHẤT
-    # Bước lọc thần thánh: Chỉ lấy dòng có huy chương thật
-    target_medals = ['Gold', 'Silver', 'Bronze']
-    # Chuẩn hóa cột Medal trước khi lọc để chắc ăn
-    temp_df['Medal'] = temp_df['Medal'].astype(str).str.strip().str.title()
-    medals_only = temp_df[temp_df['Medal'].isin(target_medals)]
-
-    # Đếm số huy chương theo nhóm tuổi
-    medal_counts = medals_only.groupby('AgeGroup', observed=False)['Event'].count().reset_index(name='Medal_Count')
-
-    # 5. Gộp 2 bảng lại với nhau
-    stats = pd.merge(participants, medal_counts, on='AgeGroup', how='left')
+    cube = cube if cube is not None else get_histogram_cube(df)
+    counts = age_group_counts(cube)
 
-    # Những nhóm không có huy chương sẽ bị NaN -> thay bằng 0
-    stats['Medal_Count'] = stats['Medal_Count'].fillna(0).astype(int)
+    # Participant_Count: số ID duy nhất (mỗi người chỉ đếm 1 lần dù thi nhiều môn)
+    # Medal_Count: số dòng có huy chương thật
+    stats = pd.DataFrame({
+        'AgeGroup': pd.Categorical(AGE_LABELS, categories=AGE_LABELS, ordered=True),
+        'Participant_Count': counts['Participants'].to_numpy(),
+        'Medal_Count': counts['Medals'].to_numpy(),
+    })
 
-    # 6. Tính tỷ lệ (Medal_Ratio)
     # Tỷ lệ = Số huy chương / Số người tham gia
     # Ví dụ: 0.1 nghĩa là cứ 10 người đi thi thì có 1 người có giải (hợp lý hơn số 1.74 cũ)
     stats['Medal_Ratio'] = round(stats['Medal_Count'] / stats['Participant_Count'], 4)
@@ -165,16 +126,18 @@ def analyze_medals_and_participants_by_age(df):
     return stats
 
 
+@memoize
 def analyze_physique_all_athletes(df):
     """
     Tính chiều cao, cân nặng trung bình và BMI của TẤT CẢ VĐV (kể cả không có huy chương) theo từng môn.
     Trả về DataFrame sắp xếp giảm dần theo Cân nặng, Chiều cao và BMI. chỉ ra mối tương quan của cơ thể
     với các môn thể thao
     """
-    # 1. Lọc dữ liệu: Chỉ bỏ những dòng thiếu Chiều cao hoặc Cân nặng
-    valid_data = df.dropna(subset=['Height', 'Weight'])
+    # 1. Lọc dữ liệu: Chỉ bỏ những dòng thiếu Chiều cao hoặc Cân nặng (float32 -> float64 trước khi tính)
+    valid_data = dc.widen_float_columns(df[['Sport', 'Height', 'Weight']], ['Height', 'Weight'])
+    valid_data = valid_data.dropna(subset=['Height', 'Weight'])
     # 2. Group theo Môn thể thao và tính trung bình Chiều cao, Cân nặng
-    physique_stats = valid_data.groupby('Sport')[['Height', 'Weight']].mean()
+    physique_stats = valid_data.groupby('Sport', observed=True)[['Height', 'Weight']].mean()
     # 3. Tạo cột BMI
     physique_stats['BMI'] = physique_stats['Weight'] / \
         ((physique_stats['Height'] / 100) ** 2)
@@ -185,11 +148,14 @@ def analyze_physique_all_athletes(df):
     )
     return physique_stats.round(2)
 
-def get_country_performance_and_hosts(df, noc_code):
+@memoize
+def get_country_performance_and_hosts(df, noc_code, cube=None):
     """
     1. DataFrame thống kê số huy chương theo năm của quốc gia (noc_code).
     2. List các năm mà quốc gia đó là chủ nhà.
+    cube: cube huy chương dựng sẵn (cubes.get_medal_cube), mặc định lấy theo df.
     """
+    cube = cube if cube is not None else get_medal_cube(df)
     # 1. Từ điển ánh xạ Thành phố đăng cai -> Mã quốc gia (NOC)
     city_to_noc = {
         'Beijing': 'CHN', 'London': 'GBR', 'Sydney': 'AUS', 'Athens': 'GRE',
@@ -204,25 +170,24 @@ def get_country_performance_and_hosts(df, noc_code):
         'Melbourne': 'AUS', 'Amsterdam': 'NED', 'Antwerpen': 'BEL'
     }
     # 2. Tìm các năm làm chủ nhà
-    # Lọc các dòng trong dữ liệu mà City tương ứng với noc_code đầu vào
-    host_data = df[df['City'].map(city_to_noc) == noc_code]
+    # Lọc các cặp (Thành phố, Năm) đăng cai mà City tương ứng với noc_code đầu vào
+    hosts = cube["hosts"]
+    host_data = hosts[hosts['City'].astype(object).map(city_to_noc) == noc_code]
     host_years = sorted(host_data['Year'].unique().tolist())
-    # 3. Thống kê huy chương từng năm của quốc gia đó
-    # Lọc quốc gia -> Lọc có huy chương -> Bỏ trùng môn đồng đội -> Đếm
-    country_df = df[(df['NOC'] == noc_code) & (df['Medal'] != 'No Medal')]
-    # Quan trọng: Drop duplicates để môn đồng đội (bóng đá,...) chỉ tính 1 huy chương
-    country_df = country_df.drop_duplicates(subset=['Event', 'Year', 'Medal'])
-    # Đếm số lượng
-    medal_trend = country_df.groupby('Year')['Medal'].count().reset_index()
+    # 3. Thống kê huy chương từng năm của quốc gia đó (cube đã bỏ trùng môn đồng đội)
+    medal_trend = medal_counts(cube, 'Year', noc=noc_code).reset_index()
     medal_trend.columns = ['Year', 'Medal_Count']
     return medal_trend, host_years
 
 
+@memoize
 def analyze_vietnam_participation(df):
     """Thống kê tổng quan Việt Nam."""
     df_vn = df[df['NOC'] == 'VIE'].copy()
     if df_vn.empty:
         return pd.DataFrame()
+    # Sport có thể là category: đưa về chuỗi để agg trả về list thay vì cố ép lại về category
+    df_vn['Sport'] = df_vn['Sport'].astype(str)
     stats = df_vn.groupby('Year').agg({
         'ID': 'nunique',
         'Sport': lambda x: sorted(list(set(x)))
@@ -233,6 +198,7 @@ def analyze_vietnam_participation(df):
     return stats.sort_values('Year')
 
 
+@memoize
 def get_vietnam_medals(df):
     """Lấy danh sách huy chương Việt Nam (Hàm đang bị báo lỗi thiếu)."""
     df_vn = df[df['NOC'] == 'VIE']
@@ -241,11 +207,13 @@ def get_vietnam_medals(df):
     return medals[['Year', 'Name', 'Sport', 'Event', 'Medal']]
 
 
+@memoize
 def analyze_physical_summary(df):
     """Thống kê Min/Max/Mean cho Thể chất (Hàm đang bị thiếu)."""
-    valid_age = df['Age'].dropna()
-    valid_height = df['Height'].dropna()
-    valid_weight = df['Weight'].dropna()
+    # float32 -> float64 trước khi tính để ra đúng số như CSV (179.6, không phải 179.600006)
+    valid_age = dc.as_float64(df['Age']).dropna()
+    valid_height = dc.as_float64(df['Height']).dropna()
+    valid_weight = dc.as_float64(df['Weight']).dropna()
 
     summary = {
         'Age': {'Mean': round(valid_age.mean(), 1), 'Max': valid_age.max()},
@@ -255,9 +223,11 @@ def analyze_physical_summary(df):
     return summary
 
 
+@memoize
 def analyze_physique_by_sport(df):
     """Thống kê thể chất theo môn (Hàm đang bị thiếu)."""
-    valid_data = df.dropna(subset=['Height', 'Weight'])
-    physique_stats = valid_data.groupby('Sport')[['Height', 'Weight']].mean()
+    valid_data = dc.widen_float_columns(df[['Sport', 'Height', 'Weight']], ['Height', 'Weight'])
+    valid_data = valid_data.dropna(subset=['Height', 'Weight'])
+    physique_stats = valid_data.groupby('Sport', observed=True)[['Height', 'Weight']].mean()
     physique_stats['BMI'] = physique_stats['Weight'] / ((physique_stats['Height'] / 100) ** 2)
     return physique_stats.sort_values(by='Weight', ascending=False).round(2)
\ No newline at end of file
@@ -0,0 +1,243 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+import types
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import modules.data_cleaning as dc
+
+# --- BỘ NHỚ ĐỆM ẢNH BIỂU ĐỒ TRÊN ĐĨA (PNG/SVG) ---
+# Khóa (băm nội dung) = dấu vân tay các DataFrame đầu vào (dc.dataset_fingerprint, băm toàn bộ các dòng)
+# + tên hàm vẽ + các tham số còn lại (top_n, sample_size...) + phiên bản style (STYLE_VERSION, hash mã nguồn
+# module vẽ và các module nó dùng như cubes / clustering / analysis, phiên bản matplotlib) + định dạng / dpi.
+# Đổi dữ liệu (dù chỉ 1 ô), tham số hay code vẽ / tổng hợp số liệu -> khóa khác, không cần xóa tay.
+# Ảnh ghi ra file nên dùng chung giữa các phiên Streamlit, các lần chạy export_data.py và các tiến trình con
+# vẽ song song. Vượt giới hạn dung lượng thì xóa các ảnh lâu không dùng nhất (theo mtime).
+
+DEFAULT_CACHE_DIR = os.environ.get("OLYMPIC_CHART_CACHE_DIR", os.path.join(".cache", "charts"))
+DEFAULT_MAX_BYTES = 200 * 1024 ** 2  # 200 MB
+DEFAULT_DPI = 150
+FORMATS = ("png", "svg")
+
+_lock = threading.Lock()
+_config = {"dir": DEFAULT_CACHE_DIR, "max_bytes": DEFAULT_MAX_BYTES, "enabled": True}
+_stats = {"hits": 0, "misses": 0, "bypass": 0}
+_style_versions = {}   # tên module vẽ -> chuỗi phiên bản style
+
+
+class _Unhashable(Exception):
+    pass
+
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _dependencies(module):
+    """
+    Module vẽ + mọi module cùng gói mà nó dùng, trực tiếp hay gián tiếp (vd: visualization -> cubes,
+    clustering, analysis -> dedup, data_cleaning...), tìm qua các module / hàm / hằng số được import.
+    """
+    package = module.__name__.rpartition(".")[0]
+    found = {module.__name__: module}
+    if not package:
+        return [module]
+    pending = [module]
+    while pending:
+        for value in list(vars(pending.pop()).values()):
+            name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+            if isinstance(name, str) and name.startswith(package + ".") and name not in found and name in sys.modules:
+                found[name] = sys.modules[name]
+                pending.append(found[name])
+    return [found[name] for name in sorted(found)]
+
+
+def _style_version(func):
+    """
+    Phiên bản style của hàm vẽ: STYLE_VERSION + hash mã nguồn của module vẽ và của mọi module nó phụ thuộc
+    (cube, phân cụm, phân tích... đổi MAX_FLIERS hay mô hình cũng làm ảnh cũ hết hạn) + phiên bản matplotlib.
+    """
+    module_name = func.__module__
+    version = _style_versions.get(module_name)
+    if version is None:
+        module = sys.modules.get(module_name)
+        sources = []
+        for dependency in _dependencies(module) if module is not None else []:
+            source = getattr(dependency, "__file__", None)
+            sources.append((dependency.__name__, _hash_file(source) if source and os.path.exists(source) else None))
+        version = _style_versions[module_name] = repr((
+            getattr(module, "STYLE_VERSION", None), sources, matplotlib.__version__))
+    return version
+
+
+def _key_part(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return ("df", dc.dataset_fingerprint(value.to_frame() if isinstance(value, pd.Series) else value))
+    try:
+        hash(value)
+    except TypeError:
+        raise _Unhashable()
+    return value
+
+
+def chart_key(func, args=(), kwargs=None, fmt="png", dpi=DEFAULT_DPI):
+    """
+    Khóa băm của 1 ảnh biểu đồ. Tham số không băm được (vd: cube / thống kê truyền vào dạng dict)
+    -> None (không dùng bộ nhớ đệm cho lần gọi đó).
+    """
+    try:
+        parts = (func.__module__, func.__qualname__,
+                 tuple(_key_part(value) for value in args),
+                 tuple(sorted((name, _key_part(value)) for name, value in (kwargs or {}).items())),
+                 _style_version(func), fmt, dpi)
+    except _Unhashable:
+        return None
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _path(key, fmt):
+    # Chia thư mục con theo 2 ký tự đầu để 1 thư mục không có quá nhiều file
+    return os.path.join(_config["dir"], key[:2], f"{key}.{fmt}")
+
+
+def render(func, *args, fmt="png", dpi=DEFAULT_DPI, **kwargs):
+    """Vẽ biểu đồ và trả về bytes ảnh (giống fig.savefig(..., bbox_inches='tight')), None nếu hàm trả về None."""
+    fig = func(*args, **kwargs)
+    if not fig:
+        return None
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, bbox_inches='tight', dpi=dpi)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)  # Giải phóng RAM
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # Đánh dấu vừa dùng (cho việc loại ảnh lâu không dùng)
+    except OSError:
+        return False, None
+    # File rỗng = hàm vẽ trả về None (không có dữ liệu), cũng được ghi nhớ
+    return True, data or None
+
+
+def _write(path, data):
+    """Ghi ảnh qua file tạm rồi đổi tên, để tiến trình khác không bao giờ đọc phải file ghi dở."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data or b"")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[CẢNH BÁO] Không ghi được ảnh vào bộ nhớ đệm biểu đồ: {e}")
+        return False
+    return True
+
+
+def _list_files():
+    """Các ảnh đang có trong bộ nhớ đệm: list (mtime, số byte, đường dẫn)."""
+    files = []
+    for root, _, names in os.walk(_config["dir"]):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:  # Tiến trình khác vừa xóa
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    return files
+
+
+def _evict():
+    files = _list_files()
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= _config["max_bytes"]:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def get_chart(func, *args, fmt="png", dpi=DEFAULT_DPI, **kwargs):
+    """
+    Bytes ảnh của func(*args, **kwargs): đọc từ bộ nhớ đệm nếu đã có, chưa có thì vẽ rồi ghi lại.
+    Trả về None nếu hàm vẽ trả về None.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Định dạng ảnh không hỗ trợ: {fmt} (chỉ {', '.join(FORMATS)})")
+    key = chart_key(func, args, kwargs, fmt, dpi) if _config["enabled"] else None
+    if key is None:
+        with _lock:
+            _stats["bypass"] += 1
+        return render(func, *args, fmt=fmt, dpi=dpi, **kwargs)
+
+    path = _path(key, fmt)
+    found, data = _read(path)
+    if found:
+        with _lock:
+            _stats["hits"] += 1
+        return data
+
+    with _lock:
+        _stats["misses"] += 1
+    data = render(func, *args, fmt=fmt, dpi=dpi, **kwargs)
+    if _write(path, data):
+        with _lock:
+            _evict()
+    return data
+
+
+def configure(cache_dir=None, max_bytes=None, enabled=None):
+    """Đổi thư mục / giới hạn dung lượng (byte) / bật-tắt bộ nhớ đệm ảnh."""
+    with _lock:
+        if cache_dir is not None:
+            _config["dir"] = cache_dir
+        if max_bytes is not None:
+            _config["max_bytes"] = max_bytes
+        if enabled is not None:
+            _config["enabled"] = enabled
+        _evict()
+
+
+def clear_cache():
+    """Xóa toàn bộ ảnh đã lưu (giữ nguyên số liệu hit/miss)."""
+    with _lock:
+        for _, _, path in _list_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def counters():
+    """Số hit / miss / bỏ qua của tiến trình hiện tại (không quét thư mục)."""
+    with _lock:
+        return dict(_stats)
+
+
+def cache_stats():
+    """Số liệu bộ nhớ đệm ảnh: số file, dung lượng, hit/miss."""
+    with _lock:
+        files = _list_files()
+        return {"dir": _config["dir"], "files": len(files), "bytes": sum(size for _, size, _ in files),
+                "max_bytes": _config["max_bytes"], "enabled": _config["enabled"], **_stats}
+
+
+def print_cache_stats():
+    stats = cache_stats()
+    print(f"Bộ nhớ đệm ảnh biểu đồ ({stats['dir']}): {stats['files']} file, "
+          f"{stats['bytes'] / 1024 ** 2:.2f}/{stats['max_bytes'] / 1024 ** 2:.0f} MB - "
+          f"{stats['hits']} hit, {stats['misses']} miss, {stats['bypass']} bỏ qua")
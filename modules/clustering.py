@@ -0,0 +1,71 @@
+import numpy as np
+from sklearn.cluster import KMeans
+
+import modules.data_cleaning as dc
+
+# --- PHÂN CỤM VĐV THEO THỂ TRẠNG (KMEANS) ---
+# Mô hình được fit trên 1 mẫu ngẫu nhiên (mặc định 50k dòng) thay vì toàn bộ dữ liệu, rồi gán cụm cho
+# mọi dòng bằng phép tính khoảng cách vector hóa tới các tâm cụm. Mô hình được giữ lại theo dấu vân tay
+# bộ dữ liệu (dc.dataset_fingerprint) nên mở lại tab / vẽ lại biểu đồ không phải fit lại.
+
+CLUSTER_FEATURES = ['Age', 'Weight']
+N_CLUSTERS = 3
+# Số dòng dùng để fit; None = fit trên toàn bộ dữ liệu (chậm với dữ liệu lớn)
+DEFAULT_SAMPLE_SIZE = 50_000
+
+# Giữ mô hình của vài cấu hình / bộ dữ liệu gần nhất
+_MODEL_CACHE_SIZE = 8
+_models = {}
+
+
+def cluster_values(df, features=CLUSTER_FEATURES):
+    """Mảng float (n, số đặc trưng) các dòng có đủ giá trị các cột đặc trưng."""
+    return df[features].dropna().to_numpy(dtype=float)
+
+
+def fit_clusters(values, sample_size=DEFAULT_SAMPLE_SIZE, n_clusters=N_CLUSTERS, random_state=42):
+    """
+    Fit KMeans trên dữ liệu đã chuẩn hóa (trung bình 0, độ lệch chuẩn 1 như StandardScaler).
+    Chuẩn hóa dùng thống kê của toàn bộ dữ liệu, KMeans chỉ fit trên tối đa sample_size dòng.
+    Các cụm được đánh số lại theo cân nặng (cột cuối) tăng dần: 0 = nhẹ nhất.
+    Trả về dict: mean, scale, centers (tâm cụm trên thang đã chuẩn hóa), n_rows, sample_size.
+    """
+    mean = values.mean(axis=0)
+    scale = values.std(axis=0)
+    scale[scale == 0] = 1.0
+    sample = values
+    if sample_size is not None and len(values) > sample_size:
+        rng = np.random.default_rng(random_state)
+        sample = values[rng.choice(len(values), sample_size, replace=False)]
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    kmeans.fit((sample - mean) / scale)
+    centers = kmeans.cluster_centers_[np.argsort(kmeans.cluster_centers_[:, -1])]
+    return {"mean": mean, "scale": scale, "centers": centers,
+            "n_rows": len(values), "sample_size": len(sample)}
+
+
+def predict_clusters(model, values):
+    """Gán cụm (0..k-1) cho mọi dòng: tâm cụm gần nhất, tính vector hóa trên cả mảng."""
+    scaled = (values - model["mean"]) / model["scale"]
+    distances = ((scaled[:, None, :] - model["centers"][None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1).astype(np.int8)
+
+
+def get_cluster_model(df, sample_size=DEFAULT_SAMPLE_SIZE, n_clusters=N_CLUSTERS, random_state=42):
+    """Mô hình phân cụm của df, fit 1 lần cho mỗi (bộ dữ liệu, cấu hình) rồi dùng lại."""
+    key = (dc.dataset_fingerprint(df), sample_size, n_clusters, random_state)
+    model = _models.get(key)
+    if model is None:
+        values = cluster_values(df)
+        if len(values) < n_clusters:
+            return None
+        if len(_models) >= _MODEL_CACHE_SIZE:
+            _models.pop(next(iter(_models)))
+        model = _models[key] = fit_clusters(values, sample_size, n_clusters, random_state)
+    return model
+
+
+def clear_cache():
+    """Xóa các mô hình đã fit."""
+    _models.clear()
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+
+import modules.data_cleaning as dc
+from modules.dedup import drop_duplicates, duplicated
+
+# --- CÁC BẢNG TỔNG HỢP DỰNG SẴN (CUBE) ---
+# Dựng 1 lần cho mỗi bộ dữ liệu (theo dấu vân tay dc.dataset_fingerprint), sau đó các hàm thống kê /
+# vẽ biểu đồ chỉ cộng gộp trên bảng nhỏ này thay vì lọc + bỏ trùng lại trên toàn bộ dữ liệu.
+
+MEDALS = ['Gold', 'Silver', 'Bronze']
+# 1 dòng của cube = 1 huy chương thật (môn đồng đội chỉ tính 1 huy chương), cùng khóa bỏ trùng
+# với bảng tổng sắp. Season đi kèm Games nên không làm thay đổi cách bỏ trùng.
+MEDAL_CUBE_KEYS = ['NOC', 'Team', 'Games', 'Year', 'Season', 'Sport', 'Event', 'Medal']
+
+# Cube histogram thể chất: số VĐV theo ô 1 đơn vị (1 tuổi / 1 cm / 1 kg) của từng chỉ số,
+# chia theo các chiều HIST_DIMS -> lát cắt bất kỳ (vd: chiều cao nữ VĐV bơi có huy chương) không cần dữ liệu gốc.
+# Lưu dạng thưa (chỉ các ô có dữ liệu), nên giá trị ngoại lai trong dữ liệu gốc không làm cube phình to
+HIST_DIMS = ['Sex', 'Season', 'Sport', 'Medal']
+HIST_MEASURES = ['Age', 'Height', 'Weight']
+# Nhóm tuổi dùng chung cho analyze_medals_and_participants_by_age (và bản cập nhật tăng dần)
+AGE_BINS = [0, 20, 30, 40, 50, 100]
+AGE_LABELS = ['U20', '20-30', '30-40', '40-50', 'Over 50']
+
+# Thống kê boxplot theo môn: các chỉ số, hệ số râu (như matplotlib/seaborn) và số điểm ngoại lai tối đa mỗi môn
+BOX_MEASURES = ['Height', 'Weight']
+BOX_WHIS = 1.5
+MAX_FLIERS = 50
+
+# Giữ cube của vài bộ dữ liệu gần nhất
+_CUBE_CACHE_SIZE = 4
+_medal_cubes = {}
+_histogram_cubes = {}
+_box_stats = {}
+
+
+def _cached(store, builder, df):
+    key = dc.dataset_fingerprint(df)
+    cube = store.get(key)
+    if cube is None:
+        if len(store) >= _CUBE_CACHE_SIZE:
+            store.pop(next(iter(store)))
+        cube = store[key] = builder(df)
+    return cube
+
+
+def build_medal_cube(df):
+    """
+    Dựng cube huy chương ở mức nội dung thi đấu. Trả về dict:
+    - facts: DataFrame các huy chương đã bỏ trùng theo MEDAL_CUBE_KEYS,
+      cột 'Athletes' = số VĐV (số dòng gốc) nhận huy chương đó
+    - nocs: mọi NOC có kết quả thi đấu (kể cả chưa từng có huy chương), theo thứ tự của bảng tổng sắp
+    - hosts: các cặp (City, Year) đăng cai, để tra năm làm chủ nhà
+    """
+    keys = [col for col in MEDAL_CUBE_KEYS if col in df.columns]
+    results = df.dropna(subset=['Medal'])
+    medals = results.loc[results['Medal'].isin(MEDALS), keys]
+    facts = (medals.groupby(keys, observed=True, dropna=False, sort=False)
+             .size().rename('Athletes').reset_index())
+    nocs = pd.Index(results['NOC'].unique(), name='NOC').dropna().sort_values()
+    hosts = drop_duplicates(df[['City', 'Year']], ignore_index=True)
+    return {"facts": facts, "nocs": nocs, "hosts": hosts}
+
+
+def get_medal_cube(df):
+    """Cube huy chương của df, dựng 1 lần cho mỗi bộ dữ liệu rồi dùng lại."""
+    return _cached(_medal_cubes, build_medal_cube, df)
+
+
+def medal_counts(cube, by, noc=None, years=None):
+    """
+    Số huy chương (đã bỏ trùng) gộp theo cột 'by', có thể lọc theo 1 NOC và/hoặc danh sách năm.
+    Ví dụ: medal_counts(cube, 'Year', noc='CHN') -> số huy chương của TQ qua từng kỳ.
+    """
+    facts = cube["facts"]
+    if noc is not None:
+        facts = facts[facts['NOC'] == noc]
+    if years is not None:
+        facts = facts[facts['Year'].isin(years)]
+    return facts.groupby(by, observed=True).size()
+
+
+def _dim_codes(series, name):
+    """Mã số nguyên (0..n-1) + nhãn của 1 chiều; thiếu giá trị -> nhãn 'NA'.
+    Medal được chuẩn hóa như khi phân tích (bỏ khoảng trắng, viết hoa chữ đầu: 'gold ' -> 'Gold')."""
+    codes, labels = pd.factorize(series, sort=True)
+    labels = pd.Index(labels).astype(str)
+    if name == 'Medal':
+        labels = labels.str.strip().str.title()
+    labels = labels.append(pd.Index(['NA']))
+    codes[codes < 0] = len(labels) - 1
+    merged, unique_labels = pd.factorize(labels)  # Gộp các nhãn trùng nhau sau khi chuẩn hóa
+    return merged[codes], pd.Index(unique_labels, name=name)
+
+
+def _sparse_counts(cell, bins):
+    """
+    Đếm số dòng theo cặp (ô chiều, ô giá trị), chỉ giữ các cặp có dữ liệu.
+    bins: biên trái ô giá trị của từng dòng. Trả về dict cells / bins / counts (các mảng cùng độ dài).
+    """
+    edges, inverse = np.unique(bins, return_inverse=True)
+    n_edges = max(len(edges), 1)
+    pairs, counts = np.unique(cell * n_edges + inverse, return_counts=True)
+    return {"cells": pairs // n_edges, "bins": edges[pairs % n_edges], "counts": counts}
+
+
+def build_histogram_cube(df):
+    """
+    Dựng cube histogram thể chất. Trả về dict:
+    - dims: {chiều: nhãn}, theo thứ tự HIST_DIMS; shape: số nhãn của từng chiều
+    - measures: {chỉ số: {"cells", "bins", "counts": bảng thưa (ô chiều, biên trái ô 1 đơn vị) -> số dòng,
+      chỉ gồm các ô có dữ liệu, "sum": tổng giá trị theo chiều, mảng shape (để tính trung bình chính xác)}}
+    - age_athletes: bảng thưa như của Age nhưng chỉ đếm dòng đầu tiên của mỗi (ID, nhóm tuổi AGE_BINS)
+      -> cộng các ô trong 1 nhóm tuổi = số VĐV khác nhau của nhóm (khi không lọc theo chiều)
+    Bảng thưa nên bộ nhớ tỉ lệ với số dòng, không với khoảng min..max: 1 giá trị lỗi (vd Height=9999
+    trong dữ liệu gốc) không làm cube phình theo cả khoảng giá trị nhân với mọi ô chiều.
+    """
+    dims, cell, shape = {}, np.zeros(len(df), dtype=np.int64), []
+    for name in HIST_DIMS:
+        codes, labels = _dim_codes(df[name], name)
+        dims[name] = labels
+        cell = cell * len(labels) + codes
+        shape.append(len(labels))
+    n_cells = int(np.prod(shape))
+
+    measures = {}
+    for name in HIST_MEASURES:
+        values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        measures[name] = _sparse_counts(cell[valid], np.floor(values[valid]))
+        measures[name]["sum"] = np.bincount(cell[valid], weights=values[valid], minlength=n_cells).reshape(shape)
+
+    # VĐV khác nhau theo nhóm tuổi: giữ dòng đầu tiên của mỗi (ID, nhóm tuổi)
+    values = pd.to_numeric(df['Age'], errors='coerce').to_numpy(dtype=float)
+    group = np.digitize(values, AGE_BINS) - 1
+    in_group = ~np.isnan(values) & (group >= 0) & (group < len(AGE_LABELS))
+    first = np.zeros(len(df), dtype=bool)
+    first[in_group] = ~duplicated(pd.DataFrame({'ID': df['ID'].to_numpy()[in_group],
+                                                'Group': group[in_group]}))
+    athletes = _sparse_counts(cell[first], np.floor(values[first]))
+    return {"dims": dims, "shape": tuple(shape), "measures": measures, "age_athletes": athletes}
+
+
+def get_histogram_cube(df):
+    """Cube histogram thể chất của df, dựng 1 lần cho mỗi bộ dữ liệu rồi dùng lại."""
+    return _cached(_histogram_cubes, build_histogram_cube, df)
+
+
+def _filter_positions(cube, name, filters):
+    """Vị trí (mã) các nhãn được chọn của chiều 'name', None nếu chiều đó không bị lọc."""
+    if filters.get(name) is None:
+        return None
+    values = filters[name]
+    values = [values] if isinstance(values, str) else list(values)
+    positions = cube["dims"][name].get_indexer(values)
+    return positions[positions >= 0]
+
+
+def _slice(cube, array, filters):
+    """Lọc mảng cube (trục = HIST_DIMS) theo {chiều: giá trị hoặc danh sách giá trị} rồi cộng dồn các chiều."""
+    for axis, name in enumerate(HIST_DIMS):
+        positions = _filter_positions(cube, name, filters)
+        if positions is not None:
+            array = np.take(array, positions, axis=axis)
+    return array.sum(axis=tuple(range(len(HIST_DIMS))))
+
+
+def _slice_bins(cube, table, filters):
+    """Cộng bảng thưa (cells / bins / counts) trên lát cắt 'filters' -> (biên trái các ô tăng dần, số dòng)."""
+    keep = np.ones(len(table["cells"]), dtype=bool)
+    codes = np.unravel_index(table["cells"], cube["shape"])
+    for axis, name in enumerate(HIST_DIMS):
+        positions = _filter_positions(cube, name, filters)
+        if positions is not None:
+            keep &= np.isin(codes[axis], positions)
+    edges, inverse = np.unique(table["bins"][keep], return_inverse=True)
+    counts = np.bincount(inverse, weights=table["counts"][keep], minlength=len(edges))
+    return edges, counts.astype(np.int64)
+
+
+def histogram(cube, measure, **filters):
+    """
+    Histogram 1 chỉ số trên lát cắt bất kỳ, ô rộng 1 đơn vị, chỉ gồm các ô có dữ liệu.
+    Trả về Series: biên trái của ô (tăng dần) -> số dòng.
+    Ví dụ: histogram(cube, 'Height', Sex='F', Sport='Swimming', Medal=MEDALS)
+    """
+    edges, counts = _slice_bins(cube, cube["measures"][measure], filters)
+    return pd.Series(counts, index=pd.Index(edges, name=measure), name='Count')
+
+
+def measure_mean(cube, measure, **filters):
+    """Giá trị trung bình chính xác của 1 chỉ số trên lát cắt (NaN nếu không có dữ liệu)."""
+    data = cube["measures"][measure]
+    total = _slice(cube, data["sum"], filters)
+    count = _slice_bins(cube, data, filters)[1].sum()
+    return total / count if count else np.nan
+
+
+def age_group_counts(cube, **filters):
+    """
+    Số VĐV khác nhau (Participants) và số dòng huy chương thật (Medals) theo nhóm tuổi AGE_LABELS.
+    Số VĐV chỉ chính xác khi không lọc theo chiều (mỗi VĐV được tính ở dòng đầu tiên của nhóm tuổi).
+    """
+    medal_filters = dict(filters, Medal=filters.get('Medal', MEDALS))
+    result = pd.DataFrame(0, index=pd.Index(AGE_LABELS, name='AgeGroup'), columns=['Participants', 'Medals'])
+    for column, table, table_filters in (('Participants', cube["age_athletes"], filters),
+                                         ('Medals', cube["measures"]['Age'], medal_filters)):
+        edges, counts = _slice_bins(cube, table, table_filters)
+        group = np.digitize(edges, AGE_BINS) - 1
+        for i, label in enumerate(AGE_LABELS):
+            result.loc[label, column] = int(counts[group == i].sum())
+    return result
+
+
+def _sample_fliers(values, limit):
+    """Tối đa 'limit' điểm ngoại lai rải đều theo giá trị (luôn giữ 2 điểm cực trị)."""
+    values = np.sort(values)
+    if len(values) > limit:
+        values = values[np.linspace(0, len(values) - 1, limit).round().astype(int)]
+    return values
+
+
+def build_box_stats(df, by='Sport', measures=BOX_MEASURES, whis=BOX_WHIS, max_fliers=MAX_FLIERS):
+    """
+    Thống kê boxplot của từng môn, tính 1 lượt quantile theo nhóm cho mỗi chỉ số. Trả về dict:
+    - rows: số dòng của từng môn (giảm dần) để chọn top môn
+    - {chỉ số}: DataFrame theo môn với count, mean, q1, med, q3, whislo, whishi (râu như matplotlib:
+      giá trị xa nhất còn nằm trong [q1 - whis*IQR, q3 + whis*IQR]) và fliers (tối đa max_fliers điểm)
+    """
+    stats = {"rows": df[by].value_counts()}
+    stats["rows"] = stats["rows"][stats["rows"] > 0]
+    for measure in measures:
+        data = df[[by, measure]].dropna()
+        grouped = data.groupby(by, observed=True)[measure]
+        table = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+        table.columns = ['q1', 'med', 'q3']
+        table['count'] = grouped.size()
+        table['mean'] = grouped.mean()
+
+        iqr = table['q3'] - table['q1']
+        low = (table['q1'] - whis * iqr).reindex(data[by]).to_numpy()
+        high = (table['q3'] + whis * iqr).reindex(data[by]).to_numpy()
+        values = data[measure].to_numpy()
+        inside = (values >= low) & (values <= high)
+        whiskers = data[inside].groupby(by, observed=True)[measure].agg(['min', 'max'])
+        table['whislo'] = whiskers['min']
+        table['whishi'] = whiskers['max']
+        fliers = {group: _sample_fliers(values.to_numpy(), max_fliers)
+                  for group, values in data[~inside].groupby(by, observed=True)[measure]}
+        table['fliers'] = [fliers.get(group, np.array([])) for group in table.index]
+        stats[measure] = table
+    return stats
+
+
+def get_box_stats(df):
+    """Thống kê boxplot theo môn của df, tính 1 lần cho mỗi bộ dữ liệu rồi dùng lại."""
+    return _cached(_box_stats, build_box_stats, df)
+
+
+def clear_cache():
+    """Xóa các cube đã dựng (vd: khi đo hiệu năng cần dựng lại từ đầu)."""
+    _medal_cubes.clear()
+    _histogram_cubes.clear()
+    _box_stats.clear()
@@ -1,16 +1,89 @@
+import hashlib
+import inspect
+import json
+import os
+import weakref
+
 import numpy as np
 import streamlit as st
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
+import modules.tracing as tracing
+from modules.dedup import drop_duplicates, duplicated
+
 pd.options.mode.chained_assignment = None
 
 
+# --- SCHEMA KIỂU DỮ LIỆU GỌN NHẸ CHO athlete_events.csv ---
+# Các cột chuỗi ít giá trị khác nhau -> category (lưu mã số nguyên thay vì object Python)
+# Các cột số -> int16/int32/float32 thay vì int64/float64 mặc định
+# 'Name' có quá nhiều giá trị khác nhau nên để pandas tự suy kiểu
+ATHLETE_DTYPES = {
+    "ID": "int32",
+    "Sex": "category",
+    "Age": "float32",
+    "Height": "float32",
+    "Weight": "float32",
+    "Team": "category",
+    "NOC": "category",
+    "Games": "category",
+    "Year": "int16",
+    "Season": "category",
+    "City": "category",
+    "Sport": "category",
+    "Event": "category",
+    "Medal": "category",
+}
+
+
+def _read_csv_compact(file_path, usecols=None):
+    """Đọc CSV theo ATHLETE_DTYPES, chỉ áp dụng dtype cho những cột thực sự được đọc."""
+    dtypes = {col: dtype for col, dtype in ATHLETE_DTYPES.items()
+              if usecols is None or col in usecols}
+    try:
+        return pd.read_csv(file_path, dtype=dtypes, usecols=usecols)
+    except ValueError:
+        # Cột số có giá trị sai định dạng (vd: Age='abc') hoặc ID/Year bị thiếu:
+        # chỉ giữ dtype category, các cột số để pandas tự suy kiểu và clean_data xử lý sau
+        dtypes = {col: dtype for col, dtype in dtypes.items() if dtype == "category"}
+        return pd.read_csv(file_path, dtype=dtypes, usecols=usecols)
+
+
+def as_float64(values):
+    """
+    Series float32 (schema ATHLETE_DTYPES) -> float64 đúng giá trị thập phân như trong CSV
+    (179.6 chứ không phải 179.600006), đổi qua chuỗi ngắn nhất của từng giá trị phân biệt.
+    Dùng trước khi tính toán / xuất số liệu cho người dùng để ra đúng như khi đọc bằng float64. Kiểu khác giữ nguyên.
+    """
+    if values.dtype != np.float32:
+        return values
+    uniques, inverse = np.unique(values.to_numpy(), return_inverse=True)
+    widened = np.array([float(str(value)) for value in uniques], dtype=np.float64)
+    return pd.Series(widened[inverse], index=values.index, name=values.name)
+
+
+def widen_float_columns(df, columns=None):
+    """Bản sao nông của df với các cột float32 (trong 'columns', None = mọi cột) đổi sang float64 bằng as_float64."""
+    targets = [col for col in (df.columns if columns is None else columns) if df[col].dtype == np.float32]
+    if not targets:
+        return df
+    df = df.copy(deep=False)
+    for col in targets:
+        df[col] = as_float64(df[col])
+    return df
+
+
 @st.cache_data
-def load_data(file_path):
+def load_data(file_path, usecols=None, compact=True):
     # file_path là đường dẫn chứa file csv: "data/athlete_events.csv"
+    # usecols: chỉ đọc một số cột (vd: ['ID', 'Year', 'Sex']), None = đọc tất cả
+    # compact: True = đọc theo schema ATHLETE_DTYPES để tiết kiệm bộ nhớ
     try:
-        df = pd.read_csv(file_path)
+        if compact:
+            df = _read_csv_compact(file_path, usecols=usecols)
+        else:
+            df = pd.read_csv(file_path, usecols=usecols)
         print("Đọc dữ liệu thành công!")
         return df
     except FileNotFoundError:
@@ -21,66 +94,360 @@ def load_data(file_path):
         return None
 
 
-def clean_data(df):
+def report_memory_usage(df_before, df_after=None):
     """
-    Thực hiện làm sạch dữ liệu:
-    - Loại bỏ dữ liệu trùng lặp
-    - Sửa định dạng sai
-    - Xử lý giá trị thiếu (NA)
-    - Sửa gán nhãn sai
-    - Xử lý outlier
-    - Chuẩn hóa dữ liệu số (dùng func data_scaled)
+    In dung lượng bộ nhớ (byte, tính cả chuỗi bên trong object) của từng cột.
+    Nếu truyền thêm df_after thì in so sánh trước/sau và tỉ lệ tiết kiệm.
+    Ví dụ: report_memory_usage(load_data(path, compact=False), load_data(path))
     """
-    # 1. Xóa dòng trùng
-    df = df.drop_duplicates()
+    report = pd.DataFrame({"Before": df_before.memory_usage(index=False, deep=True)})
+    report["Dtype_Before"] = df_before.dtypes.astype(str)
+    if df_after is not None:
+        report["After"] = df_after.memory_usage(index=False, deep=True)
+        report["Dtype_After"] = df_after.dtypes.astype(str)
+    report.loc["TOTAL", "Before"] = report["Before"].sum()
+    if df_after is not None:
+        report.loc["TOTAL", "After"] = report["After"].sum()
+        report["Saved (%)"] = round((1 - report["After"] / report["Before"]) * 100, 1)
 
-    numeric_cols = ["Age", "Height", "Weight"]
-    numeric_cols = [col for col in numeric_cols if col in df.columns]
-    # 2. Xử lí định dạng sai
-    for col in numeric_cols:
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(report.fillna(""))
+    return report
+
+
+def _fill_label(series, value):
+    """fillna cho cột chuỗi, tự thêm category mới nếu cột đang ở dtype category."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def _as_category_like(result, original):
+    """Nếu cột gốc là category thì ép kết quả (sau khi xử lý chuỗi) về lại category."""
+    if isinstance(original.dtype, pd.CategoricalDtype):
+        return result.astype("category")
+    return result
+
+
+NUMERIC_COLS = ["Age", "Height", "Weight"]
+
+MEDAL_LABEL_FIXES = {
+    "Gold ": "Gold",
+    "gold": "Gold",
+    "SILVER": "Silver",
+    "BRONZE": "Bronze"
+}
+
+
+def _coerce_numeric(df):
+    """Bước 2 của clean_data: ép các cột số về dạng số, giá trị sai định dạng -> NaN."""
+    for col in NUMERIC_COLS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def _label_columns(df):
+    """Các cột chuỗi cần điền Mode khi thiếu (mọi cột chuỗi TRỪ Medal)."""
+    categorical_cols = df.select_dtypes(include=["object", "string", "category"]).columns
+    return [col for col in categorical_cols if col != "Medal"]
+
+
+def _iqr_bounds(Q1, Q3):
+    """Biên dưới/biên trên theo phương pháp IQR."""
+    IQR = Q3 - Q1
+    return float(Q1 - 1.5 * IQR), float(Q3 + 1.5 * IQR)
+
+
+def compute_cleaning_stats(df):
+    """
+    Tính các thống kê toàn cục mà clean_data cần (trên dữ liệu đã bỏ trùng và ép kiểu số):
+    - mean: giá trị trung bình từng cột số (để điền NA)
+    - mode: giá trị xuất hiện nhiều nhất từng cột chuỗi (để điền NA)
+    - bounds: biên [lower, upper] theo IQR của từng cột số, tính SAU khi đã điền NA
+    Kết quả là dict thuần (float/str) nên ghi được ra JSON.
+    """
+    stats = {"mean": {}, "mode": {}, "bounds": {}}
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            mean = df[col].mean()
+            stats["mean"][col] = float(mean)
+            filled = df[col].fillna(mean)
+            stats["bounds"][col] = _iqr_bounds(filled.quantile(0.25), filled.quantile(0.75))
+    for col in _label_columns(df):
+        mode = df[col].mode()
+        if len(mode) > 0:
+            stats["mode"][col] = mode[0]
+    return stats
 
+
+def apply_cleaning_stats(df, stats):
+    """
+    Áp dụng các bước 3-5 của clean_data với thống kê cho sẵn (từ compute_cleaning_stats).
+    Mọi bước ở đây chỉ phụ thuộc vào từng dòng + stats, nên có thể chạy trên từng khối dữ liệu.
+    """
     # 3. Xử lí dữ liệu thiếu
     # Xử lý cột số (nếu như giá trị là NA thì sẽ trả về mean của cột số)
-    for col in numeric_cols:
-        df[col] = df[col].fillna(df[col].mean())
+    for col, mean in stats["mean"].items():
+        if col in df.columns:
+            df[col] = df[col].fillna(mean)
 
     # Xử lý cột chuỗi (TRỪ Medal) (nếu như có giá trị là NA thì sẽ trả về chuỗi xuất hiện nhiều nhất trong cột đó, nếu Medal thì NA thì sẽ là không đạt huy chương)
-    categorical_cols = df.select_dtypes(include="object").columns
-    for col in categorical_cols:
-        if col != "Medal":
-            df[col] = df[col].fillna(df[col].mode()[0])
+    for col, mode in stats["mode"].items():
+        if col in df.columns:
+            df[col] = _fill_label(df[col], mode)
 
     # Chuyển NA ở Medal về No Medal để dễ nhìn hơn
     if "Medal" in df.columns:
-        df["Medal"] = df["Medal"].fillna("No Medal")
+        df["Medal"] = _fill_label(df["Medal"], "No Medal")
 
     # 4. Xử lí gán nhãn sai
     if "Medal" in df.columns:
-        df["Medal"] = df["Medal"].replace({
-            "Gold ": "Gold",
-            "gold": "Gold",
-            "SILVER": "Silver",
-            "BRONZE": "Bronze"
-        })
+        medal = df["Medal"]
+        df["Medal"] = _as_category_like(medal.astype(object).replace(MEDAL_LABEL_FIXES), medal)
 
     # 5. Xử lí outlier bằng phương pháp IQR (những giá trị bất thường, quá lớn hoặc quá nhỏ so với phần lớn các dữ liệu còn lại)
-    for col in numeric_cols:
+    for col, (lower, upper) in stats["bounds"].items():
         if col in df.columns:
-            Q1 = df[col].quantile(0.25)
-            Q2 = df[col].quantile(0.50)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-
-            lower = Q1 - 1.5 * IQR
-            upper = Q3 + 1.5 * IQR
-
             # Chặn biên (capping)
             df.loc[:, col] = df[col].clip(lower, upper).round(2)
 
     return df
 
+
+def clean_data(df, stats=None, return_stats=False):
+    """
+    Thực hiện làm sạch dữ liệu:
+    - Loại bỏ dữ liệu trùng lặp
+    - Sửa định dạng sai
+    - Xử lý giá trị thiếu (NA)
+    - Sửa gán nhãn sai
+    - Xử lý outlier
+    - Chuẩn hóa dữ liệu số (dùng func data_scaled)
+    stats: thống kê có sẵn (vd: của bộ dữ liệu cũ) để làm sạch dữ liệu mới theo cùng chuẩn;
+           None = tự tính trên chính df.
+    return_stats: True -> trả về (df, stats) để lưu lại dùng cho lần sau.
+    """
+    # 1. Xóa dòng trùng (so trên mã số nguyên của từng cột, kết quả giống df.drop_duplicates())
+    df = drop_duplicates(df)
+
+    # 2. Xử lí định dạng sai
+    df = _coerce_numeric(df)
+
+    # 3-5. Tính thống kê toàn cục (mean, mode, IQR) rồi áp dụng: điền NA, sửa nhãn, chặn outlier
+    if stats is None:
+        stats = compute_cleaning_stats(df)
+    df = apply_cleaning_stats(df, stats)
+    if return_stats:
+        return df, stats
+    return df
+
+
+# --- LÀM SẠCH THEO KHỐI CHO FILE LỚN HƠN RAM (2 LƯỢT ĐỌC) ---
+
+
+class _QuantileSketch:
+    """
+    Sketch phân vị có thể gộp (mergeable): lưu các cặp (giá trị, số lần xuất hiện).
+    - Khi số giá trị khác nhau <= max_size: kết quả quantile CHÍNH XÁC như pandas (nội suy tuyến tính).
+    - Khi vượt quá: gộp các giá trị liền kề thành max_size nhóm có trọng số gần bằng nhau,
+      sai số hạng (rank) khoảng 1/max_size. Bộ nhớ luôn bị chặn bởi max_size.
+    Age/Height/Weight chỉ có vài trăm giá trị khác nhau nên thực tế luôn chính xác.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.values = np.empty(0, dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.float64)
+
+    def add(self, values, counts=None):
+        values = np.asarray(values, dtype=np.float64)
+        if counts is None:
+            values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        merged_values, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        merged_counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]))
+        self.values, self.counts = merged_values, merged_counts
+        if len(self.values) > self.max_size:
+            self._compress()
+
+    def merge(self, other):
+        self.add(other.values, other.counts)
+
+    def _compress(self):
+        # Chia theo trọng số tích lũy thành max_size nhóm, mỗi nhóm thay bằng trung bình có trọng số
+        cum = np.cumsum(self.counts)
+        groups = np.minimum((cum - self.counts) * self.max_size // cum[-1], self.max_size - 1).astype(np.int64)
+        counts = np.bincount(groups, weights=self.counts)
+        values = np.bincount(groups, weights=self.values * self.counts)
+        keep = counts > 0
+        self.values, self.counts = values[keep] / counts[keep], counts[keep]
+
+    def quantile(self, q):
+        n = self.counts.sum()
+        if n == 0:
+            return np.nan
+        # Giống pandas: vị trí h = (n - 1) * q trên dãy đã sắp xếp, nội suy giữa 2 phần tử kề nhau
+        h = (n - 1) * q
+        cum = np.cumsum(self.counts)
+        lo = self.values[np.searchsorted(cum, np.floor(h), side="right")]
+        hi = self.values[min(np.searchsorted(cum, np.floor(h) + 1, side="right"), len(cum) - 1)]
+        return lo + (hi - lo) * (h - np.floor(h))
+
+
+class _SeenRows:
+    """
+    Tập hash 64-bit của các dòng đã gặp, dùng để bỏ dòng trùng giữa các khối.
+    Lưu thành vài mảng numpy đã sắp xếp, gộp dần theo kích thước (kiểu LSM) nên
+    thêm/tra cứu đều nhanh; tốn 8 byte cho mỗi dòng duy nhất (ít hơn ~100 lần so với giữ cả dòng).
+    Trùng trong cùng 1 khối được so chính xác (dedup.duplicated); trùng giữa các khối chỉ so hash vì các dòng
+    của khối trước không còn trong bộ nhớ, nên kết quả là xấp xỉ: 2 dòng khác nhau trùng hash 64-bit thì dòng sau
+    bị bỏ, khác với clean_data (xác suất cỡ n^2 / 2^65 với n dòng duy nhất, ~3e-6 với 10 triệu dòng).
+    """
+
+    def __init__(self):
+        self.levels = []
+
+    @staticmethod
+    def _hashes(chunk):
+        # Cột số -> float64 trước khi băm: ID/Year là số nguyên ở khối không có NA nhưng float64 ở khối có NA,
+        # cùng 1 dòng phải ra cùng hash ở mọi khối
+        numeric = {col: "float64" for col, dtype in chunk.dtypes.items() if dtype.kind in "iuf"}
+        return pd.util.hash_pandas_object(chunk.astype(numeric), index=False).to_numpy()
+
+    def drop_seen(self, chunk):
+        """Trả về mask các dòng CHƯA gặp (kể cả trùng ngay trong khối) và ghi nhận chúng."""
+        hashes = self._hashes(chunk)
+        keep = ~duplicated(chunk)
+        for level in self.levels:
+            pos = np.minimum(np.searchsorted(level, hashes), len(level) - 1)
+            keep &= level[pos] != hashes
+        new = np.sort(hashes[keep])
+        while self.levels and len(self.levels[-1]) <= len(new):
+            new = np.union1d(self.levels.pop(), new)
+        self.levels.append(new)
+        return keep
+
+
+def _read_csv_chunks(file_path, chunksize, usecols=None):
+    """Đọc CSV theo khối: cột chuỗi ở dạng category, cột số ép kiểu & thu gọn theo ATHLETE_DTYPES."""
+    dtypes = {col: dtype for col, dtype in ATHLETE_DTYPES.items()
+              if dtype == "category" and (usecols is None or col in usecols)}
+    for chunk in pd.read_csv(file_path, dtype=dtypes, usecols=usecols, chunksize=chunksize):
+        chunk = _coerce_numeric(chunk)
+        for col in NUMERIC_COLS:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].astype(ATHLETE_DTYPES[col])
+        for col in ("ID", "Year"):
+            if col in chunk.columns and chunk[col].notna().all():
+                chunk[col] = chunk[col].astype(ATHLETE_DTYPES[col])
+        yield chunk
+
+
+def _iter_unique_chunks(file_path, chunksize, keep_masks, usecols=None):
+    """Đọc lại file theo khối và chỉ giữ các dòng không trùng theo mask đã lưu ở lượt 1."""
+    for chunk, packed in zip(_read_csv_chunks(file_path, chunksize, usecols), keep_masks):
+        yield chunk[np.unpackbits(packed, count=len(chunk)).astype(bool)]
+
+
+def collect_cleaning_stats_chunked(file_path, chunksize=100_000, usecols=None):
+    """
+    Lượt 1: đọc từng khối, đánh dấu dòng trùng và gom thống kê giống hệt compute_cleaning_stats:
+    - mean: cộng dồn tổng và số lượng
+    - bounds: Q1/Q3 từ _QuantileSketch (sau khi cộng thêm các ô NA sẽ được điền bằng mean)
+    - mode: đếm chính xác số lần xuất hiện, nhưng chỉ cho các cột chuỗi thực sự có NA
+      (chỉ những cột này mới cần điền Mode) bằng một lượt đọc phụ chỉ các cột đó.
+    Trả về (stats, keep_masks): keep_masks là mask dòng không trùng của từng khối,
+    nén 1 bit/dòng, để các lượt sau không phải băm lại toàn bộ dòng.
+    """
+    seen = _SeenRows()
+    keep_masks = []
+    sums, counts, missing, sketches, label_missing = {}, {}, {}, {}, {}
+    for chunk in _read_csv_chunks(file_path, chunksize, usecols):
+        keep = seen.drop_seen(chunk)
+        keep_masks.append(np.packbits(keep))
+        chunk = chunk[keep]
+        for col in NUMERIC_COLS:
+            if col in chunk.columns:
+                values = chunk[col].to_numpy(dtype=np.float64)
+                valid = ~np.isnan(values)
+                sums[col] = sums.get(col, 0.0) + values[valid].sum()
+                counts[col] = counts.get(col, 0) + int(valid.sum())
+                missing[col] = missing.get(col, 0) + int((~valid).sum())
+                sketches.setdefault(col, _QuantileSketch()).add(chunk[col].to_numpy()[valid])
+        for col in _label_columns(chunk):
+            label_missing[col] = label_missing.get(col, 0) + int(chunk[col].isna().sum())
+    del seen
+
+    stats = {"mean": {}, "mode": {}, "bounds": {}}
+    for col, sketch in sketches.items():
+        mean = sums[col] / counts[col] if counts[col] else np.nan
+        stats["mean"][col] = float(mean)
+        if missing[col] and counts[col]:
+            # Dữ liệu sau khi điền NA có thêm 'missing' giá trị bằng mean (ép về đúng dtype của cột)
+            sketch.add([np.float64(np.dtype(ATHLETE_DTYPES[col]).type(mean))], [missing[col]])
+        stats["bounds"][col] = _iqr_bounds(sketch.quantile(0.25), sketch.quantile(0.75))
+
+    mode_cols = [col for col, n in label_missing.items() if n > 0]
+    if mode_cols:
+        value_counts = {}
+        for chunk in _iter_unique_chunks(file_path, chunksize, keep_masks, usecols):
+            for col in mode_cols:
+                vc = chunk[col].value_counts()
+                value_counts[col] = vc if col not in value_counts else value_counts[col].add(vc, fill_value=0)
+        for col, vc in value_counts.items():
+            vc = vc[vc > 0]
+            if len(vc) > 0:
+                # Giống Series.mode()[0]: số lần nhiều nhất, hòa thì lấy giá trị nhỏ nhất
+                stats["mode"][col] = sorted(vc[vc == vc.max()].index)[0]
+    return stats, keep_masks
+
+
+def clean_data_chunked(file_path, output_path=None, chunksize=100_000, usecols=None):
+    """
+    Làm sạch file CSV lớn hơn RAM, kết quả tương đương clean_data nhưng ghi ra parquet.
+    - Lượt 1 (collect_cleaning_stats_chunked): đánh dấu dòng trùng, gom mean / mode / Q1-Q3 toàn cục.
+    - Lượt 2: đọc lại từng khối, bỏ dòng trùng, áp dụng apply_cleaning_stats rồi ghi ngay khối đó
+      ra file parquet (mỗi khối là một row group).
+    Bộ nhớ đỉnh phụ thuộc chunksize chứ không phụ thuộc kích thước file; phần duy nhất tăng theo
+    file là tập hash chống trùng ở lượt 1 (8 byte/dòng) và mask dòng trùng (1 bit/dòng).
+    Bỏ trùng giữa các khối dựa trên hash nên chỉ xấp xỉ clean_data khi có va chạm hash (xem _SeenRows).
+    Trả về (đường dẫn file parquet, dict thống kê đã dùng).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if output_path is None:
+        output_path = os.path.splitext(file_path)[0] + "_cleaned.parquet"
+
+    print("[Lượt 1] Đang gom thống kê toàn cục...")
+    stats, keep_masks = collect_cleaning_stats_chunked(file_path, chunksize, usecols)
+
+    print("[Lượt 2] Đang làm sạch và ghi từng khối...")
+    writer = None
+    schema = None
+    written = 0
+    try:
+        for chunk in _iter_unique_chunks(file_path, chunksize, keep_masks, usecols):
+            chunk = apply_cleaning_stats(chunk, stats)
+            if writer is None:
+                # Schema cố định theo khối đầu; cột category dùng dictionary để mỗi khối
+                # có bộ category riêng mà vẫn ghi chung một file
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                for i, field in enumerate(schema):
+                    if pa.types.is_dictionary(field.type):
+                        schema = schema.set(i, pa.field(field.name, pa.dictionary(pa.int32(), pa.string())))
+                writer = pq.ParquetWriter(output_path + ".tmp", schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(output_path + ".tmp", output_path)
+    print(f"Đã lưu {written:,} dòng dữ liệu sạch: {output_path}")
+    return output_path, stats
+
+
 def clean_team_name(df):
     """
     Làm sạch cột 'Team' bằng cách loại bỏ các ký tự số và dấu gạch ngang thừa ở cuối.
@@ -88,19 +455,41 @@ def clean_team_name(df):
     Mục đích: Giúp thống kê thành tích quốc gia chính xác hơn, tránh việc một nước bị chia thành nhiều team nhỏ.
     """
     df = df.copy()
-    df['Team'] = df['Team'].str.replace(r'-\d+', '', regex=True)
+    df['Team'] = _as_category_like(
+        df['Team'].str.replace(r'-\d+', '', regex=True), df['Team'])
     return df
 
 
+def _strip_sport_prefix(sport, event):
+    """Cắt tên môn ở đầu tên nội dung thi đấu cho một cặp (Sport, Event)."""
+    if isinstance(event, str) and isinstance(sport, str) and event.startswith(sport):
+        return event[len(sport):].strip()
+    return event
+
+
 def clean_event_name(df):
     """
     Làm sạch cột 'Event' bằng cách cắt bỏ tên môn thể thao (Sport) bị lặp lại ở đầu.
     Ví dụ: Sport='Basketball', Event='Basketball Men's Basketball' -> 'Men's Basketball'.
     Mục đích: Làm ngắn gọn tên sự kiện, giúp bảng biểu hiển thị đẹp và dễ đọc hơn.
+    Chỉ xử lý chuỗi trên các cặp (Sport, Event) duy nhất (vài trăm cặp) rồi ánh xạ
+    ngược lại cho từng dòng bằng mã số nguyên, thay vì apply từng dòng.
     """
     df = df.copy()
-    df['Event'] = df.apply(lambda x: x['Event'][len(x['Sport']):].strip()
-                           if x['Event'].startswith(x['Sport']) else x['Event'], axis=1)
+    sport_codes, sports = pd.factorize(df['Sport'], use_na_sentinel=False)
+    event_codes, events = pd.factorize(df['Event'], use_na_sentinel=False)
+    # Ghép 2 mã thành 1 mã cặp rồi factorize lần nữa để lấy danh sách cặp duy nhất
+    n_events = max(len(events), 1)
+    pair_codes, pairs = pd.factorize(sport_codes.astype(np.int64) * n_events + event_codes)
+    cleaned = np.array([_strip_sport_prefix(sports[pair // n_events], events[pair % n_events])
+                        for pair in pairs], dtype=object)
+
+    if isinstance(df['Event'].dtype, pd.CategoricalDtype):
+        # Dựng thẳng category từ mã, không tạo lại chuỗi cho từng dòng
+        cleaned_codes, categories = pd.factorize(cleaned, sort=True)
+        df['Event'] = pd.Categorical.from_codes(cleaned_codes[pair_codes], categories=categories)
+    else:
+        df['Event'] = pd.Series(cleaned[pair_codes], index=df.index).astype(df['Event'].dtype)
     return df
 
 
@@ -123,6 +512,14 @@ def extract_nickname(df):
     return df[new_cols_order]
 
 
+def clean_extra_fields(df):
+    """Áp dụng các bước làm sạch theo từng dòng sau clean_data: tên đoàn, tên nội dung, biệt danh."""
+    df = clean_team_name(df)
+    df = clean_event_name(df)
+    df = extract_nickname(df)
+    return df
+
+
 def scale_data(df):
     """
     Chuẩn hóa các cột số (trừ ID và year nếu có)
@@ -139,15 +536,217 @@ def scale_data(df):
     return df_scaled
 
 
+# --- SNAPSHOT DỮ LIỆU SẠCH (PARQUET) ---
+
+SNAPSHOT_SUFFIX = ".clean.parquet"
+SNAPSHOT_META_SUFFIX = ".clean.json"
+
+
+def get_snapshot_paths(file_path):
+    """
+    Trả về (đường dẫn file parquet, đường dẫn file metadata) của snapshot,
+    đặt ngay cạnh file CSV gốc.
+    Ví dụ: 'data/athlete_events.csv' -> 'data/athlete_events.clean.parquet'.
+    """
+    base = os.path.splitext(file_path)[0]
+    return base + SNAPSHOT_SUFFIX, base + SNAPSHOT_META_SUFFIX
+
+
+def _hash_file(file_path, block_size=1 << 20):
+    """Băm SHA-256 nội dung file theo từng khối để không phải đọc cả file vào RAM."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cleaning_code_hash():
+    """
+    Hash mã nguồn mọi module quyết định kết quả làm sạch: module này và modules/dedup.py
+    (clean_data gọi drop_duplicates). tracing chỉ đo thời gian, không đổi kết quả nên không tính.
+    """
+    sha = hashlib.sha256()
+    for path in (__file__, inspect.getfile(drop_duplicates)):
+        sha.update(_hash_file(path).encode())
+    return sha.hexdigest()
+
+
+def get_snapshot_key(file_path):
+    """
+    Khóa của snapshot gồm 2 phần:
+    - source: hash nội dung file CSV (dữ liệu nguồn thay đổi -> snapshot hết hạn)
+    - code: hash mã nguồn các module làm sạch (sửa logic làm sạch / khử trùng lặp -> snapshot hết hạn)
+    """
+    return {
+        "source": _hash_file(file_path),
+        "code": _cleaning_code_hash(),
+    }
+
+
+def load_snapshot_meta(file_path):
+    """Đọc file metadata của snapshot (khóa, số dòng, thống kê làm sạch). None nếu chưa có."""
+    meta_path = get_snapshot_paths(file_path)[1]
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_snapshot(file_path):
+    """
+    Đọc snapshot đã làm sạch nếu còn hợp lệ.
+    Trả về None nếu chưa có snapshot, snapshot đã cũ hoặc không đọc được.
+    """
+    snapshot_path, meta_path = get_snapshot_paths(file_path)
+    if not (os.path.exists(snapshot_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        meta = load_snapshot_meta(file_path)
+        if meta.get("key") != get_snapshot_key(file_path):
+            print("Snapshot đã cũ, sẽ làm sạch lại dữ liệu.")
+            return None
+        df = pd.read_parquet(snapshot_path)
+        print("Đọc snapshot dữ liệu sạch thành công!")
+        return df
+    except Exception as e:
+        print("Lỗi khi đọc snapshot:", e)
+        return None
+
+
+def save_snapshot(df, file_path, stats=None, extra_meta=None):
+    """
+    Ghi DataFrame đã làm sạch ra parquet (giữ nguyên dtype) kèm file metadata chứa khóa
+    và thống kê làm sạch đã dùng (để làm sạch dữ liệu bổ sung sau này theo cùng chuẩn).
+    Ghi ra file tạm rồi mới đổi tên để không bao giờ để lại snapshot ghi dở.
+    """
+    snapshot_path, meta_path = get_snapshot_paths(file_path)
+    meta = {"key": get_snapshot_key(file_path), "rows": len(df), "stats": stats}
+    meta.update(extra_meta or {})
+    try:
+        df.to_parquet(snapshot_path + ".tmp", index=False)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(snapshot_path + ".tmp", snapshot_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        print(f"Đã lưu snapshot dữ liệu sạch: {snapshot_path}")
+        return True
+    except Exception as e:
+        # Thiếu pyarrow hoặc không có quyền ghi: vẫn chạy bình thường, chỉ là không có snapshot
+        print("Không thể lưu snapshot:", e)
+        return False
+
+
+def _arrow_string_hash(values):
+    """
+    Băm cột chuỗi lưu bằng Arrow (dtype 'str' của pandas) thẳng trên buffer offsets + dữ liệu,
+    nhanh hơn hàng chục lần so với băm từng chuỗi. Không phụ thuộc cách bảng được chia khúc (chunk).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arr = values.__arrow_array__()
+    arr = arr.combine_chunks() if isinstance(arr, pa.ChunkedArray) else arr
+    sha = hashlib.sha256(np.packbits(arr.is_valid().to_numpy(zero_copy_only=False)).tobytes())
+    arr = pc.fill_null(arr, "").cast(pa.large_string())
+    offsets = np.frombuffer(arr.buffers()[1], dtype=np.int64)[arr.offset:arr.offset + len(arr) + 1]
+    sha.update((offsets - offsets[0]).tobytes())
+    if len(arr) > 0:
+        sha.update(memoryview(arr.buffers()[2])[offsets[0]:offsets[-1]])
+    return sha.digest()
+
+
+def _content_fingerprint(df):
+    """
+    Băm kích thước, tên + dtype các cột và nội dung của TOÀN BỘ các dòng (kể cả index).
+    Dùng hàm vector hóa (pd.util.hash_pandas_object; cột chuỗi Arrow băm thẳng trên buffer):
+    vài chục mili-giây với 270k dòng.
+    """
+    sha = hashlib.sha256()
+    sha.update(repr((df.shape, list(df.columns), [str(t) for t in df.dtypes])).encode())
+    arrow_strings = [i for i, dtype in enumerate(df.dtypes)
+                     if getattr(dtype, "storage", None) == "pyarrow"
+                     and hasattr(df.iloc[:, i].array, "__arrow_array__")]
+    others = [i for i in range(df.shape[1]) if i not in arrow_strings]
+    # Các cột còn lại + index được gộp thành 1 hash 64-bit mỗi dòng, chỉ băm SHA-256 mảng đó
+    rows = df.iloc[:, others] if others else df.index.to_frame(index=False)
+    sha.update(pd.util.hash_pandas_object(rows, index=True).to_numpy().tobytes())
+    for i in arrow_strings:
+        sha.update(_arrow_string_hash(df.iloc[:, i].array))
+    return sha.hexdigest()[:16]
+
+
+# id(bảng) -> (weakref tới bảng, (shape, cột, dtype) lúc băm, dấu vân tay). Mục bị xóa khi bảng được thu hồi.
+_fingerprints = {}
+
+
+def _fingerprint_shape(df):
+    return df.shape, tuple(df.columns), tuple(df.dtypes)
+
+
+def _forget_fingerprint(key, ref):
+    entry = _fingerprints.get(key)
+    if entry is not None and entry[0] is ref:
+        _fingerprints.pop(key, None)
+
+
+def remember_fingerprint(df, fingerprint):
+    """Ghi sẵn dấu vân tay đã biết của df (vd: bản sao nông của bảng dùng chung) để khỏi băm lại."""
+    key = id(df)
+    ref = weakref.ref(df, lambda ref, key=key: _forget_fingerprint(key, ref))
+    _fingerprints[key] = (ref, _fingerprint_shape(df), fingerprint)
+    return fingerprint
+
+
+def dataset_fingerprint(df):
+    """
+    Dấu vân tay của một DataFrame để làm khóa cache (index, kết quả phân tích, cube, ảnh biểu đồ...):
+    hash nội dung của toàn bộ bảng (xem _content_fingerprint), nên sửa 1 ô bất kỳ cũng ra dấu vân tay khác.
+    Chỉ băm 1 lần cho mỗi đối tượng bảng: các lần sau (memo, cube, biểu đồ... cùng 1 bảng) dùng lại kết quả.
+    Bảng đã dùng làm khóa thì không được sửa giá trị tại chỗ (thêm / bớt / đổi kiểu cột thì tự băm lại);
+    muốn sửa thì sửa trên bản sao (df.copy(deep=False) là đủ, nhờ copy-on-write).
+    """
+    entry = _fingerprints.get(id(df))
+    if entry is not None and entry[0]() is df and entry[1] == _fingerprint_shape(df):
+        return entry[2]
+    return remember_fingerprint(df, _content_fingerprint(df))
+
+
 # --- HÀM LOAD DỮ LIỆU (CACHE ĐỂ CHẠY NHANH HƠN) ---
 
 
 @st.cache_data
-def load_and_clean_data(filepath):
-    df = load_data(filepath)
-    df = clean_data(df)
-    # Áp dụng các hàm làm sạch từ analysis.py ngay khi load
-    df = clean_team_name(df)
-    df = clean_event_name(df)
-    df = extract_nickname(df)
+def load_and_clean_data(filepath, use_snapshot=True, _raw=None):
+    """
+    Đọc và làm sạch toàn bộ dữ liệu.
+    Nếu có snapshot hợp lệ (cùng nội dung CSV và cùng phiên bản code làm sạch) thì đọc thẳng
+    từ snapshot, ngược lại làm sạch lại từ CSV rồi ghi snapshot mới cho lần chạy sau.
+    _raw: bảng gốc đã đọc sẵn từ chính file này (vd: load_data), dùng thay cho việc đọc lại CSV;
+    không bị sửa. Có dấu gạch dưới để st.cache_data không băm tham số này.
+    """
+    if use_snapshot:
+        with tracing.stage("load_snapshot") as entry:
+            df = load_snapshot(filepath)
+            entry["rows_out"] = tracing.count_rows(df)
+        if df is not None:
+            return df
+
+    with tracing.stage("load_data") as entry:
+        # Đọc thẳng (bỏ qua st.cache_data của load_data): kết quả đã được cache ở cấp hàm này,
+        # không cần giữ thêm 1 bản bảng gốc trong cache
+        df = load_data.__wrapped__(filepath) if _raw is None else _raw.copy(deep=False)
+        entry["rows_out"] = tracing.count_rows(df)
+    if df is None:
+        return None
+    with tracing.stage("clean_data", rows_in=len(df)) as entry:
+        df, stats = clean_data(df, return_stats=True)
+        df = clean_extra_fields(df)
+        # Đánh số lại dòng (bỏ khoảng trống do xóa dòng trùng) cho giống hệt bảng đọc lại từ snapshot
+        # (parquet ghi với index=False) -> lần chạy đầu và các lần sau cho cùng 1 bảng, cùng dấu vân tay
+        df = df.reset_index(drop=True)
+        entry["rows_out"] = len(df)
+
+    if use_snapshot:
+        with tracing.stage("save_snapshot", rows_in=len(df)):
+            save_snapshot(df, filepath, stats=stats)
     return df
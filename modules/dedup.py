@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+# --- BỎ DÒNG TRÙNG TRÊN MÃ SỐ NGUYÊN (THAY CHO df.drop_duplicates) ---
+# Mỗi cột được đổi thành mã số nguyên (cột category: dùng thẳng mã có sẵn; cột số nguyên: trừ đi min;
+# cột khác: pd.factorize), các mã được ghép thành 1 khóa int64 cho mỗi dòng (khóa = khóa * số giá trị
+# của cột + mã), rồi tìm dòng trùng bằng 1 lần np.sort. Khóa ghép chính xác (không phải hash) nên kết quả
+# giống hệt pandas: NA bằng NA, giữ dòng đầu / cuối như tham số keep.
+# Khi khóa sắp tràn 64 bit (và trước các cột chuỗi, đắt nhất khi mã hóa), chỉ giữ lại các dòng đang trùng
+# khóa: dòng không trùng ở 1 tập cột thì chắc chắn không trùng ở mọi cột, nên các cột còn lại thường chỉ
+# phải mã hóa trên vài % số dòng.
+
+_KEY_LIMIT = 2 ** 62
+
+
+def _is_cheap(series):
+    """Cột mã hóa được rẻ (không phải băm chuỗi): category, số, bool."""
+    return isinstance(series.dtype, pd.CategoricalDtype) or series.dtype.kind in "biuf"
+
+
+def column_codes(series):
+    """(mã 0..n-1 của từng dòng, n). Các giá trị bằng nhau (kể cả NA với NA) có cùng mã."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Mã category là -1 với NA -> dời lên 1, NA = 0
+        codes = series.cat.codes.to_numpy().astype(np.int64) + 1
+        return codes, len(series.cat.categories) + 1
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biu" and len(series) > 0:
+        values = series.to_numpy().astype(np.int64)
+        low, high = int(values.min()), int(values.max())
+        if high - low < 4 * len(values):  # Giá trị dày đặc (ID, Year...): mã = giá trị - min
+            return values - low, high - low + 1
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return codes.astype(np.int64), max(len(uniques), 1)
+
+
+def _sort_groups(key, cardinality):
+    """
+    Sắp xếp các dòng theo khóa, cùng khóa giữ thứ tự xuất hiện. Trả về (số thứ tự dòng theo thứ tự đã sắp,
+    mask 'dòng kế tiếp cùng khóa với dòng trước'). Thường chỉ cần 1 lần np.sort trên khóa * n + dòng;
+    không đủ chỗ trong 64 bit thì dùng argsort ổn định.
+    """
+    n_rows = len(key)
+    if cardinality * n_rows < _KEY_LIMIT:
+        packed = np.sort(key * n_rows + np.arange(n_rows, dtype=np.int64))
+        return packed % n_rows, (packed[1:] // n_rows) == (packed[:-1] // n_rows)
+    rows = np.argsort(key, kind="stable")
+    ordered = key[rows]
+    return rows, ordered[1:] == ordered[:-1]
+
+
+def _dense_rank(rows, same):
+    """Đánh số lại các nhóm khóa thành 0..k-1 từ kết quả _sort_groups. Trả về (hạng theo thứ tự gốc, k)."""
+    ranks = np.cumsum(np.r_[True, ~same]) - 1
+    result = np.empty(len(rows), dtype=np.int64)
+    result[rows] = ranks
+    return result, int(ranks[-1]) + 1
+
+
+def row_keys(df, subset=None):
+    """
+    Khóa int64 của từng dòng theo các cột 'subset' (mặc định: mọi cột): 2 dòng bằng nhau trên các cột đó
+    <=> cùng khóa. Trả về (khóa, số giá trị khóa có thể có). Khóa sắp tràn 64 bit thì được đánh số lại
+    (hạng 0..k-1 sau khi sắp xếp, k <= số dòng).
+    """
+    if isinstance(subset, str):
+        subset = [subset]
+    columns = list(df.columns) if subset is None else list(subset)
+    key, cardinality = np.zeros(len(df), dtype=np.int64), 1
+    for col in columns:
+        codes, n = column_codes(df[col])
+        if cardinality * n >= _KEY_LIMIT:
+            key, cardinality = _dense_rank(*_sort_groups(key, cardinality))
+        key, cardinality = key * n + codes, cardinality * n
+    return key, cardinality
+
+
+def _mark(rows, same, keep):
+    """Mask dòng trùng (theo thứ tự gốc) từ kết quả _sort_groups."""
+    duplicated = np.zeros(len(same) + 1, dtype=bool)
+    if keep == "first":
+        duplicated[rows[1:][same]] = True
+    elif keep == "last":
+        duplicated[rows[:-1][same]] = True
+    elif keep is False:
+        duplicated[rows[1:][same]] = True
+        duplicated[rows[:-1][same]] = True
+    else:
+        raise ValueError("keep phải là 'first', 'last' hoặc False")
+    return duplicated
+
+
+def key_duplicated(key, cardinality, keep="first"):
+    """Mask dòng trùng theo khóa dòng (vd: của row_keys), bằng 1 lần sắp xếp."""
+    if len(key) == 0:
+        return np.zeros(0, dtype=bool)
+    return _mark(*_sort_groups(key, cardinality), keep=keep)
+
+
+def duplicated(df, subset=None, keep="first"):
+    """
+    Mảng bool đánh dấu dòng trùng, giống hệt df.duplicated(subset, keep).to_numpy().
+    Cột rẻ (category / số) được ghép khóa trước, cột chuỗi sau cùng; mỗi khi khóa sắp tràn hoặc trước
+    cột chuỗi, chỉ giữ lại các dòng còn trùng khóa (ứng viên) để mã hóa tiếp các cột còn lại.
+    """
+    if isinstance(subset, str):
+        subset = [subset]
+    columns = list(df.columns) if subset is None else list(subset)
+    columns = ([col for col in columns if _is_cheap(df[col])] +
+               [col for col in columns if not _is_cheap(df[col])])
+    result = np.zeros(len(df), dtype=bool)
+    if len(df) == 0:
+        return result
+
+    rows = np.arange(len(df))  # Số thứ tự các dòng ứng viên
+    key, cardinality = np.zeros(len(df), dtype=np.int64), 1
+
+    def prune(codes=None):
+        # Chỉ giữ các dòng có ít nhất 1 dòng khác cùng khóa, đánh số lại khóa của chúng thành 0..k-1
+        nonlocal rows, key, cardinality
+        order, same = _sort_groups(key, cardinality)
+        starts = np.r_[True, ~same]
+        in_group = ~(starts & np.r_[~same, True])  # Bỏ các nhóm chỉ có 1 dòng
+        # Cả nhóm được giữ nên đánh số lại các nhóm ứng viên ngay theo thứ tự đã sắp
+        ranks = np.empty(len(key), dtype=np.int64)
+        ranks[order[in_group]] = np.cumsum(starts[in_group]) - 1
+        candidates = np.zeros(len(key), dtype=bool)
+        candidates[order[in_group]] = True
+        rows, key = rows[candidates], ranks[candidates]
+        cardinality = max(int(starts[in_group].sum()), 1)
+        return None if codes is None else codes[candidates]
+
+    for col in columns:
+        if not _is_cheap(df[col]) and cardinality > 1:
+            prune()
+        if len(rows) == 0:
+            return result
+        codes, n = column_codes(df[col] if len(rows) == len(df) else df[col].take(rows))
+        if cardinality * n * len(rows) >= _KEY_LIMIT:
+            codes = prune(codes)
+            if len(rows) == 0:
+                return result
+        key, cardinality = key * n + codes, cardinality * n
+
+    result[rows] = key_duplicated(key, cardinality, keep=keep)
+    return result
+
+
+def drop_duplicates(df, subset=None, keep="first", ignore_index=False):
+    """Giống df.drop_duplicates(subset, keep, ignore_index=...) nhưng tìm dòng trùng bằng duplicated() ở trên."""
+    result = df[~duplicated(df, subset, keep)]
+    if ignore_index:
+        result = result.reset_index(drop=True)
+    return result
@@ -0,0 +1,199 @@
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+import modules.data_cleaning as dc
+from modules.dedup import drop_duplicates
+
+# --- SIÊU DỮ LIỆU CÁC CHIỀU (CHO CÁC Ô CHỌN CỦA BỘ LỌC) ---
+# Tính 1 lần cho mỗi bộ dữ liệu sạch và ghi ra file JSON cạnh snapshot ('data/athlete_events.clean.dims.json'):
+# - categories: các giá trị phân biệt (đã sắp xếp) + số dòng của từng giá trị
+# - numeric: min / max / số dòng có giá trị của các cột số
+# - years_by_season: danh sách năm tổ chức của từng mùa
+# - cooccurrence: với mỗi cặp cột phân loại, giá trị nào của cột này từng đi cùng giá trị nào của cột kia
+#   (vd: các môn 1 NOC từng thi đấu) -> ô chọn phụ thuộc nhau chỉ cần giao vài tập hợp, không quét dòng.
+# File được khóa bằng khóa snapshot của file CSV (dc.get_snapshot_key: băm toàn bộ nội dung CSV + code làm sạch)
+# + dấu vân tay bảng sạch (dc.dataset_fingerprint) + DIMENSIONS_VERSION.
+
+DIMENSIONS_VERSION = 2
+DIMENSIONS_SUFFIX = ".clean.dims.json"
+CATEGORY_COLUMNS = ['Team', 'NOC', 'Sport', 'City', 'Season', 'Sex']
+NUMERIC_COLUMNS = ['Age', 'Height', 'Weight', 'Year']
+
+
+def get_dimensions_path(file_path):
+    """'data/athlete_events.csv' -> 'data/athlete_events.clean.dims.json' (cạnh snapshot)."""
+    return os.path.splitext(file_path)[0] + DIMENSIONS_SUFFIX
+
+
+def _sorted_codes(series):
+    """(mã của từng dòng theo thứ tự giá trị đã sắp xếp, -1 nếu NA; list giá trị dạng chuỗi đã sắp xếp)."""
+    codes, uniques = pd.factorize(series.astype(str).where(series.notna()), sort=True)
+    return codes, [str(value) for value in uniques]
+
+
+def build_dimensions(df, categories=CATEGORY_COLUMNS, numeric=NUMERIC_COLUMNS, source=None):
+    """Tính siêu dữ liệu các chiều của bảng df (xem đầu file). source: khóa snapshot của file CSV gốc (nếu có)."""
+    dims = {"version": DIMENSIONS_VERSION, "source": source, "fingerprint": dc.dataset_fingerprint(df), "rows": len(df),
+            "athletes": int(df['ID'].nunique()) if 'ID' in df.columns else None,
+            "categories": {}, "numeric": {}, "years_by_season": {}, "cooccurrence": {}}
+
+    codes = {}
+    for col in categories:
+        if col not in df.columns:
+            continue
+        codes[col], values = _sorted_codes(df[col])
+        counts = np.bincount(codes[col][codes[col] >= 0], minlength=len(values))
+        dims["categories"][col] = {"values": values, "counts": counts.tolist()}
+
+    for col in numeric:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        count = int(values.notna().sum())
+        dims["numeric"][col] = {"min": float(values.min()) if count else None,
+                                "max": float(values.max()) if count else None, "count": count}
+
+    if 'Season' in df.columns and 'Year' in df.columns:
+        pairs = drop_duplicates(df[['Season', 'Year']].dropna())
+        for season, years in pairs.groupby('Season', observed=True)['Year']:
+            dims["years_by_season"][str(season)] = sorted(int(year) for year in years)
+
+    # Các cặp (mã cột a, mã cột b) duy nhất: ghép thành 1 số int64 rồi np.unique, tính 1 lần cho cả 2 chiều
+    columns = list(codes)
+    for col in columns:
+        dims["cooccurrence"][col] = {}
+    for i, col_a in enumerate(columns):
+        for col_b in columns[i + 1:]:
+            a, b = codes[col_a], codes[col_b]
+            n_b = len(dims["categories"][col_b]["values"])
+            valid = (a >= 0) & (b >= 0)
+            pairs = np.unique(a[valid].astype(np.int64) * n_b + b[valid])
+            pair_a, pair_b = pairs // n_b, pairs % n_b
+            dims["cooccurrence"][col_a][col_b] = _group_codes(pair_a, pair_b)
+            order = np.lexsort((pair_a, pair_b))
+            dims["cooccurrence"][col_b][col_a] = _group_codes(pair_b[order], pair_a[order])
+    return dims
+
+
+def _group_codes(keys, values):
+    """keys đã sắp xếp -> {mã khóa (chuỗi, cho JSON): list mã giá trị tăng dần}."""
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else []
+    bounds = list(starts) + [len(keys)]
+    return {str(int(keys[start])): values[start:stop].tolist() for start, stop in zip(bounds[:-1], bounds[1:])}
+
+
+def save_dimensions(dims, file_path):
+    """Ghi siêu dữ liệu ra file JSON cạnh snapshot (ghi file tạm rồi đổi tên)."""
+    path = get_dimensions_path(file_path)
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(dims, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+        return True
+    except Exception as e:
+        print("Không thể lưu siêu dữ liệu các chiều:", e)
+        return False
+
+
+def load_dimensions(file_path, fingerprint=None, source=None):
+    """
+    Đọc file siêu dữ liệu; None nếu chưa có, hỏng, khác phiên bản,
+    khác khóa snapshot 'source' (dc.get_snapshot_key) hoặc khác dấu vân tay 'fingerprint'.
+    """
+    path = get_dimensions_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            dims = json.load(f)
+    except Exception as e:
+        print("Lỗi khi đọc siêu dữ liệu các chiều:", e)
+        return None
+    if dims.get("version") != DIMENSIONS_VERSION:
+        return None
+    if (source is not None and dims.get("source") != source) or \
+            (fingerprint is not None and dims.get("fingerprint") != fingerprint):
+        return None
+    return dims
+
+
+def get_dimensions(df, file_path=None):
+    """
+    Siêu dữ liệu của bảng sạch df: đọc từ file cạnh snapshot nếu còn khớp với cả nội dung file CSV
+    (khóa snapshot) lẫn df, không thì tính lại (và ghi file nếu có file_path).
+    Kết quả đã sẵn sàng để tra cứu (xem prepare).
+    """
+    source = dc.get_snapshot_key(file_path) if file_path else None
+    dims = load_dimensions(file_path, dc.dataset_fingerprint(df), source) if file_path else None
+    if dims is None:
+        dims = build_dimensions(df, source=source)
+        if file_path:
+            save_dimensions(dims, file_path)
+    return prepare(dims)
+
+
+def prepare(dims):
+    """Thêm bảng tra ngược giá trị -> mã cho từng cột phân loại (không ghi ra file)."""
+    dims["lookup"] = {col: {value: code for code, value in enumerate(entry["values"])}
+                      for col, entry in dims["categories"].items()}
+    return dims
+
+
+# --- TRA CỨU CHO Ô CHỌN ---
+
+
+def values(dims, col):
+    """Các giá trị phân biệt (đã sắp xếp) của cột phân loại 'col' (list mới, sửa thoải mái)."""
+    return list(dims["categories"][col]["values"])
+
+
+def value_counts(dims, col):
+    """Series số dòng của từng giá trị của cột 'col'."""
+    entry = dims["categories"][col]
+    return pd.Series(entry["counts"], index=entry["values"], name=col)
+
+
+def numeric_range(dims, col):
+    """(min, max) của cột số 'col'; (None, None) nếu cột không có giá trị."""
+    entry = dims["numeric"].get(col) or {}
+    return entry.get("min"), entry.get("max")
+
+
+def integer_bounds(dims, col, default=(0, 100)):
+    """(floor(min), ceil(max)) của cột số, dùng làm giới hạn cho slider / number_input."""
+    low, high = numeric_range(dims, col)
+    if low is None:
+        return default
+    return int(math.floor(low)), int(math.ceil(high))
+
+
+def years(dims, season=None):
+    """Danh sách năm tổ chức của 1 mùa (None = mọi mùa), tăng dần."""
+    if season is not None:
+        return list(dims["years_by_season"].get(season, []))
+    return sorted({year for season_years in dims["years_by_season"].values() for year in season_years})
+
+
+def options(dims, col, selected=None):
+    """
+    Các giá trị của cột 'col' còn phù hợp với các lựa chọn ở cột khác.
+    selected: {cột: giá trị đã chọn} (None / cột chính nó bị bỏ qua). Với mỗi lựa chọn lấy tập giá trị
+    của 'col' từng đi cùng giá trị đó rồi giao các tập lại, giữ thứ tự sắp xếp.
+    Giao từng cặp nên là tập cha của kết quả chính xác khi chọn nhiều cột cùng lúc
+    (vd: môn của NOC X và môn tổ chức ở thành phố Y, chưa chắc X đã thi môn đó ở Y).
+    """
+    allowed = None
+    for other, value in (selected or {}).items():
+        if value is None or other == col or other not in dims["cooccurrence"].get(col, {}):
+            continue
+        code = dims["lookup"][other].get(str(value))
+        codes = dims["cooccurrence"][other][col].get(str(code), []) if code is not None else []
+        allowed = set(codes) if allowed is None else allowed.intersection(codes)
+    all_values = values(dims, col)
+    if allowed is None:
+        return all_values
+    return [all_values[code] for code in sorted(allowed)]
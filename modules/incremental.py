@@ -0,0 +1,440 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import modules.data_cleaning as dc
+import modules.analysis as ana
+from modules.dedup import duplicated
+
+# --- CẬP NHẬT TĂNG DẦN KHI CÓ KỲ OLYMPIC MỚI ---
+# Thay vì làm sạch + phân tích lại toàn bộ 120 năm dữ liệu, chỉ xử lý các dòng mới:
+# - Làm sạch theo thống kê (mean/mode/IQR) đã lưu trong snapshot
+# - Dữ liệu mới lệch thống kê cũ quá ngưỡng -> làm sạch lại toàn bộ từ đầu (xem append_new_rows)
+# - Gộp vào snapshot và cộng dồn các bảng tổng hợp thay vì tính lại
+# - export_data.py và dashboard đọc thẳng các bảng tổng hợp đã lưu (stored_tables) khi còn khớp snapshot
+
+MEDALS = ['Gold', 'Silver', 'Bronze']
+# Khóa bỏ trùng giống calculate_medal_tally (môn đồng đội chỉ tính 1 huy chương)
+MEDAL_KEY_COLS = ['Team', 'NOC', 'Games', 'Year', 'Sport', 'Event', 'Medal']
+
+# Các tập khóa đã đếm: mỗi tập lưu hash đã sắp xếp (<tên>_keys) + vị trí dòng trong snapshot (<tên>_rows)
+KEY_SETS = ("row", "medal", "gender", "age")
+
+AGGREGATES_SUFFIX = ".clean.aggregates.json"
+KEYS_SUFFIX = ".clean.keys.npz"
+
+
+def _key_frame(df, cols):
+    """Các cột khóa của df, số nguyên -> int64, số thực -> float64 (cùng giá trị -> cùng khóa, bất kể dtype)."""
+    keys = df[cols].copy()
+    for col in cols:
+        if keys[col].dtype.kind in "iu":
+            keys[col] = keys[col].astype("int64")
+        elif keys[col].dtype.kind == "f":
+            keys[col] = keys[col].astype("float64")
+    return keys
+
+
+def _key_hashes(keys):
+    """Hash 64-bit cho từng dòng của bảng khóa (_key_frame)."""
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def _same_keys(left, right):
+    """So từng dòng của 2 bảng khóa cùng cột, cùng số dòng: mask dòng bằng nhau (NA bằng NA)."""
+    same = np.ones(len(left), dtype=bool)
+    for col in left.columns:
+        a, b = left[col].astype(object).to_numpy(), right[col].astype(object).to_numpy()
+        na_a, na_b = pd.isna(a), pd.isna(b)
+        equal = na_a & na_b
+        both = ~(na_a | na_b)
+        equal[both] = a[both] == b[both]
+        same &= equal
+    return same
+
+
+def _unseen(state, name, keys, base, key_func):
+    """
+    Mask các dòng của bảng khóa 'keys' chưa có trong tập khóa 'name' của state (chỉ tính lần xuất hiện đầu).
+    Hash trùng chỉ là ứng viên: được xác nhận bằng cách so giá trị khóa với dòng đã lưu của hash đó
+    (key_func(base.iloc[vị trí])) như dedup.drop_duplicates, nên 2 khóa khác nhau trùng hash 64-bit
+    không làm mất dòng thật. Trùng nhau trong chính 'keys' được tìm chính xác bằng dedup.duplicated.
+    """
+    new = ~duplicated(keys)
+    seen, rows = state[f"{name}_keys"], state[f"{name}_rows"]
+    if len(seen) == 0 or not new.any():
+        return new
+    hashes = _key_hashes(keys)
+    low, high = np.searchsorted(seen, hashes, "left"), np.searchsorted(seen, hashes, "right")
+    candidates = np.flatnonzero(new & (high > low))
+    if len(candidates) == 0:
+        return new
+    same = _same_keys(keys.iloc[candidates], key_func(base.iloc[rows[low[candidates]]]))
+    # Khác dòng đã lưu đầu tiên của hash (va chạm, rất hiếm): so 1 lần với mọi dòng đã lưu còn lại cùng hash
+    rest = np.flatnonzero(~same)
+    counts = high[candidates[rest]] - low[candidates[rest]] - 1
+    if counts.sum() > 0:
+        pairs = np.repeat(rest, counts)
+        steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        stored = rows[np.repeat(low[candidates[rest]] + 1, counts) + steps]
+        match = _same_keys(keys.iloc[candidates[pairs]], key_func(base.iloc[stored]))
+        same[np.unique(pairs[match])] = True
+    new[candidates[same]] = False
+    return new
+
+
+def _remember(state, name, keys, offset):
+    """
+    Thêm các dòng của bảng khóa 'keys' vào tập khóa 'name': mảng hash đã sắp xếp + vị trí dòng tương ứng
+    trong bảng sạch sau khi gộp (offset + index của keys), dùng để xác nhận trùng khóa ở _unseen.
+    """
+    hashes = np.concatenate([state[f"{name}_keys"], _key_hashes(keys)])
+    rows = np.concatenate([state[f"{name}_rows"], offset + keys.index.to_numpy(dtype=np.int64)])
+    order = np.argsort(hashes, kind="stable")
+    state[f"{name}_keys"], state[f"{name}_rows"] = hashes[order], rows[order]
+
+
+def _add_counts(table, counts):
+    """Cộng dồn bảng đếm (DataFrame hoặc Series), tự thêm dòng/cột mới nếu có."""
+    return table.add(counts, fill_value=0).fillna(0).astype("int64")
+
+
+def _age_groups(df):
+    """Nhóm tuổi giống hệt analyze_medals_and_participants_by_age."""
+    return pd.cut(df['Age'], bins=ana.AGE_BINS, labels=ana.AGE_LABELS, right=False)
+
+
+def _aged_keys(df):
+    """Bảng khóa (AgeGroup, ID) của các dòng có nhóm tuổi (giữ index của df)."""
+    aged = df.dropna(subset=['Age']).assign(AgeGroup=lambda x: _age_groups(x))
+    return _key_frame(aged[aged['AgeGroup'].notna()], ['AgeGroup', 'ID'])
+
+
+def _empty_state(columns):
+    state = {
+        "columns": list(columns),
+        "medal_tally": pd.DataFrame(dtype="int64"),
+        "gender_counts": pd.DataFrame(dtype="int64"),
+        "age_participants": pd.Series(0, index=ana.AGE_LABELS, dtype="int64"),
+        "age_medals": pd.Series(0, index=ana.AGE_LABELS, dtype="int64"),
+    }
+    for name in KEY_SETS:
+        state[f"{name}_keys"] = np.empty(0, dtype=np.uint64)
+        state[f"{name}_rows"] = np.empty(0, dtype=np.int64)
+    return state
+
+
+def update_aggregates(state, df, base=None):
+    """
+    Cộng dồn các dòng đã làm sạch 'df' vào trạng thái tổng hợp 'state'.
+    base: bảng sạch mà state đang mô tả (df được gộp vào sau nó), dùng để xác nhận trùng khóa (xem _unseen).
+    Mỗi bảng giữ tập hash các khóa đã đếm, nên chỉ các khóa mới mới được cộng thêm:
+    - medal_tally: khóa MEDAL_KEY_COLS (bỏ trùng môn đồng đội như calculate_medal_tally)
+    - gender_counts: khóa (Year, Sex, ID) = số VĐV duy nhất theo năm/giới tính
+    - age_participants: khóa (AgeGroup, ID); age_medals: cộng thẳng số dòng có huy chương
+    Chi phí tỉ lệ với số dòng mới, không phụ thuộc kích thước dữ liệu cũ.
+    """
+    df = df.reset_index(drop=True)
+    offset = 0 if base is None else len(base)
+    key_funcs = {"row": lambda x: _key_frame(x, state["columns"]),
+                 "medal": lambda x: _key_frame(x, MEDAL_KEY_COLS),
+                 "gender": lambda x: _key_frame(x, ['Year', 'Sex', 'ID']),
+                 "age": _aged_keys}
+
+    def take_new(name, keys):
+        new = _unseen(state, name, keys, base, key_funcs[name])
+        _remember(state, name, keys[new], offset)
+        return new
+
+    take_new("row", key_funcs["row"](df))
+
+    # 1. Bảng tổng sắp huy chương
+    new = take_new("medal", key_funcs["medal"](df))
+    # Mọi NOC xuất hiện đều có mặt trong bảng (kể cả khi chưa có huy chương nào)
+    nocs = pd.DataFrame(index=pd.Index(df['NOC'].astype(str).unique(), name='NOC'))
+    medal_rows = df[new & df['Medal'].notna().to_numpy()]
+    counts = medal_rows.groupby([medal_rows['NOC'].astype(str), medal_rows['Medal'].astype(str)]).size()
+    counts = counts.unstack(fill_value=0) if len(counts) > 0 else pd.DataFrame(index=pd.Index([], name='NOC'))
+    counts = counts.reindex(nocs.index.union(counts.index), fill_value=0)
+    state["medal_tally"] = _add_counts(state["medal_tally"], counts)
+
+    # 2. Số VĐV Nam/Nữ theo năm
+    new = take_new("gender", key_funcs["gender"](df))
+    new_rows = df[new]
+    counts = new_rows.groupby([new_rows['Year'].astype("int64"), new_rows['Sex'].astype(str)]).size()
+    if len(counts) > 0:
+        state["gender_counts"] = _add_counts(state["gender_counts"], counts.unstack(fill_value=0))
+
+    # 3. Hiệu suất theo nhóm tuổi
+    keys = key_funcs["age"](df)
+    new = take_new("age", keys)
+    participants = keys[new].groupby('AgeGroup', observed=False).size()
+    state["age_participants"] = _add_counts(state["age_participants"], participants.set_axis(
+        participants.index.astype(str)))
+    aged = df.loc[keys.index].assign(AgeGroup=keys['AgeGroup'])
+    is_medal = aged['Medal'].astype(str).str.strip().str.title().isin(MEDALS)
+    medals = aged[is_medal].groupby('AgeGroup', observed=False)['Event'].count()
+    state["age_medals"] = _add_counts(state["age_medals"], medals.set_axis(medals.index.astype(str)))
+    return state
+
+
+def build_aggregates(df):
+    """Dựng trạng thái tổng hợp từ đầu cho toàn bộ dữ liệu đã làm sạch (chỉ chạy 1 lần)."""
+    return update_aggregates(_empty_state(df.columns), df)
+
+
+def aggregates_to_tables(state):
+    """
+    Chuyển trạng thái tổng hợp thành các bảng có cùng định dạng với hàm phân tích tương ứng:
+    calculate_medal_tally, analyze_gender_participation, analyze_medals_and_participants_by_age.
+    """
+    # 1. Tổng sắp: cùng thứ tự NOC (tăng dần) rồi sắp xếp theo Vàng như calculate_medal_tally
+    medal_tally = state["medal_tally"].sort_index()
+    medal_tally = medal_tally[[c for c in MEDALS if c in medal_tally.columns]]
+    medal_tally.index.name = 'NOC'
+    medal_tally.columns.name = 'Medal'
+    if 'Gold' in medal_tally.columns:
+        medal_tally = medal_tally.sort_values(by='Gold', ascending=False)
+
+    # 2. Giới tính
+    gender_counts = state["gender_counts"].sort_index().sort_index(axis=1)
+    gender_counts.index.name = 'Year'
+    gender_counts.columns.name = 'Sex'
+
+    # 3. Nhóm tuổi
+    stats = pd.DataFrame({
+        'AgeGroup': pd.Categorical(ana.AGE_LABELS, categories=ana.AGE_LABELS, ordered=True),
+        'Participant_Count': state["age_participants"].reindex(ana.AGE_LABELS).to_numpy(),
+        'Medal_Count': state["age_medals"].reindex(ana.AGE_LABELS).to_numpy(),
+    })
+    stats['Medal_Ratio'] = round(stats['Medal_Count'] / stats['Participant_Count'], 4)
+
+    return {
+        'calculate_medal_tally': medal_tally,
+        'analyze_gender_participation': gender_counts,
+        'analyze_medals_and_participants_by_age': stats,
+    }
+
+
+def _aggregate_paths(file_path):
+    base = os.path.splitext(file_path)[0]
+    return base + AGGREGATES_SUFFIX, base + KEYS_SUFFIX
+
+
+def save_aggregates(state, file_path):
+    """Lưu trạng thái tổng hợp cạnh snapshot: bảng đếm -> JSON, tập hash khóa -> npz."""
+    tables_path, keys_path = _aggregate_paths(file_path)
+    meta = dc.load_snapshot_meta(file_path) or {}
+    tables = {
+        "snapshot_key": meta.get("key"),
+        "columns": state["columns"],
+        "medal_tally": state["medal_tally"].to_dict(orient="split"),
+        "gender_counts": state["gender_counts"].to_dict(orient="split"),
+        "age_participants": state["age_participants"].to_dict(),
+        "age_medals": state["age_medals"].to_dict(),
+    }
+    with open(tables_path, "w", encoding="utf-8") as f:
+        json.dump(tables, f, ensure_ascii=False, default=int)
+    np.savez(keys_path, **{f"{name}_{part}": state[f"{name}_{part}"]
+                           for name in KEY_SETS for part in ("keys", "rows")})
+
+
+def _read_aggregates(file_path, snapshot_key):
+    """Đọc trạng thái tổng hợp đã lưu nếu được dựng cho đúng snapshot 'snapshot_key', ngược lại None."""
+    tables_path, keys_path = _aggregate_paths(file_path)
+    if snapshot_key is None or not (os.path.exists(tables_path) and os.path.exists(keys_path)):
+        return None
+    with open(tables_path, encoding="utf-8") as f:
+        tables = json.load(f)
+    if tables.get("snapshot_key") != snapshot_key:
+        return None
+    keys = np.load(keys_path)
+    if any(f"{name}_rows" not in keys.files for name in KEY_SETS):  # Định dạng cũ, chỉ có hash
+        return None
+    state = {k: keys[k] for k in keys.files}
+    state["columns"] = tables["columns"]
+    for name in ("medal_tally", "gender_counts"):
+        split = tables[name]
+        state[name] = pd.DataFrame(split["data"], index=split["index"],
+                                   columns=split["columns"], dtype="int64")
+    for name in ("age_participants", "age_medals"):
+        state[name] = pd.Series(tables[name], dtype="int64")
+    return state
+
+
+def load_aggregates(file_path, df=None):
+    """
+    Đọc trạng thái tổng hợp đã lưu. Nếu chưa có hoặc không khớp snapshot hiện tại thì
+    dựng lại từ df (hoặc từ snapshot) và lưu lại.
+    """
+    meta = dc.load_snapshot_meta(file_path) or {}
+    state = _read_aggregates(file_path, meta.get("key"))
+    if state is not None:
+        return state
+
+    if df is None:
+        df = dc.load_snapshot(file_path)
+        if df is None:
+            return None
+    print("Đang dựng bảng tổng hợp từ snapshot...")
+    state = build_aggregates(df)
+    save_aggregates(state, file_path)
+    return state
+
+
+def stored_tables(file_path):
+    """
+    Các bảng tổng hợp (aggregates_to_tables) từ trạng thái đã lưu, dùng thay cho việc chạy lại
+    calculate_medal_tally / analyze_gender_participation / analyze_medals_and_participants_by_age
+    trên toàn bộ dữ liệu. Chỉ dùng khi snapshot còn khớp với CSV + code làm sạch hiện tại và trạng thái
+    được dựng cho đúng snapshot đó; không dựng mới (dựng tốn hơn tự tính) -> None nếu chưa có / đã cũ.
+    """
+    meta = dc.load_snapshot_meta(file_path)
+    if not meta or not os.path.exists(file_path):
+        return None
+    try:
+        if meta.get("key") != dc.get_snapshot_key(file_path):
+            return None
+        state = _read_aggregates(file_path, meta["key"])
+    except Exception as e:
+        print("Lỗi khi đọc bảng tổng hợp:", e)
+        return None
+    return aggregates_to_tables(state) if state is not None else None
+
+
+def check_drift(raw_rows, stats, tolerance=0.05):
+    """
+    So sánh trung bình các cột số của dữ liệu mới với thống kê đã lưu.
+    Cột nào lệch tương đối quá 'tolerance' (mặc định 5%) bị đánh dấu, và các dòng có giá trị
+    nằm ngoài biên IQR cũ ở những cột đó được trả về để kiểm tra thủ công
+    (có cột lệch thì append_new_rows làm sạch lại toàn bộ với thống kê mới).
+    """
+    drifted = {}
+    flagged = pd.Series(False, index=raw_rows.index)
+    for col, old_mean in stats["mean"].items():
+        if col not in raw_rows.columns:
+            continue
+        values = pd.to_numeric(raw_rows[col], errors="coerce")
+        new_mean = values.mean()
+        if pd.isna(new_mean) or pd.isna(old_mean):
+            continue
+        change = abs(new_mean - old_mean) / abs(old_mean) if old_mean else abs(new_mean)
+        if change > tolerance:
+            drifted[col] = {"old_mean": round(float(old_mean), 2),
+                            "new_mean": round(float(new_mean), 2),
+                            "change": round(float(change), 4)}
+            lower, upper = stats["bounds"][col]
+            flagged |= (values < lower) | (values > upper)
+
+    if drifted:
+        print(f"[CẢNH BÁO] Dữ liệu mới lệch thống kê cũ quá {tolerance:.0%}: {drifted}")
+        print(f"   -> {int(flagged.sum())} dòng nằm ngoài biên IQR cũ.")
+    return {"drifted_columns": drifted, "flagged_rows": raw_rows[flagged]}
+
+
+def _concat_clean(df_old, df_new):
+    """Gộp 2 DataFrame đã làm sạch, giữ nguyên dtype của bản cũ (gộp category thay vì ép về object)."""
+    df_new = df_new[df_old.columns]
+    columns = {}
+    for col in df_old.columns:
+        old, new = df_old[col], df_new[col]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            columns[col] = union_categoricals([old, new.astype("category")], sort_categories=True)
+        else:
+            columns[col] = np.concatenate([old.to_numpy(), new.astype(old.dtype).to_numpy()])
+    return pd.DataFrame(columns).astype({col: df_old[col].dtype for col in df_old.columns
+                                         if not isinstance(df_old[col].dtype, pd.CategoricalDtype)})
+
+
+def _append_to_csv(raw_rows, file_path):
+    """Ghi nối các dòng thô vào cuối CSV gốc, theo đúng thứ tự cột của file."""
+    header = pd.read_csv(file_path, nrows=0).columns
+    raw_rows[header].to_csv(file_path, mode="a", header=False, index=False)
+
+
+def _rebuild(raw_rows, file_path, append_to_source):
+    """
+    Làm sạch lại toàn bộ (CSV gốc + raw_rows) với thống kê tính lại từ đầu, giống hệt lần chạy đầu tiên,
+    rồi dựng lại bảng tổng hợp. append_to_source=False: chỉ làm trong bộ nhớ, không ghi gì ra đĩa.
+    """
+    if not append_to_source:
+        raw_all = pd.concat([dc.load_data.__wrapped__(file_path), raw_rows], ignore_index=True)
+        return dc.clean_extra_fields(dc.clean_data(raw_all)).reset_index(drop=True)
+    _append_to_csv(raw_rows, file_path)
+    # CSV đã đổi nên snapshot cũ hết hạn: load_and_clean_data làm sạch lại từ đầu và ghi snapshot mới
+    df_all = dc.load_and_clean_data.__wrapped__(file_path)
+    if df_all is not None:
+        save_aggregates(build_aggregates(df_all), file_path)
+    return df_all
+
+
+def append_new_rows(new_rows, file_path="data/athlete_events.csv", tolerance=0.05, append_to_source=True):
+    """
+    Bổ sung dữ liệu của kỳ Olympic mới mà không chạy lại toàn bộ pipeline.
+    new_rows: DataFrame dữ liệu thô (cùng cột với athlete_events.csv) hoặc đường dẫn CSV chỉ chứa dòng mới.
+    Các bước:
+    1. Làm sạch dòng mới theo thống kê đã lưu trong snapshot (clean_data(..., stats=...))
+       và kiểm tra thống kê của dữ liệu mới có lệch quá 'tolerance' không (check_drift).
+    2. Bỏ các dòng đã có trong snapshot (chạy lại cùng một kỳ không bị đếm 2 lần). Trùng được xác nhận
+       bằng giá trị khóa, không chỉ bằng hash (xem _unseen).
+    3. Không lệch: cộng dồn bảng tổng hợp (update_aggregates) và gộp vào snapshot.
+       Lệch: làm sạch lại toàn bộ dữ liệu với thống kê mới (_rebuild), không gộp tăng dần.
+    4. append_to_source=True: ghi nối dòng thô vào CSV gốc rồi lưu snapshot + bảng tổng hợp với khóa mới.
+       append_to_source=False: chỉ trả về bảng đã gộp trong bộ nhớ, không ghi gì ra đĩa (snapshot được khóa
+       theo nội dung CSV, ghi snapshot có thêm dòng mà CSV không có thì lần đọc sau sẽ lệch nguồn).
+    Cố ý khác làm sạch lại từ đầu: ở bước 3 (không lệch), dòng cũ giữ nguyên và dòng mới được điền thiếu /
+    chặn biên theo thống kê cũ, trong khi làm sạch lại cả CSV sẽ tính thống kê trên cả dòng mới nên có thể
+    cho vài giá trị điền / chặn biên hơi khác. Snapshot ghi 'appended_rows' (số dòng đã gộp theo cách này);
+    lệch quá 'tolerance' thì luôn làm sạch lại từ đầu, nên sai khác chỉ nằm trong ngưỡng đó.
+    Trả về (DataFrame sạch sau khi gộp, báo cáo lệch thống kê) hoặc (None, None) nếu lỗi.
+    """
+    df_old = dc.load_snapshot(file_path)
+    meta = dc.load_snapshot_meta(file_path)
+    if df_old is None or not meta or not meta.get("stats"):
+        print("[LỖI] Chưa có snapshot hợp lệ. Hãy chạy load_and_clean_data trước.")
+        return None, None
+    stats = meta["stats"]
+    state = load_aggregates(file_path, df_old)
+
+    raw = dc.load_data(new_rows) if isinstance(new_rows, str) else new_rows.reset_index(drop=True)
+    if raw is None or raw.empty:
+        print("Không có dòng mới để bổ sung.")
+        return df_old, {"drifted_columns": {}, "flagged_rows": pd.DataFrame()}
+
+    # 1. Làm sạch theo chuẩn cũ + kiểm tra lệch thống kê
+    report = check_drift(raw, stats, tolerance)
+    batch = dc.clean_extra_fields(dc.clean_data(raw, stats=stats))
+    batch = batch.astype({col: df_old[col].dtype for col in batch.columns
+                          if col in df_old.columns and df_old[col].dtype.kind in "iuf"})
+
+    # 2. Bỏ các dòng đã có trong snapshot
+    batch = batch[_unseen(state, "row", _key_frame(batch, state["columns"]), df_old,
+                          lambda x: _key_frame(x, state["columns"]))]
+    if batch.empty:
+        print("Toàn bộ dòng mới đã có trong snapshot.")
+        return df_old, report
+
+    # 3. Lệch thống kê: thống kê cũ không còn đại diện -> làm sạch lại từ đầu thay vì gộp tăng dần
+    if report["drifted_columns"]:
+        print("Dữ liệu mới lệch thống kê cũ: làm sạch lại toàn bộ dữ liệu với thống kê mới...")
+        df_all = _rebuild(raw.loc[batch.index], file_path, append_to_source)
+        return df_all, report
+
+    # Cộng dồn bảng tổng hợp và gộp snapshot
+    update_aggregates(state, batch, base=df_old)
+    df_all = _concat_clean(df_old, batch)
+
+    # 4. Ghi nối dữ liệu thô vào nguồn rồi lưu snapshot + bảng tổng hợp với khóa mới
+    if not append_to_source:
+        print(f"Đã gộp {len(batch):,} dòng mới trong bộ nhớ (tổng {len(df_all):,} dòng), "
+              "không lưu snapshot vì CSV gốc không được ghi nối.")
+        return df_all, report
+    _append_to_csv(raw.loc[batch.index], file_path)
+    appended = meta.get("appended_rows", 0) + len(batch)
+    dc.save_snapshot(df_all, file_path, stats=stats, extra_meta={"appended_rows": appended})
+    save_aggregates(state, file_path)
+    print(f"Đã bổ sung {len(batch):,} dòng mới (tổng {len(df_all):,} dòng).")
+    return df_all, report
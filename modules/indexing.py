@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+# --- CHỈ MỤC DỰNG SẴN CHO BỘ LỌC ---
+# Dựng 1 lần cho mỗi bộ dữ liệu, sau đó mọi lần lọc chỉ tra cứu chỉ mục
+# thay vì copy DataFrame và so sánh chuỗi/số trên toàn bộ 270k dòng.
+# Mọi hàm ở đây làm việc với SỐ THỨ TỰ DÒNG (vị trí, dùng cho df.iloc), không phải nhãn index.
+
+# Các cột phân loại mà bộ lọc hỗ trợ (so khớp không phân biệt hoa thường)
+CATEGORY_COLUMNS = ['Team', 'NOC', 'Season', 'City', 'Sport', 'Sex']
+# Các cột số hỗ trợ lọc theo ngưỡng / khoảng
+RANGE_COLUMNS = ['Age', 'Height', 'Weight', 'Year']
+
+
+def build_category_index(df, columns=CATEGORY_COLUMNS):
+    """
+    Chỉ mục ngược cho các cột phân loại: mỗi giá trị (đã viết thường) -> mảng số thứ tự dòng
+    (đã sắp xếp tăng dần) có giá trị đó.
+    Với mỗi cột lưu:
+    - keys: dict {giá trị viết thường: mã khóa}
+    - codes: mảng mã khóa của từng dòng (-1 nếu NA), dùng để lọc tiếp các dòng ứng viên
+    - rows: list mảng số thứ tự dòng theo từng mã khóa
+    """
+    index = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[col])
+        # 'Gold' và 'gold' là 2 giá trị khác nhau nhưng cùng 1 khóa sau khi viết thường
+        key_codes, keys = pd.factorize(pd.Index(np.asarray(uniques, dtype=object)).str.lower())
+        row_keys = np.where(codes >= 0, key_codes[codes] if len(key_codes) else -1, -1).astype(np.int32)
+
+        # Sắp xếp ổn định theo mã khóa -> các dòng cùng khóa nằm liền nhau và vẫn tăng dần
+        order = np.argsort(row_keys, kind="stable").astype(np.int32)
+        counts = np.bincount(row_keys[row_keys >= 0], minlength=len(keys))
+        order = order[len(row_keys) - counts.sum():]
+        index[col] = {
+            "keys": {key: i for i, key in enumerate(keys)},
+            "codes": row_keys,
+            "rows": np.split(order, np.cumsum(counts)[:-1]),
+        }
+    return index
+
+
+def build_range_index(df, columns=RANGE_COLUMNS):
+    """
+    Chỉ mục khoảng cho các cột số: hoán vị sắp xếp (argsort) + mảng giá trị đã sắp xếp.
+    Điều kiện '>= a' hoặc 'a <= x <= b' chỉ cần 2 lần searchsorted (O(log n))
+    rồi cắt lát hoán vị, chi phí còn lại tỉ lệ với số dòng kết quả. NA bị loại khỏi chỉ mục
+    (giống phép so sánh của pandas: NA không bao giờ thỏa điều kiện).
+    """
+    index = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        order = np.argsort(values, kind="stable")
+        order = order[:int(pd.notna(values).sum())].astype(np.int32)  # NaN luôn bị xếp cuối
+        index[col] = {"values": values, "order": order, "sorted": values[order]}
+    return index
+
+
+def build_filter_index(df):
+    """
+    Dựng toàn bộ chỉ mục cho bộ lọc của 1 bộ dữ liệu:
+    - category / range: xem build_category_index, build_range_index
+    - year_desc: hoán vị các dòng theo Year giảm dần (cùng năm giữ thứ tự gốc), để kết quả lọc
+      được sắp xếp sẵn theo năm mà không phải sort lại mỗi lần
+    """
+    index = {"rows": len(df),
+             "category": build_category_index(df),
+             "range": build_range_index(df)}
+    if 'Year' in df.columns:
+        year = df['Year'].to_numpy(dtype=np.float64)
+        index["year_desc"] = np.argsort(-year, kind="stable").astype(np.int32)
+    return index
+
+
+def _category_key(index, col, value):
+    return index["category"][col]["keys"].get(str(value).lower())
+
+
+def range_bounds(index, col, low=None, high=None):
+    """Vị trí [start, stop) trong hoán vị sắp xếp của cột 'col' ứng với low <= x <= high."""
+    entry = index["range"][col]
+    start = 0 if low is None else np.searchsorted(entry["sorted"], low, side="left")
+    stop = len(entry["sorted"]) if high is None else np.searchsorted(entry["sorted"], high, side="right")
+    return start, max(start, stop)
+
+
+def range_rows(index, col, low=None, high=None):
+    """Số thứ tự các dòng có low <= col <= high (None = không giới hạn), theo thứ tự giá trị tăng dần."""
+    start, stop = range_bounds(index, col, low, high)
+    return index["range"][col]["order"][start:stop]
+
+
+def equal_rows(index, col, value):
+    """Số thứ tự các dòng có cột 'col' == value (không phân biệt hoa thường), tăng dần."""
+    key = _category_key(index, col, value)
+    if key is None:
+        return np.empty(0, dtype=np.int32)
+    return index["category"][col]["rows"][key]
+
+
+def order_by_year(index, rows=None):
+    """
+    Sắp xếp các dòng theo Year giảm dần (cùng năm giữ thứ tự gốc).
+    - rows=None (không lọc gì): trả thẳng hoán vị year_desc dựng sẵn
+    - Ít dòng: sắp xếp riêng các dòng đó
+    - Nhiều dòng: đánh dấu rồi lọc theo year_desc (O(n), không sort)
+    """
+    year_desc = index["year_desc"]
+    if rows is None:
+        return year_desc
+    if len(rows) * 8 < len(year_desc):
+        rows = np.sort(rows)
+        year = index["range"]["Year"]["values"][rows].astype(np.float64)
+        return rows[np.argsort(-year, kind="stable")]
+    mask = np.zeros(len(year_desc), dtype=bool)
+    mask[rows] = True
+    return year_desc[mask[year_desc]]
+
+
+def select_rows(index, ranges=None, equals=None):
+    """
+    Số thứ tự các dòng thỏa mãn TẤT CẢ điều kiện:
+    - ranges: {cột số: (low, high)} với low/high có thể là None
+    - equals: {cột phân loại: giá trị} (không phân biệt hoa thường)
+    Điều kiện có giá trị None bị bỏ qua. Ước lượng số dòng của từng điều kiện ngay trên chỉ mục
+    (độ dài danh sách / 2 lần searchsorted), lấy các dòng của điều kiện chọn lọc nhất làm ứng viên,
+    rồi kiểm tra các điều kiện còn lại chỉ trên các dòng ứng viên.
+    Trả về None nếu không có điều kiện nào (= mọi dòng); thứ tự dòng không xác định.
+    """
+    predicates = []
+    for col, (low, high) in (ranges or {}).items():
+        if low is None and high is None:
+            continue
+        start, stop = range_bounds(index, col, low, high)
+        predicates.append((stop - start, "range", col, (low, high)))
+    for col, value in (equals or {}).items():
+        if value is None:
+            continue
+        key = _category_key(index, col, value)
+        if key is None:
+            return np.empty(0, dtype=np.int32)
+        predicates.append((len(index["category"][col]["rows"][key]), "equal", col, key))
+    if not predicates:
+        return None
+
+    predicates.sort(key=lambda p: p[0])
+    _, kind, col, arg = predicates[0]
+    if kind == "range":
+        rows = range_rows(index, col, *arg)
+    else:
+        rows = index["category"][col]["rows"][arg]
+
+    for _, kind, col, arg in predicates[1:]:
+        if len(rows) == 0:
+            break
+        if kind == "range":
+            values = index["range"][col]["values"][rows]
+            low, high = arg
+            keep = pd.notna(values)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            rows = rows[keep]
+        else:
+            rows = rows[index["category"][col]["codes"][rows] == arg]
+    return rows
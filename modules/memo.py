@@ -0,0 +1,157 @@
+import functools
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import modules.data_cleaning as dc
+
+# --- GHI NHỚ KẾT QUẢ HÀM PHÂN TÍCH (MEMOIZATION) ---
+# Khóa = tên hàm + dấu vân tay của các DataFrame đầu vào (dc.dataset_fingerprint) + các tham số còn lại.
+# Dấu vân tay chỉ băm 1 lần cho mỗi đối tượng bảng (bảng dùng chung của shared_data được ghi sẵn),
+# nên lấy lại kết quả chỉ tốn tra khóa + chép kết quả, không băm lại cả bảng.
+# Dùng chung 1 bộ nhớ đệm LRU giới hạn theo số mục và theo dung lượng, nên chạy giống nhau
+# trong Streamlit lẫn export_data.py (không phụ thuộc st.cache_data).
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2  # 256 MB
+
+_lock = threading.Lock()
+_cache = OrderedDict()          # khóa -> (kết quả, số byte)
+_limits = {"entries": DEFAULT_MAX_ENTRIES, "bytes": DEFAULT_MAX_BYTES}
+_usage = {"bytes": 0}
+_stats = {}                     # tên hàm -> {"hits", "misses", "bypass"}
+
+
+class _Unhashable(Exception):
+    pass
+
+
+def _estimate_bytes(value):
+    """Ước lượng dung lượng kết quả (DataFrame/Series tính cả chuỗi bên trong)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_bytes(k) + _estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (tuple, list, set)):
+        return sys.getsizeof(value) + sum(_estimate_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _copy_result(value):
+    """
+    Trả bản sao để nơi gọi có sửa kết quả thì cũng không làm hỏng bộ nhớ đệm.
+    Chép đệ quy DataFrame / Series / mảng numpy bên trong dict, list, tuple, set.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _key_part(value):
+    if isinstance(value, pd.DataFrame):
+        return ("df", dc.dataset_fingerprint(value))
+    try:
+        hash(value)
+    except TypeError:
+        raise _Unhashable()
+    return value
+
+
+def _evict():
+    while _cache and (len(_cache) > _limits["entries"] or _usage["bytes"] > _limits["bytes"]):
+        _, (_, size) = _cache.popitem(last=False)
+        _usage["bytes"] -= size
+
+
+def memoize(func):
+    """
+    Decorator ghi nhớ kết quả hàm phân tích.
+    Tham số không băm được (vd: cube/chỉ mục truyền vào dạng dict) -> gọi thẳng hàm, không ghi nhớ.
+    Kết quả lớn hơn cả giới hạn dung lượng cũng không được ghi nhớ.
+    """
+    signature = inspect.signature(func)
+    name = func.__qualname__
+    _stats[name] = {"hits": 0, "misses": 0, "bypass": 0}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _stats[name]
+        try:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__module__, name,
+                   tuple((arg, _key_part(value)) for arg, value in bound.arguments.items()))
+        except _Unhashable:
+            stats["bypass"] += 1
+            return func(*args, **kwargs)
+
+        with _lock:
+            entry = _cache.get(key)
+            if entry is not None:
+                _cache.move_to_end(key)
+                stats["hits"] += 1
+                return _copy_result(entry[0])
+            stats["misses"] += 1
+
+        result = func(*args, **kwargs)
+        size = _estimate_bytes(result)
+        if size <= _limits["bytes"]:
+            with _lock:
+                if key not in _cache:
+                    _cache[key] = (_copy_result(result), size)
+                    _usage["bytes"] += size
+                    _evict()
+        return result
+
+    wrapper.cache_info = lambda: dict(_stats[name])
+    return wrapper
+
+
+def configure(max_entries=None, max_bytes=None):
+    """Đổi giới hạn bộ nhớ đệm (số mục / số byte), các mục cũ nhất bị loại nếu vượt giới hạn mới."""
+    with _lock:
+        if max_entries is not None:
+            _limits["entries"] = max_entries
+        if max_bytes is not None:
+            _limits["bytes"] = max_bytes
+        _evict()
+
+
+def clear_cache():
+    """Xóa toàn bộ kết quả đã ghi nhớ (giữ nguyên số liệu hit/miss)."""
+    with _lock:
+        _cache.clear()
+        _usage["bytes"] = 0
+
+
+def cache_stats():
+    """Số liệu bộ nhớ đệm: số mục, dung lượng và hit/miss của từng hàm."""
+    with _lock:
+        return {"entries": len(_cache), "bytes": _usage["bytes"],
+                "max_entries": _limits["entries"], "max_bytes": _limits["bytes"],
+                "functions": {name: dict(s) for name, s in _stats.items()}}
+
+
+def print_cache_stats():
+    """In bảng hit/miss của các hàm đã được gọi."""
+    stats = cache_stats()
+    print(f"Bộ nhớ đệm phân tích: {stats['entries']} mục, "
+          f"{stats['bytes'] / 1024 ** 2:.2f}/{stats['max_bytes'] / 1024 ** 2:.0f} MB")
+    for name, s in stats["functions"].items():
+        if s["hits"] or s["misses"] or s["bypass"]:
+            print(f"  - {name}: {s['hits']} hit, {s['misses']} miss, {s['bypass']} bỏ qua")
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+# --- CHIA SẺ DỮ LIỆU CHO CÁC TIẾN TRÌNH CON (PROCESS POOL) ---
+# DataFrame được ghi 1 lần ra file Arrow IPC (Feather v2, không nén) rồi mỗi tiến trình con
+# memory-map file đó đúng 1 lần khi khởi động, thay vì pickle cả bảng gửi kèm mỗi tác vụ.
+# Các trang dữ liệu của file nằm trong page cache của hệ điều hành, dùng chung cho mọi tiến trình:
+# cột số / category / chuỗi không có NA được dùng thẳng từ vùng nhớ đó (không chép),
+# chỉ các cột phải chuyển đổi (vd: cột số có NA) mới thành bản sao riêng của từng tiến trình.
+
+SHARED_FRAME_NAME = "frame.arrow"
+
+# Bảng dữ liệu của tiến trình con hiện tại (do init_worker nạp)
+_worker_state = {"df": None}
+# đường dẫn file chia sẻ -> bảng gốc đã mở (xem open_shared_frame)
+_open_frames = {}
+
+
+def share_frame(df, folder=None):
+    """
+    Ghi df ra file Arrow IPC để chia sẻ cho các tiến trình con.
+    Mỗi cột được ghi liền 1 khúc (không chia record batch) để tiến trình con dùng thẳng được vùng nhớ của file.
+    Trả về đường dẫn file; gọi release_frame(path) khi dùng xong để xóa thư mục tạm.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    folder = folder or tempfile.mkdtemp(prefix="olympic_shared_")
+    path = os.path.join(folder, SHARED_FRAME_NAME)
+    table = pa.Table.from_pandas(df).combine_chunks()
+    feather.write_feather(table, path, compression="uncompressed", chunksize=max(len(df), 1))
+    return path
+
+
+def _zero_copy_column(column):
+    """
+    Cột pandas dùng thẳng bộ nhớ (memory-map) của cột Arrow, không chép:
+    - cột số không có NA -> mảng numpy chỉ đọc trỏ vào file
+    - cột category (dictionary) không có NA -> Categorical với mã trỏ vào file
+    Cột khác (có NA, bool, ...) -> None, để chuyển đổi bình thường.
+    """
+    import pyarrow as pa
+
+    if column.num_chunks != 1 or column.null_count > 0:
+        return None
+    chunk = column.chunk(0)
+    if pa.types.is_integer(chunk.type) or pa.types.is_floating(chunk.type):
+        return chunk.to_numpy(zero_copy_only=True)
+    if pa.types.is_dictionary(chunk.type) and pa.types.is_signed_integer(chunk.type.index_type):
+        return pd.Categorical.from_codes(chunk.indices.to_numpy(zero_copy_only=True),
+                                         dtype=pd.CategoricalDtype(pd.Index(chunk.dictionary.to_pandas()),
+                                                                   ordered=chunk.type.ordered),
+                                         validate=False)
+    return None
+
+
+def open_shared_frame(path):
+    """
+    Mở file do share_frame ghi bằng memory-map. Cột số / category dùng thẳng vùng nhớ của file,
+    cột chuỗi giữ dạng Arrow (cũng trỏ vào file), nên các tiến trình con cùng đọc các trang dữ liệu
+    trong page cache của hệ điều hành thay vì mỗi tiến trình giữ 1 bản sao riêng.
+    Các mảng dùng chung là chỉ đọc: hàm nào sửa tại chỗ thì pandas tự chép phần bị sửa (copy-on-write).
+    """
+    import pyarrow.feather as feather
+
+    table = feather.read_table(path, memory_map=True)
+    index = (table.schema.pandas_metadata or {}).get("index_columns", [])
+    if table.num_rows == 0 or not all(isinstance(entry, dict) and entry.get("kind") == "range" for entry in index):
+        return table.to_pandas()  # Bảng rỗng / index lưu thành cột: chuyển đổi bình thường
+
+    columns = {name: _zero_copy_column(table.column(name)) for name in table.column_names}
+    rest = [name for name, values in columns.items() if values is None]
+    if rest:
+        converted = table.select(rest).to_pandas()
+        columns.update({name: converted[name] for name in rest})
+    frame = pd.DataFrame(columns, copy=False)
+    if index:
+        entry = index[0]
+        frame.index = pd.RangeIndex(entry["start"], entry["stop"], entry["step"], name=entry.get("name"))
+    # Giữ bảng gốc và trả về bản sao nông: các cột vẫn trỏ vào file nhưng được pandas coi là dùng chung,
+    # nên ghi vào cột nào thì cột đó được chép ra trước (copy-on-write) thay vì ghi vào mảng chỉ đọc
+    _open_frames[path] = frame
+    return frame.copy(deep=False)
+
+
+def release_frame(path):
+    """Xóa file chia sẻ và thư mục tạm chứa nó."""
+    _open_frames.pop(path, None)
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def init_worker(path, mpl_backend=None):
+    """
+    Hàm khởi tạo cho ProcessPoolExecutor(initializer=...): nạp bảng dùng chung 1 lần cho mỗi tiến trình.
+    mpl_backend: backend matplotlib cho tiến trình con (vd 'Agg' khi chỉ ghi file ảnh).
+    """
+    if mpl_backend is not None:
+        import matplotlib
+        matplotlib.use(mpl_backend)
+    _worker_state["df"] = open_shared_frame(path)
+
+
+def worker_frame():
+    """Bảng dùng chung của tiến trình con hiện tại."""
+    return _worker_state["df"]
@@ -0,0 +1,172 @@
+import io
+import numpy as np
+import pandas as pd
+from modules.indexing import select_rows, order_by_year
+
+# --- TRUY VẤN LỌC 1 LẦN QUÉT ---
+# Gom mọi điều kiện (ngưỡng số, khoảng, từ khóa phân loại) vào 1 đối tượng rồi mới tính,
+# thay vì xâu chuỗi nhiều hàm lọc, mỗi hàm copy + sort cả DataFrame.
+# Kết quả là SỐ THỨ TỰ DÒNG; chỉ lấy dòng thật (df.iloc) 1 lần ở cuối, hoặc từng phần khi phân trang.
+
+
+class FilterQuery:
+    """
+    Truy vấn lọc trên 1 DataFrame.
+    - Có index (indexing.build_filter_index(df)): tra cứu chỉ mục, điều kiện chọn lọc nhất đi trước.
+    - Không có index: quét cột, điều kiện từ khóa (thường chọn lọc nhất) đi trước, các điều kiện sau
+      chỉ được tính trên các dòng còn lại. Không tạo DataFrame trung gian nào.
+    Ví dụ:
+        FilterQuery(df).equal('NOC', 'VIE').between('Year', 2000, 2016).at_least('Age', 20).frame()
+    """
+
+    def __init__(self, df, index=None):
+        self.df = df
+        # Chỉ mục dựng cho bảng khác (vd: bảng con) thì bỏ qua, quay về quét cột
+        self.index = index if index is not None and index.get("rows") == len(df) else None
+        self.ranges = {}
+        self.equals = {}
+        self.empty = False
+
+    def between(self, col, low=None, high=None):
+        """Điều kiện low <= col <= high (None = không giới hạn). Gọi nhiều lần trên 1 cột thì lấy giao."""
+        if low is None and high is None:
+            return self
+        old_low, old_high = self.ranges.get(col, (None, None))
+        if old_low is not None:
+            low = old_low if low is None else max(low, old_low)
+        if old_high is not None:
+            high = old_high if high is None else min(high, old_high)
+        self.ranges[col] = (low, high)
+        return self
+
+    def at_least(self, col, value):
+        """Điều kiện col >= value."""
+        return self.between(col, value, None)
+
+    def equal(self, col, value):
+        """Điều kiện col == value (không phân biệt hoa thường). value=None thì bỏ qua."""
+        if value is None:
+            return self
+        value = str(value).lower()
+        if self.equals.get(col, value) != value:
+            self.empty = True  # 2 giá trị khác nhau trên cùng 1 cột -> không dòng nào thỏa
+        self.equals[col] = value
+        return self
+
+    def row_ids(self, sort_by_year=True):
+        """
+        Số thứ tự các dòng thỏa mãn truy vấn (dùng cho df.iloc).
+        sort_by_year=True: theo Year giảm dần (cùng năm giữ thứ tự gốc), ngược lại theo thứ tự gốc.
+        """
+        if self.empty:
+            return np.empty(0, dtype=np.int64)
+        if self._indexed():
+            rows = select_rows(self.index, ranges=self.ranges, equals=self.equals)
+            if sort_by_year:
+                return order_by_year(self.index, rows)
+            return np.arange(len(self.df)) if rows is None else np.sort(rows)
+
+        rows = self._scan()
+        if rows is None:
+            rows = np.arange(len(self.df))
+        if sort_by_year:
+            year = self.df['Year'].to_numpy(dtype=np.float64)[rows]
+            rows = rows[np.argsort(-year, kind="stable")]
+        return rows
+
+    def frame(self, sort_by_year=True):
+        """Lấy các dòng kết quả thành DataFrame (bước tạo bản sao duy nhất)."""
+        return self.df.iloc[self.row_ids(sort_by_year)]
+
+    def __len__(self):
+        return len(self.row_ids(sort_by_year=False))
+
+    def _indexed(self):
+        """Chỉ dùng chỉ mục khi mọi cột trong truy vấn đều đã được đánh chỉ mục."""
+        return (self.index is not None and
+                all(col in self.index["range"] for col in self.ranges) and
+                all(col in self.index["category"] for col in self.equals))
+
+    def _plan(self):
+        """
+        Thứ tự tính khi không có chỉ mục: từ khóa trước (cột nhiều giá trị khác nhau trước, vd Team
+        trước Sex), khoảng số sau. Với cột category số giá trị lấy thẳng từ categories, không phải quét.
+        """
+        def n_values(col):
+            dtype = self.df[col].dtype
+            return len(dtype.categories) if isinstance(dtype, pd.CategoricalDtype) else 0
+
+        equals = sorted(self.equals.items(), key=lambda item: -n_values(item[0]))
+        return ([("equal", col, value) for col, value in equals] +
+                [("range", col, bounds) for col, bounds in self.ranges.items()])
+
+    def _scan(self):
+        """Tính điều kiện lần lượt trên các dòng còn lại. Trả về None nếu không có điều kiện nào."""
+        rows = None
+        for kind, col, arg in self._plan():
+            series = self.df[col]
+            if kind == "equal":
+                keep = _equal_mask(series, arg, rows)
+            else:
+                values = series.to_numpy()
+                if rows is not None:
+                    values = values[rows]
+                low, high = arg
+                keep = pd.notna(values)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+            rows = np.flatnonzero(keep) if rows is None else rows[keep]
+        return rows
+
+
+def _equal_mask(series, value, rows=None):
+    """Mặt nạ series.str.lower() == value trên các dòng 'rows' (None = mọi dòng)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # So chuỗi trên vài trăm categories, sau đó chỉ so mã số nguyên
+        categories = pd.Index(np.asarray(series.cat.categories, dtype=object)).str.lower()
+        codes = series.cat.codes.to_numpy()
+        if rows is not None:
+            codes = codes[rows]
+        return np.isin(codes, np.flatnonzero(categories == value))
+    if rows is not None:
+        series = series.iloc[rows]
+    return (series.str.lower() == value).to_numpy(dtype=bool, na_value=False)
+
+
+# --- XUẤT KẾT QUẢ THEO KHÚC ---
+def iter_csv_chunks(df, rows=None, chunksize=50_000):
+    """
+    Sinh nội dung CSV (bytes) của các dòng 'rows' (None = mọi dòng) theo từng khúc 'chunksize' dòng.
+    Mỗi lần chỉ lấy 1 khúc dòng ra khỏi bảng, không dựng cả bảng kết quả hay cả chuỗi CSV.
+    Khúc đầu có header và BOM (utf-8-sig) để Excel đọc đúng tiếng Việt, giống export_data.
+    """
+    if rows is None:
+        rows = np.arange(len(df))
+    for start in range(0, max(len(rows), 1), chunksize):
+        part = df.iloc[rows[start:start + chunksize]]
+        first = start == 0
+        yield part.to_csv(index=False, header=first).encode('utf-8-sig' if first else 'utf-8')
+
+
+class CsvStream(io.RawIOBase):
+    """Đối tượng file chỉ-đọc bọc iter_csv_chunks, dùng được ở chỗ cần file (vd: st.download_button)."""
+
+    def __init__(self, df, rows=None, chunksize=50_000):
+        self._chunks = iter_csv_chunks(df, rows, chunksize)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                self._buffer = b""
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+
+import numpy as np
+
+import modules.data_cleaning as dc
+from modules.dimensions import get_dimensions
+from modules.incremental import stored_tables
+from modules.indexing import build_filter_index
+
+# --- BỘ DỮ LIỆU DÙNG CHUNG CHO CẢ TIẾN TRÌNH (MỌI PHIÊN STREAMLIT) ---
+# Bảng gốc, bảng đã làm sạch, chỉ mục bộ lọc và siêu dữ liệu các chiều được dựng 1 lần cho mỗi tiến trình
+# server, giữ ở cấp module (Streamlit chạy lại UI.py mỗi lần rerun nhưng không import lại module) thay vì st.cache_data
+# (mỗi lần gọi phải băm tham số và copy/unpickle cả bảng ra cho từng phiên).
+# Chỉ đọc: mỗi lần get_dataset() trả về bản sao nông (df.copy(deep=False)) - không copy dữ liệu, nhưng nhờ
+# copy-on-write của pandas, phiên nào sửa bảng của mình thì chỉ phần bị sửa được copy, bảng chung không đổi.
+# Chỉ mục và siêu dữ liệu các chiều là bản chỉ đọc: mảng bị khóa ghi (writeable=False),
+# dict -> MappingProxyType, list -> tuple.
+# Tự nạp lại: khi file CSV hoặc snapshot đã làm sạch thay đổi (mtime/kích thước), lần gọi kế tiếp dựng
+# phiên bản mới; trong lúc dựng, các phiên khác vẫn dùng phiên bản cũ.
+
+# Khoảng thời gian tối thiểu giữa 2 lần kiểm tra file nguồn có đổi không (giây)
+RELOAD_CHECK_INTERVAL = 2.0
+
+_lock = threading.Lock()
+_datasets = {}   # đường dẫn tuyệt đối CSV -> phiên bản đang dùng (dict, xem _build)
+_loading = {}    # đường dẫn tuyệt đối CSV -> threading.Lock, chỉ 1 luồng dựng mỗi bộ dữ liệu
+
+
+def _source_signature(file_path):
+    """(mtime_ns, kích thước) của file CSV và các file snapshot; file chưa có -> None."""
+    signature = []
+    for path in (file_path,) + dc.get_snapshot_paths(file_path):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _freeze(value):
+    """
+    Bản chỉ đọc của chỉ mục / siêu dữ liệu (dict / list lồng nhau): khóa ghi mọi mảng numpy,
+    dict -> MappingProxyType, list -> tuple, để không phiên nào sửa được dữ liệu dùng chung.
+    """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+        return value
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _build(file_path, version):
+    """Đọc + làm sạch + dựng chỉ mục 1 phiên bản bộ dữ liệu. Trả về None nếu không đọc được."""
+    # Gọi thẳng hàm gốc (bỏ qua st.cache_data) để không giữ thêm 1 bản nữa trong cache của Streamlit
+    raw = dc.load_data.__wrapped__(file_path)
+    if raw is None:
+        return None
+    # Snapshot cũ / chưa có: làm sạch từ chính bảng gốc vừa đọc, không đọc CSV lần 2
+    clean = dc.load_and_clean_data.__wrapped__(file_path, _raw=raw)
+    if clean is None:
+        return None
+    return {
+        "path": file_path,
+        "version": version,
+        "loaded_at": datetime.now().isoformat(timespec="seconds"),
+        "raw": raw,
+        "clean": clean,
+        "index": _freeze(build_filter_index(clean)),
+        "dims": _freeze(get_dimensions(clean, file_path)),
+        # Bảng tổng hợp cộng dồn đã lưu (chỉ có khi còn khớp snapshot), xem incremental.stored_tables
+        "tables": stored_tables(file_path) or {},
+        "raw_fingerprint": dc.dataset_fingerprint(raw),
+        "fingerprint": dc.dataset_fingerprint(clean),
+        # Đọc sau khi làm sạch: lần đầu có thể vừa ghi snapshot mới, không tính là thay đổi
+        "signature": _source_signature(file_path),
+        "checked_at": time.monotonic(),
+    }
+
+
+def _view(dataset):
+    """Bản nhìn chỉ đọc của 1 phiên bản: bảng là bản sao nông, chỉ mục dùng chung (đã khóa ghi)."""
+    view = {key: value for key, value in dataset.items() if key not in ("signature", "checked_at")}
+    view["raw"] = dataset["raw"].copy(deep=False)
+    view["clean"] = dataset["clean"].copy(deep=False)
+    # Bản sao cùng nội dung: ghi sẵn dấu vân tay để các cache (memo, cube, biểu đồ...) khỏi băm lại
+    dc.remember_fingerprint(view["raw"], dataset["raw_fingerprint"])
+    dc.remember_fingerprint(view["clean"], dataset["fingerprint"])
+    view["tables"] = {name: table.copy(deep=False) for name, table in dataset["tables"].items()}
+    return view
+
+
+def _needs_reload(dataset, file_path):
+    now = time.monotonic()
+    if now - dataset["checked_at"] < RELOAD_CHECK_INTERVAL:
+        return False
+    dataset["checked_at"] = now
+    return _source_signature(file_path) != dataset["signature"]
+
+
+def get_dataset(file_path, reload=False):
+    """
+    Bộ dữ liệu dùng chung của file CSV 'file_path', dạng dict:
+    - raw / clean: bảng gốc / bảng đã làm sạch (bản sao nông, sửa không ảnh hưởng phiên khác; dấu vân tay
+      đã được ghi sẵn nên muốn sửa giá trị tại chỗ thì sửa trên bản sao, xem dc.dataset_fingerprint)
+    - index: chỉ mục bộ lọc (indexing.build_filter_index) của bảng sạch, chỉ đọc
+    - dims: siêu dữ liệu các chiều cho các ô chọn (dimensions.get_dimensions), chỉ đọc
+    - tables: {tên hàm phân tích: bảng} lấy từ bảng tổng hợp cộng dồn đã lưu (có thể rỗng), bản sao nông
+    - fingerprint / raw_fingerprint: dc.dataset_fingerprint của bảng sạch / bảng gốc (tính sẵn)
+    - version, loaded_at: số thứ tự và thời điểm nạp của phiên bản hiện tại
+    reload=True: nạp lại ngay, không chờ kiểm tra thay đổi. Trả về None nếu chưa nạp được dữ liệu.
+    """
+    key = os.path.abspath(file_path)
+    dataset = _datasets.get(key)
+    if dataset is not None and not reload and not _needs_reload(dataset, file_path):
+        return _view(dataset)
+
+    with _lock:
+        loading = _loading.setdefault(key, threading.Lock())
+    # Đang có luồng khác dựng phiên bản mới: phục vụ phiên bản cũ nếu có, không thì chờ
+    if dataset is not None and not loading.acquire(blocking=False):
+        return _view(dataset)
+    if dataset is None:
+        loading.acquire()
+    try:
+        current = _datasets.get(key)
+        if current is not dataset and current is not None:  # Luồng khác vừa nạp xong
+            return _view(current)
+        version = dataset["version"] + 1 if dataset is not None else 1
+        if dataset is not None:
+            print(f"Dữ liệu nguồn '{file_path}' đã thay đổi, nạp lại (phiên bản {version})...")
+        try:
+            fresh = _build(file_path, version)
+        except Exception as e:
+            print("Lỗi khi nạp bộ dữ liệu dùng chung:", e)
+            fresh = None
+        if fresh is None:
+            # Nạp lỗi (vd: file đang được ghi dở): giữ phiên bản cũ, lần kiểm tra sau thử lại
+            return _view(dataset) if dataset is not None else None
+        _datasets[key] = fresh
+        return _view(fresh)
+    finally:
+        loading.release()
+
+
+def loaded_datasets():
+    """Thông tin các bộ dữ liệu đang được giữ: đường dẫn -> (phiên bản, thời điểm nạp, số dòng sạch)."""
+    return {path: (d["version"], d["loaded_at"], len(d["clean"])) for path, d in list(_datasets.items())}
+
+
+def clear():
+    """Bỏ toàn bộ bộ dữ liệu đang giữ (lần gọi get_dataset sau sẽ nạp lại từ đầu)."""
+    with _lock:
+        _datasets.clear()
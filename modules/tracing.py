@@ -0,0 +1,210 @@
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# --- ĐO THỜI GIAN / BỘ NHỚ TỪNG BƯỚC (TRACE) ---
+# Mỗi bước (stage) ghi 1 bản ghi: thời gian thực, thời gian CPU, đỉnh RSS tăng thêm so với lúc bắt đầu,
+# số dòng vào/ra. Khi đã start_trace(path), bản ghi được ghi nối vào file JSON-lines ngay khi bước kết thúc
+# (chương trình có chết giữa chừng thì các bước đã xong vẫn còn trong file).
+# Chưa start_trace thì stage() vẫn đo thời gian (dùng cho bảng thời gian) nhưng không lấy mẫu RSS,
+# không lưu bản ghi -> gần như không tốn gì khi chạy trong Streamlit.
+
+# Khoảng lấy mẫu RSS khi đang có bước chạy (giây)
+RSS_SAMPLE_INTERVAL = 0.005
+
+_lock = threading.Lock()
+_state = {"active": False, "path": None, "file": None, "owner": None, "run": None}
+_records = []    # Bản ghi của lần chạy hiện tại (để in bảng tổng kết)
+_local = threading.local()  # Các bước đang chạy (lồng nhau) của từng luồng, để biết bước cha
+
+
+def _current_rss():
+    """RSS hiện tại của tiến trình (byte). Linux đọc /proc, nơi khác dùng psutil nếu có."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """Luồng nền lấy mẫu RSS để bắt đỉnh bộ nhớ trong lúc 1 bước đang chạy."""
+
+    def __init__(self, start_rss):
+        super().__init__(daemon=True)
+        self.peak = start_rss
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_SAMPLE_INTERVAL):
+            rss = _current_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = _current_rss()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+        return self.peak
+
+
+def count_rows(value):
+    """Số dòng của kết quả 1 bước (DataFrame/Series/dict/list), không xác định được thì None."""
+    if isinstance(value, (pd.DataFrame, pd.Series, list, tuple)):
+        return len(value)
+    if isinstance(value, dict) and all(isinstance(v, (pd.Series, dict)) for v in value.values()):
+        return len(pd.DataFrame(value))  # vd: bảng tóm tắt thể chất {cột: Series}
+    return None
+
+
+def start_trace(path):
+    """Bật trace cho tiến trình hiện tại, ghi nối các bản ghi vào file JSON-lines 'path'."""
+    stop_trace()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _lock:
+        _state.update(active=True, path=path, file=open(path, "a", encoding="utf-8"),
+                      owner=os.getpid(), run=uuid.uuid4().hex[:12])
+        _records.clear()
+    return _state["run"]
+
+
+def stop_trace():
+    """Tắt trace và đóng file."""
+    with _lock:
+        if _state["file"] is not None and _state["owner"] == os.getpid():
+            _state["file"].close()
+        _state.update(active=False, path=None, file=None, owner=None)
+
+
+def enabled():
+    """Trace có đang bật không."""
+    return _state["active"]
+
+
+def _open_stages():
+    if not hasattr(_local, "stages"):
+        _local.stages = []
+    return _local.stages
+
+
+def record(entry):
+    """
+    Lưu 1 bản ghi đã đo xong. Bản ghi đo trong tiến trình con (ProcessPool) được trả về tiến trình chính
+    rồi gọi record() ở đó, vì chỉ tiến trình đã mở file mới ghi vào file (tránh các dòng ghi đan xen).
+    """
+    if not _state["active"] or _state["owner"] != os.getpid():
+        return
+    entry = dict(entry, run=_state["run"])
+    stages = _open_stages()
+    if entry.get("parent") is None and stages:
+        entry["parent"] = stages[-1]["stage"]
+    with _lock:
+        _records.append(entry)
+        _state["file"].write(json.dumps(entry, ensure_ascii=False) + "\n")
+        _state["file"].flush()
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Context manager đo 1 bước. Gán entry["rows_out"] bên trong khối để ghi số dòng đầu ra:
+
+        with tracing.stage("clean_data", rows_in=len(df)) as entry:
+            df = clean_data(df)
+            entry["rows_out"] = len(df)
+
+    Bước bị lỗi vẫn được ghi lại (status='error') rồi ném lại lỗi.
+    Trong tiến trình chính, bản ghi được record() ngay; trong tiến trình con thì nơi gọi tự gửi entry về.
+    """
+    tracking = _state["active"]
+    stages = _open_stages()
+    entry = {"stage": name, "parent": stages[-1]["stage"] if stages else None,
+             "start": datetime.now().isoformat(timespec="milliseconds"), "pid": os.getpid(),
+             "wall_s": None, "cpu_s": None, "rss_start_mb": None, "peak_rss_delta_mb": None,
+             "rows_in": rows_in, "rows_out": None, "status": "ok", "error": None}
+    sampler = None
+    if tracking:
+        start_rss = _current_rss()
+        if start_rss is not None:
+            entry["rss_start_mb"] = round(start_rss / 1024 ** 2, 1)
+            sampler = _RssSampler(start_rss)
+            sampler.start()
+    stages.append(entry)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield entry
+    except BaseException as e:
+        entry["status"], entry["error"] = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        entry["wall_s"] = round(time.perf_counter() - wall_start, 4)
+        entry["cpu_s"] = round(time.process_time() - cpu_start, 4)
+        if sampler is not None:
+            entry["peak_rss_delta_mb"] = round((sampler.stop() - start_rss) / 1024 ** 2, 1)
+        stages.pop()
+        if tracking:
+            record(entry)
+
+
+def traced(name=None, rows_in=None):
+    """
+    Decorator đo cả hàm như 1 bước. rows_in(*args, **kwargs) -> số dòng đầu vào (mặc định: len của
+    DataFrame đầu tiên trong tham số); số dòng đầu ra lấy từ kết quả (count_rows).
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if rows_in is not None:
+                n_in = rows_in(*args, **kwargs)
+            else:
+                n_in = next((len(a) for a in list(args) + list(kwargs.values())
+                             if isinstance(a, pd.DataFrame)), None)
+            with stage(stage_name, rows_in=n_in) as entry:
+                result = func(*args, **kwargs)
+                entry["rows_out"] = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def summary():
+    """Các bản ghi của lần chạy hiện tại dưới dạng DataFrame."""
+    with _lock:
+        return pd.DataFrame(list(_records))
+
+
+def print_summary(top=None):
+    """In bảng tổng kết các bước (chậm nhất lên đầu)."""
+    table = summary()
+    if table.empty:
+        print("Chưa có bước nào được trace.")
+        return
+    table = table.sort_values("wall_s", ascending=False)
+    if top is not None:
+        table = table.head(top)
+    print(f"{'BƯỚC':<50} {'THỰC (s)':>9} {'CPU (s)':>9} {'ĐỈNH RSS +MB':>13} {'DÒNG VÀO':>10} {'DÒNG RA':>10}")
+    for row in table.itertuples(index=False):
+        cells = [_fmt(row.wall_s, "{:.3f}"), _fmt(row.cpu_s, "{:.3f}"), _fmt(row.peak_rss_delta_mb, "{:.1f}"),
+                 _fmt(row.rows_in, "{:,.0f}"), _fmt(row.rows_out, "{:,.0f}")]
+        label = row.stage + (" [LỖI]" if row.status == "error" else "")
+        print(f"{label[:50]:<50} {cells[0]:>9} {cells[1]:>9} {cells[2]:>13} {cells[3]:>10} {cells[4]:>10}")
+
+
+def _fmt(value, pattern):
+    return "-" if value is None or pd.isna(value) else pattern.format(value)
@@ -1,13 +1,21 @@
-from modules.data_cleaning import scale_data
+from modules.cubes import (get_box_stats, get_histogram_cube, get_medal_cube, histogram, measure_mean,
+                           medal_counts)
+from modules.clustering import (DEFAULT_SAMPLE_SIZE, cluster_values, get_cluster_model,
+                                predict_clusters)
+from modules.memo import memoize
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from matplotlib.colors import ListedColormap
+from matplotlib.colors import to_rgb
+from matplotlib.patches import Patch
 
 # --- CẤU HÌNH GIAO DIỆN ---
 
+# Tăng khi đổi style ở ngoài file này (font, rcParams đặt nơi khác...) để ảnh trong bộ nhớ đệm
+# (modules/chart_cache.py) được vẽ lại; sửa code trong file này thì bộ nhớ đệm tự nhận ra.
+STYLE_VERSION = 1
+
 
 def setup_style():
     sns.set_theme(style="whitegrid")
@@ -23,9 +31,19 @@ setup_style()
 # --- NHÓM BIỂU ĐỒ CƠ BẢN ---
 
 
+# Các hàm *_data: bảng số liệu đã tổng hợp của từng biểu đồ, dùng chung cho bản matplotlib (file này)
+# và bản Plotly (visualization_plotly.py), được ghi nhớ theo bộ dữ liệu (modules/memo.py).
+
+
+@memoize
+def gender_trend_data(df):
+    """Số VĐV (ID duy nhất) theo Năm x Giới tính."""
+    return df.groupby(['Year', 'Sex'], observed=True)['ID'].nunique().unstack()
+
+
 def plot_gender_trend(df):
     """ Xu hướng giới tính. So sánh số lượng VĐV Nam vs Nữ tham gia qua các kỳ Olympic. """
-    data = df.groupby(['Year', 'Sex'])['ID'].nunique().unstack()
+    data = gender_trend_data(df)
 
     # Gán biến fig để trả về cho UI
     fig = plt.figure(figsize=(10, 6))
@@ -40,10 +58,11 @@ def plot_gender_trend(df):
     return fig
 
 
-def plot_top_medals(df, top_n=10):
-    """Top quốc gia đạt huy chương."""
-    df_medals = df[df['Medal'] != 'No Medal']
-    top_countries = df_medals['NOC'].value_counts().head(top_n)
+def plot_top_medals(df, top_n=10, cube=None):
+    """Top quốc gia đạt huy chương (môn đồng đội chỉ tính 1 huy chương, giống bảng tổng sắp)."""
+    cube = cube if cube is not None else get_medal_cube(df)
+    top_countries = medal_counts(cube, 'NOC').sort_values(ascending=False).head(top_n)
+    top_countries.index = top_countries.index.astype(str)
 
     fig = plt.figure(figsize=(10, 6))
 
@@ -55,117 +74,165 @@ def plot_top_medals(df, top_n=10):
     return fig
 
 
-def plot_physical_distribution(df):
-    """ Biểu đồ phân phối: Tuổi, Chiều cao, Cân nặng. """
+def histogram_bars(cube, measure, bins=30, **filters):
+    """
+    Các cột histogram của 1 chỉ số từ cube: gộp các ô 1 đơn vị thành khoảng 'bins' cột.
+    Trả về (biên trái các cột, chiều cao, độ rộng cột, giá trị trung bình), không có dữ liệu -> None.
+    """
+    hist = histogram(cube, measure, **filters)
+    hist = hist[hist > 0]
+    if hist.empty:
+        return None
+    # Ô đầu -> ô cuối có dữ liệu chia thành các cột rộng 'step' ô (kể cả cột trống ở giữa)
+    edges, values = hist.index.to_numpy(), hist.to_numpy()
+    span = int(edges[-1] - edges[0]) + 1
+    step = max(int(np.ceil(span / bins)), 1)
+    groups = ((edges - edges[0]) // step).astype(np.int64)
+    heights = np.bincount(groups, weights=values, minlength=int(np.ceil(span / step))).astype(np.int64)
+    left = edges[0] + np.arange(len(heights)) * step
+    return left, heights, step, measure_mean(cube, measure, **filters)
+
+
+def _plot_cube_histogram(ax, cube, measure, color, unit, bins=30, **filters):
+    """Vẽ histogram 1 chỉ số từ cube (gộp các ô 1 đơn vị thành khoảng 'bins' cột) + đường trung bình."""
+    bars = histogram_bars(cube, measure, bins, **filters)
+    if bars is None:
+        return
+    left, heights, step, mean = bars
+    ax.bar(left, heights, width=step, align='edge',
+           color=color, alpha=0.75, edgecolor='white')
+    ax.axvline(mean, color='red', linestyle='--',
+               linewidth=2, label=f'TB: {mean:.1f} {unit}')
+    ax.set_xlabel(measure)
+    ax.set_ylabel('Count')
+    ax.legend()
+
+
+def plot_physical_distribution(df, cube=None, **filters):
+    """
+    Biểu đồ phân phối: Tuổi, Chiều cao, Cân nặng.
+    Vẽ từ cube histogram thể chất (dựng 1 lần cho mỗi bộ dữ liệu), không quét lại dữ liệu gốc.
+    filters: lát cắt theo các chiều của cube (Sex, Season, Sport, Medal),
+    vd: plot_physical_distribution(df, Sex='F', Sport='Swimming', Medal=MEDALS).
+    """
+    cube = cube if cube is not None else get_histogram_cube(df)
     fig, axes = plt.subplots(1, 3, figsize=(18, 6))
 
     # 1. Biểu đồ Tuổi
-    sns.histplot(data=df, x='Age', bins=30, ax=axes[0], color='#9b59b6')
-    mean_age = df['Age'].mean()
-    axes[0].axvline(mean_age, color='red', linestyle='--',
-                    linewidth=2, label=f'TB: {mean_age:.1f} tuổi')
+    _plot_cube_histogram(axes[0], cube, 'Age', '#9b59b6', 'tuổi', **filters)
     axes[0].set_title('Phân bố Độ tuổi')
-    axes[0].legend()
 
     # 2. Biểu đồ Chiều cao
-    sns.histplot(data=df, x='Height', bins=30, ax=axes[1], color='#3498db')
-    mean_height = df['Height'].mean()
-    axes[1].axvline(mean_height, color='red', linestyle='--',
-                    linewidth=2, label=f'TB: {mean_height:.1f} cm')
+    _plot_cube_histogram(axes[1], cube, 'Height', '#3498db', 'cm', **filters)
     axes[1].set_title('Phân bố Chiều cao')
-    axes[1].legend()
 
     # 3. Biểu đồ Cân nặng
-    sns.histplot(data=df, x='Weight', bins=30, ax=axes[2], color='#2ecc71')
-    mean_weight = df['Weight'].mean()
-    axes[2].axvline(mean_weight, color='red', linestyle='--',
-                    linewidth=2, label=f'TB: {mean_weight:.1f} kg')
+    _plot_cube_histogram(axes[2], cube, 'Weight', '#2ecc71', 'kg', **filters)
     axes[2].set_title('Phân bố Cân nặng')
-    axes[2].legend()
 
     plt.tight_layout()
     return fig
 
 
-def plot_physical_comparison_by_sport(df):
-    """ So sánh thể chất giữa các môn (Boxplot) """
-    top_sports = df['Sport'].value_counts().head(10).index
-    df_top = df[df['Sport'].isin(top_sports)]
-
-    fig, axes = plt.subplots(2, 1, figsize=(12, 12))
-
-    sns.boxplot(data=df_top, x='Sport', y='Height',
-                ax=axes[0], hue='Sport', palette='viridis', legend=False)
-    axes[0].tick_params(axis='x', rotation=45)
-    axes[0].set_title('So sánh Chiều cao')
-
-    sns.boxplot(data=df_top, x='Sport', y='Weight',
-                ax=axes[1], hue='Sport', palette='magma', legend=False)
-    axes[1].tick_params(axis='x', rotation=45)
-    axes[1].set_title('So sánh Cân nặng')
+def plot_physical_comparison_by_sport(df, top=10, stats=None):
+    """
+    So sánh thể chất giữa các môn (Boxplot).
+    Hộp / râu / điểm ngoại lai (tối đa cubes.MAX_FLIERS điểm mỗi môn) vẽ từ thống kê tính sẵn
+    (cubes.get_box_stats) nên chi phí vẽ không phụ thuộc số dòng dữ liệu.
+    top: số môn đông VĐV nhất cần vẽ, None = tất cả các môn.
+    """
+    stats = stats if stats is not None else get_box_stats(df)
+    sports = stats["rows"].index[:top] if top is not None else stats["rows"].index
+
+    fig, axes = plt.subplots(2, 1, figsize=(max(12, 0.4 * len(sports)), 12))
+
+    for ax, measure, palette, title in [(axes[0], 'Height', 'viridis', 'So sánh Chiều cao'),
+                                        (axes[1], 'Weight', 'magma', 'So sánh Cân nặng')]:
+        table = stats[measure].reindex(sports).dropna(subset=['med'])
+        boxes = [{'label': str(sport), 'q1': row.q1, 'med': row.med, 'q3': row.q3,
+                  'whislo': row.whislo, 'whishi': row.whishi, 'fliers': row.fliers}
+                 for sport, row in zip(table.index, table.itertuples())]
+        if boxes:
+            artists = ax.bxp(boxes, patch_artist=True, widths=0.8,
+                             medianprops={'color': '#333333'},
+                             flierprops={'marker': 'd', 'markersize': 4, 'markerfacecolor': '#555555'})
+            for box, color in zip(artists['boxes'], sns.color_palette(palette, len(boxes))):
+                box.set_facecolor(color)
+        ax.set_xlabel('Sport')
+        ax.set_ylabel(measure)
+        ax.tick_params(axis='x', rotation=45 if len(boxes) <= 20 else 90)
+        ax.set_title(title)
 
     plt.tight_layout()
     return fig
 
 # --- NHÓM BIỂU ĐỒ NÂNG CAO ---
 
+# Màu / nhãn các cụm thể trạng (cụm đã được đánh số theo cân nặng tăng dần)
+CLUSTER_COLORS = ['#FFD700', '#008080', '#4B0082']  # Vàng, Xanh, Tím
+CLUSTER_LABELS = [
+    'Nhóm 1: Nhẹ/Trẻ (Vàng)',
+    'Nhóm 2: Trung bình (Xanh)',
+    'Nhóm 3: Nặng/Già (Tím)'
+]
 
-def plot_athlete_clustering(df):
-    """ 
-    Phân cụm VĐV (KMeans) 
-    """
-    # Chuẩn bị dữ liệu thô: Chỉ lấy cột cần thiết và bỏ NA
-    df_cluster = df[['Age', 'Weight']].dropna().copy()
-
-    if len(df_cluster) == 0:
-        return None
 
-    df_scaled_result = scale_data(df_cluster)
+def _density_edges(values, bins):
+    """Biên các ô cho biểu đồ mật độ: tối đa 'bins' ô, mỗi ô rộng ít nhất 1 đơn vị
+    (tuổi / cân nặng là số nguyên nên ô hẹp hơn sẽ để lại các sọc trống)."""
+    width = max((values.max() - values.min()) / bins, 1.0)
+    return np.arange(values.min() - width / 2, values.max() + width, width)
 
-    # Lấy giá trị đã scale ra để đưa vào mô hình KMeans
-    X_scaled = df_scaled_result[['Age', 'Weight']].values
 
-    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-    df_cluster['Cluster'] = kmeans.fit_predict(X_scaled)
-
-    cluster_means = df_cluster.groupby(
-        'Cluster')['Weight'].mean().sort_values()
-    mapping = {original: new for new,
-               original in enumerate(cluster_means.index)}
-    df_cluster['Sorted_Cluster'] = df_cluster['Cluster'].map(mapping)
-
-    custom_colors = ['#FFD700', '#008080', '#4B0082']  # Vàng, Xanh, Tím
-    cmap = ListedColormap(custom_colors)
+def plot_athlete_clustering(df, sample_size=DEFAULT_SAMPLE_SIZE, bins=80):
+    """
+    Phân cụm VĐV (KMeans) theo Tuổi và Cân nặng.
+    Mô hình fit trên mẫu sample_size dòng (None = toàn bộ) và được giữ lại theo bộ dữ liệu,
+    mọi dòng được gán cụm rồi vẽ dạng mật độ (lưới bins x bins ô): màu = cụm chiếm đa số trong ô,
+    độ đậm = số VĐV trong ô (thang log), thay vì vẽ từng điểm.
+    """
+    model = get_cluster_model(df, sample_size=sample_size)
+    if model is None:
+        return None
+    values = cluster_values(df)
+    labels = predict_clusters(model, values)
+    age, weight = values[:, 0], values[:, 1]
+
+    # Đếm số VĐV theo (cụm, ô cân nặng, ô tuổi) trong 1 lượt bincount
+    age_edges, weight_edges = _density_edges(age, bins), _density_edges(weight, bins)
+    nx, ny = len(age_edges) - 1, len(weight_edges) - 1
+    ix = np.clip(((age - age_edges[0]) / (age_edges[1] - age_edges[0])).astype(np.int64), 0, nx - 1)
+    iy = np.clip(((weight - weight_edges[0]) / (weight_edges[1] - weight_edges[0])).astype(np.int64), 0, ny - 1)
+    n_clusters = len(model["centers"])
+    counts = np.bincount((labels.astype(np.int64) * ny + iy) * nx + ix,
+                         minlength=n_clusters * ny * nx).reshape(n_clusters, ny, nx)
+    total = counts.sum(axis=0)
+
+    image = np.zeros((ny, nx, 4))
+    image[..., :3] = np.array([to_rgb(c) for c in CLUSTER_COLORS])[counts.argmax(axis=0)]
+    image[..., 3] = np.where(total > 0, 0.25 + 0.75 * np.log1p(total) / np.log1p(total.max()), 0)
 
     fig = plt.figure(figsize=(10, 6))
+    plt.imshow(image, origin='lower', aspect='auto', interpolation='nearest',
+               extent=(age_edges[0], age_edges[-1], weight_edges[0], weight_edges[-1]))
 
-    scatter = plt.scatter(df_cluster['Age'], df_cluster['Weight'],
-                          c=df_cluster['Sorted_Cluster'], cmap=cmap, s=50, alpha=0.6)
-
-    handles, _ = scatter.legend_elements()
-    legend_labels = [
-        'Nhóm 1: Nhẹ/Trẻ (Vàng)',
-        'Nhóm 2: Trung bình (Xanh)',
-        'Nhóm 3: Nặng/Già (Tím)'
-    ]
-    plt.legend(handles, legend_labels,
+    handles = [Patch(color=color) for color in CLUSTER_COLORS]
+    plt.legend(handles, CLUSTER_LABELS,
                title="Phân nhóm thể trạng", loc='upper right')
 
     plt.title('Phân cụm VĐV theo Tuổi và Cân nặng')
     plt.xlabel('Tuổi (Age)')
     plt.ylabel('Cân nặng (Weight) - kg')
+    plt.grid(False)
 
     return fig
 
 
-def plot_host_advantage_china(df):
+def plot_host_advantage_china(df, cube=None):
     """ Hiệu ứng 'Lợi thế sân nhà' của TQ năm 2008 """
     years = [1996, 2000, 2004, 2008, 2012, 2016]
-    df_chn = df[(df['NOC'] == 'CHN') &
-                (df['Year'].isin(years)) &
-                (df['Medal'] != 'No Medal') &
-                (df['Medal'].notna())]
-    medals = df_chn.groupby('Year')['Medal'].count()
+    cube = cube if cube is not None else get_medal_cube(df)
+    medals = medal_counts(cube, 'Year', noc='CHN', years=years)
 
     fig = plt.figure(figsize=(10, 6))
     plt.bar(medals.index.astype(str), medals.values, color='red')
@@ -174,10 +241,16 @@ def plot_host_advantage_china(df):
     return fig
 
 
+@memoize
+def geopolitics_data(df):
+    """Số quốc gia (NOC) tham dự mỗi kỳ Olympic mùa Hè."""
+    summer = df[df['Season'] == 'Summer']
+    return summer.groupby('Year')['NOC'].nunique()
+
+
 def plot_geopolitics_impact(df):
     """ Ảnh hưởng chiến tranh lạnh (1980, 1984) """
-    summer = df[df['Season'] == 'Summer']
-    noc_count = summer.groupby('Year')['NOC'].nunique()
+    noc_count = geopolitics_data(df)
 
     fig = plt.figure(figsize=(10, 6))
     plt.plot(noc_count.index, noc_count.values,
@@ -195,24 +268,35 @@ def plot_geopolitics_impact(df):
 # --- NHÓM 3: THỐNG KÊ VỀ VIỆT NAM ---
 
 
-def plot_vietnam_stats(df):
-    """ Thống kê Việt Nam: Số lượng VĐV và Môn thế mạnh """
+@memoize
+def vietnam_stats_data(df):
+    """Số VĐV Việt Nam theo năm và top 5 môn tham gia nhiều nhất; không có dữ liệu VN -> None."""
     df_vn = df[df['NOC'] == 'VIE']
     if df_vn.empty:
+        return None
+    vn_part = df_vn.groupby('Year')['ID'].nunique()
+    top_sports = df_vn['Sport'].value_counts().head(5)
+    top_sports.index = top_sports.index.astype(str)
+    return vn_part, top_sports
+
+
+def plot_vietnam_stats(df):
+    """ Thống kê Việt Nam: Số lượng VĐV và Môn thế mạnh """
+    data = vietnam_stats_data(df)
+    if data is None:
         print("Không tìm thấy dữ liệu về Việt Nam")
         return None
+    vn_part, top_sports = data
 
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
 
     # Biểu đồ số lượng VĐV
-    vn_part = df_vn.groupby('Year')['ID'].nunique()
     sns.barplot(x=vn_part.index.astype(str),
                 y=vn_part.values, ax=ax1, color='red')
     ax1.set_title('Số lượng VĐV Việt Nam tham gia Olympic')
     ax1.tick_params(axis='x', rotation=90)
 
     # Biểu đồ môn thế mạnh
-    top_sports = df_vn['Sport'].value_counts().head(5)
     sns.barplot(x=top_sports.values, y=top_sports.index, ax=ax2,
                 hue=top_sports.index, palette='OrRd', legend=False)
     ax2.set_title('Top 5 Môn thể thao Việt Nam tham gia nhiều nhất')
@@ -221,11 +305,18 @@ def plot_vietnam_stats(df):
     return fig
 
 
-def plot_vietnam_details(df):
-    """ Bảng vàng thành tích Việt Nam """
+@memoize
+def vietnam_medals_data(df):
+    """Các dòng huy chương của Việt Nam (Year, Name, Sport, Medal), theo năm."""
     df_vn = df[df['NOC'] == 'VIE']
     medals = df_vn[df_vn['Medal'].isin(
         ['Gold', 'Silver', 'Bronze'])].sort_values('Year')
+    return medals[['Year', 'Name', 'Sport', 'Medal']]
+
+
+def plot_vietnam_details(df):
+    """ Bảng vàng thành tích Việt Nam """
+    medals = vietnam_medals_data(df)
 
     if medals.empty:
         return None
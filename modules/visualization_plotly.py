@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from modules.clustering import DEFAULT_SAMPLE_SIZE, cluster_values, get_cluster_model, predict_clusters
+from modules.cubes import get_box_stats, get_histogram_cube, get_medal_cube, medal_counts
+from modules.visualization import (CLUSTER_COLORS, CLUSTER_LABELS, gender_trend_data, geopolitics_data,
+                                   histogram_bars, vietnam_medals_data, vietnam_stats_data)
+
+# --- BẢN PLOTLY CỦA CÁC BIỂU ĐỒ TRONG visualization.py ---
+# Cùng tên hàm, cùng tham số, trả về plotly Figure thay vì matplotlib Figure.
+# Server chỉ tổng hợp số liệu (dùng chung các hàm *_data / cube với bản matplotlib) và gửi bảng nhỏ đó
+# xuống trình duyệt; trình duyệt tự vẽ nên không tốn CPU server để xuất ảnh mỗi lần rerun.
+# Biểu đồ nhiều điểm (phân cụm) dùng trace WebGL (Scattergl).
+
+TEMPLATE = "plotly_white"
+
+
+def _layout(fig, title, height=500, **kwargs):
+    fig.update_layout(title=title, template=TEMPLATE, height=height,
+                      margin=dict(l=40, r=20, t=60, b=40), **kwargs)
+    return fig
+
+
+# --- NHÓM BIỂU ĐỒ CƠ BẢN ---
+
+
+def plot_gender_trend(df):
+    """ Xu hướng giới tính. So sánh số lượng VĐV Nam vs Nữ tham gia qua các kỳ Olympic. """
+    data = gender_trend_data(df)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=data.index, y=data['M'], mode='lines+markers', name='Nam'))
+    fig.add_trace(go.Scatter(x=data.index, y=data['F'], mode='lines+markers', name='Nữ',
+                             line=dict(color='red')))
+    return _layout(fig, 'Xu hướng tham gia của VĐV Nam và Nữ qua các năm',
+                   xaxis_title='Year', yaxis_title='Số VĐV')
+
+
+def plot_top_medals(df, top_n=10, cube=None):
+    """Top quốc gia đạt huy chương (môn đồng đội chỉ tính 1 huy chương, giống bảng tổng sắp)."""
+    cube = cube if cube is not None else get_medal_cube(df)
+    top_countries = medal_counts(cube, 'NOC').sort_values(ascending=False).head(top_n)
+    top_countries.index = top_countries.index.astype(str)
+
+    fig = go.Figure(go.Bar(x=top_countries.index, y=top_countries.values,
+                           marker_color=px.colors.sample_colorscale('Viridis', np.linspace(0, 1, len(top_countries)))))
+    return _layout(fig, f'Top {top_n} quốc gia đạt nhiều huy chương nhất lịch sử',
+                   xaxis_title='NOC', yaxis_title='Số huy chương')
+
+
+def plot_physical_distribution(df, cube=None, **filters):
+    """
+    Biểu đồ phân phối: Tuổi, Chiều cao, Cân nặng (từ cube histogram thể chất).
+    filters: lát cắt theo các chiều của cube (Sex, Season, Sport, Medal).
+    """
+    cube = cube if cube is not None else get_histogram_cube(df)
+    panels = [('Age', 'Phân bố Độ tuổi', '#9b59b6', 'tuổi'),
+              ('Height', 'Phân bố Chiều cao', '#3498db', 'cm'),
+              ('Weight', 'Phân bố Cân nặng', '#2ecc71', 'kg')]
+    fig = make_subplots(rows=1, cols=3, subplot_titles=[title for _, title, _, _ in panels])
+
+    for col, (measure, _, color, unit) in enumerate(panels, start=1):
+        bars = histogram_bars(cube, measure, **filters)
+        if bars is None:
+            continue
+        left, heights, step, mean = bars
+        fig.add_trace(go.Bar(x=left + step / 2, y=heights, width=step, marker_color=color,
+                             opacity=0.75, name=measure, showlegend=False), row=1, col=col)
+        fig.add_vline(x=mean, line_dash='dash', line_color='red', row=1, col=col,
+                      annotation_text=f'TB: {mean:.1f} {unit}', annotation_position='top right')
+        fig.update_xaxes(title_text=measure, row=1, col=col)
+    fig.update_layout(bargap=0.02)
+    return _layout(fig, None, height=450)
+
+
+def plot_physical_comparison_by_sport(df, top=10, stats=None):
+    """
+    So sánh thể chất giữa các môn (Boxplot) từ thống kê tính sẵn (cubes.get_box_stats).
+    top: số môn đông VĐV nhất, None = tất cả các môn.
+    """
+    stats = stats if stats is not None else get_box_stats(df)
+    sports = stats["rows"].index[:top] if top is not None else stats["rows"].index
+    fig = make_subplots(rows=2, cols=1, subplot_titles=['So sánh Chiều cao', 'So sánh Cân nặng'],
+                        vertical_spacing=0.12)
+
+    for row_no, (measure, scale) in enumerate([('Height', 'Viridis'), ('Weight', 'Magma')], start=1):
+        table = stats[measure].reindex(sports).dropna(subset=['med'])
+        labels = [str(sport) for sport in table.index]
+        colors = px.colors.sample_colorscale(scale, np.linspace(0, 0.9, max(len(labels), 1)))
+        for label, row, color in zip(labels, table.itertuples(), colors):
+            fig.add_trace(go.Box(x=[label], q1=[row.q1], median=[row.med], q3=[row.q3],
+                                 lowerfence=[row.whislo], upperfence=[row.whishi], mean=[row.mean],
+                                 name=label, marker_color=color, showlegend=False), row=row_no, col=1)
+            if len(row.fliers):
+                fig.add_trace(go.Scattergl(x=[label] * len(row.fliers), y=row.fliers, mode='markers',
+                                           marker=dict(color='#555555', size=4, symbol='diamond'),
+                                           name=label, showlegend=False, hoverinfo='y'), row=row_no, col=1)
+        fig.update_yaxes(title_text=measure, row=row_no, col=1)
+    return _layout(fig, None, height=900)
+
+
+# --- NHÓM BIỂU ĐỒ NÂNG CAO ---
+
+
+def plot_athlete_clustering(df, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Phân cụm VĐV (KMeans) theo Tuổi và Cân nặng.
+    Các VĐV trùng (Tuổi, Cân nặng, Cụm) được gộp thành 1 điểm, kích thước theo số VĐV,
+    rồi vẽ bằng WebGL -> chỉ gửi vài nghìn điểm thay vì từng dòng dữ liệu.
+    """
+    model = get_cluster_model(df, sample_size=sample_size)
+    if model is None:
+        return None
+    values = cluster_values(df)
+    labels = predict_clusters(model, values)
+    points = (pd.DataFrame({'Age': values[:, 0], 'Weight': values[:, 1], 'Cluster': labels})
+              .value_counts().rename('Athletes').reset_index())
+    size = 4 + 14 * np.log1p(points['Athletes']) / np.log1p(points['Athletes'].max())
+
+    fig = go.Figure()
+    for cluster, (color, label) in enumerate(zip(CLUSTER_COLORS, CLUSTER_LABELS)):
+        part = points['Cluster'] == cluster
+        fig.add_trace(go.Scattergl(
+            x=points.loc[part, 'Age'], y=points.loc[part, 'Weight'], mode='markers', name=label,
+            marker=dict(color=color, size=size[part], opacity=0.6, line=dict(width=0)),
+            customdata=points.loc[part, 'Athletes'],
+            hovertemplate='Tuổi %{x}<br>Cân nặng %{y} kg<br>%{customdata} VĐV<extra></extra>'))
+    return _layout(fig, 'Phân cụm VĐV theo Tuổi và Cân nặng', xaxis_title='Tuổi (Age)',
+                   yaxis_title='Cân nặng (Weight) - kg', legend_title_text='Phân nhóm thể trạng')
+
+
+def plot_host_advantage_china(df, cube=None):
+    """ Hiệu ứng 'Lợi thế sân nhà' của TQ năm 2008 """
+    years = [1996, 2000, 2004, 2008, 2012, 2016]
+    cube = cube if cube is not None else get_medal_cube(df)
+    medals = medal_counts(cube, 'Year', noc='CHN', years=years)
+
+    fig = go.Figure(go.Bar(x=medals.index.astype(str), y=medals.values, marker_color='red'))
+    return _layout(fig, 'Lợi thế sân nhà TQ tại Olympic 2008', xaxis_title='Year',
+                   yaxis_title='Số huy chương')
+
+
+def plot_geopolitics_impact(df):
+    """ Ảnh hưởng chiến tranh lạnh (1980, 1984) """
+    noc_count = geopolitics_data(df)
+
+    fig = go.Figure(go.Scatter(x=noc_count.index, y=noc_count.values, mode='lines+markers',
+                               line=dict(color='green', width=2)))
+    for year, text in [(1980, 'Tẩy chay 1980<br>(Moscow)'), (1984, 'Tẩy chay 1984<br>(Los Angeles)')]:
+        if year in noc_count.index:
+            fig.add_annotation(x=year, y=noc_count[year], text=text, showarrow=True, arrowcolor='red',
+                               font=dict(color='red'), ax=-60 if year == 1980 else 60, ay=-60)
+    return _layout(fig, 'Số lượng quốc gia tham dự & Ảnh hưởng Chiến tranh lạnh',
+                   xaxis_title='Year', yaxis_title='Số quốc gia')
+
+
+# --- NHÓM 3: THỐNG KÊ VỀ VIỆT NAM ---
+
+
+def plot_vietnam_stats(df):
+    """ Thống kê Việt Nam: Số lượng VĐV và Môn thế mạnh """
+    data = vietnam_stats_data(df)
+    if data is None:
+        print("Không tìm thấy dữ liệu về Việt Nam")
+        return None
+    vn_part, top_sports = data
+
+    fig = make_subplots(rows=2, cols=1, vertical_spacing=0.15,
+                        subplot_titles=['Số lượng VĐV Việt Nam tham gia Olympic',
+                                        'Top 5 Môn thể thao Việt Nam tham gia nhiều nhất'])
+    fig.add_trace(go.Bar(x=vn_part.index.astype(str), y=vn_part.values, marker_color='red',
+                         showlegend=False), row=1, col=1)
+    fig.add_trace(go.Bar(x=top_sports.values, y=top_sports.index, orientation='h', showlegend=False,
+                         marker_color=px.colors.sample_colorscale('OrRd', np.linspace(0.9, 0.3, len(top_sports)))),
+                  row=2, col=1)
+    fig.update_yaxes(autorange='reversed', row=2, col=1)
+    return _layout(fig, None, height=800)
+
+
+def plot_vietnam_details(df):
+    """ Bảng vàng thành tích Việt Nam """
+    medals = vietnam_medals_data(df)
+
+    if medals.empty:
+        return None
+
+    fig = go.Figure(go.Table(
+        header=dict(values=["Năm", "VĐV", "Môn", "Huy chương"], fill_color='#eaf4f4', align='left'),
+        cells=dict(values=[medals[col].astype(str) for col in ['Year', 'Name', 'Sport', 'Medal']],
+                   align='left')))
+    return _layout(fig, "Danh sách Huy chương của Đoàn thể thao Việt Nam",
+                   height=min(200 + 30 * len(medals), 900))